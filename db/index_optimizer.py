@@ -104,6 +104,12 @@ class IndexOptimizer:
                 'scrobbles',
                 '(artist, user)',
                 'Análisis de usuarios por artista (quién escucha X artista)'
+            ),
+            (
+                'idx_scrobbles_user_timestamp_artist_album_track',
+                'scrobbles',
+                '(user, timestamp, artist, album, track)',
+                'Índice cubriente para las coincidencias de grupo por usuarios y periodo'
             )
         ]
 
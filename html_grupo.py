@@ -6,6 +6,7 @@ Genera estadísticas grupales con gráficos de coincidencias y evolución tempor
 
 import os
 import sys
+import gzip
 import json
 import sqlite3
 from datetime import datetime, timedelta
@@ -37,11 +38,15 @@ def main():
     parser.add_argument('--years-back', type=int, default=5,
                        help='Número de años hacia atrás para analizar (por defecto: 5)')
     parser.add_argument('--output', type=str, default=None,
-                       help='Archivo de salida HTML (por defecto: auto-generado con fecha)')
+                       help='Archivo de salida HTML (por defecto: auto-generado con fecha); si termina en .gz se comprime con gzip')
     parser.add_argument('--mbid-only', action='store_true',
                        help='Solo incluir scrobbles con MBID válidos')
     parser.add_argument('--no-json', action='store_true',
                        help='No regenerar archivos JSON (usar existentes)')
+    parser.add_argument('--force-json', action='store_true',
+                       help='Regenerar todos los archivos JSON aunque estén al día')
+    parser.add_argument('--json-bundle', action='store_true',
+                       help='Escribir los datos de todas las combinaciones en un único data.ndjson (con rangos en bundle.json)')
     args = parser.parse_args()
 
     # Auto-generar nombre de archivo si no se especifica
@@ -91,22 +96,27 @@ def main():
             json_generator = GroupDataJSONGenerator(database, years_back=args.years_back, mbid_only=args.mbid_only)
             # Crear carpeta específica del período dentro de data
             data_dir = os.path.join(os.path.dirname(args.output), 'data', period_folder)
-            json_index = json_generator.generate_all_user_combinations_data(users, data_dir)
+            json_index = json_generator.generate_all_user_combinations_data(
+                users, data_dir, force=args.force_json, bundle=args.json_bundle
+            )
         else:
             print(f"⏭️ Saltando generación de JSON (--no-json activado)")
 
         # Generar HTML con información del período
         print("🎨 Generando HTML...")
-        html_content = html_generator.generate_html(group_stats, args.years_back, period_folder)
-
         # Crear directorio si no existe
         output_dir = os.path.dirname(args.output)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Guardar archivo
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Guardar archivo (el HTML se escribe directamente, sin montarlo entero en memoria; comprimido
+        # por el camino si la salida termina en .gz)
+        if args.output.endswith('.gz'):
+            output_file = gzip.open(args.output, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            output_file = open(args.output, 'w', encoding='utf-8')
+        with output_file as f:
+            html_generator.generate_html(group_stats, args.years_back, period_folder, out=f)
 
         print(f"✅ Archivo generado: {args.output}")
 
@@ -6,12 +6,15 @@ Genera estadísticas individuales de usuarios usando clases extendidas
 
 import os
 import sys
+import gzip
 import json
 import sqlite3
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 from typing import List, Dict, Tuple, Optional
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 try:
     from dotenv import load_dotenv
@@ -26,13 +29,26 @@ from tools.users.user_stats_database_extended import UserStatsDatabaseExtended
 from tools.users.user_stats_html_generator import UserStatsHTMLGeneratorFixed
 
 
+def _analyze_user(user: str, users: List[str], years_back: int) -> Dict:
+    """Analiza un usuario en un proceso aparte, con su propia conexión a la base de datos"""
+    print(f"  • Procesando {user}...")
+    database = UserStatsDatabaseExtended()
+    try:
+        analyzer = UserStatsAnalyzer(database, years_back=years_back)
+        return analyzer.analyze_user(user, users)
+    finally:
+        database.close()
+
+
 def main():
     """Función principal para generar estadísticas de usuarios con conteos únicos CORRECTOS"""
     parser = argparse.ArgumentParser(description='Generador de estadísticas individuales de usuarios de Last.fm')
     parser.add_argument('--years-back', type=int, default=5,
                        help='Número de años hacia atrás para analizar (por defecto: 5)')
     parser.add_argument('--output', type=str, default=None,
-                       help='Archivo de salida HTML (por defecto: auto-generado con fecha)')
+                       help='Archivo de salida HTML (por defecto: auto-generado con fecha); si termina en .gz se comprime con gzip')
+    parser.add_argument('--inline-details', action='store_true',
+                       help='Incrustar los detalles de evolución en el HTML en lugar de cargarlos bajo demanda')
     args = parser.parse_args()
 
     # Auto-generar nombre de archivo si no se especifica
@@ -48,28 +64,33 @@ def main():
 
         print("🎵 Iniciando análisis de usuarios con conteos únicos CORRECTOS...")
 
-        # ✅ Usar base de datos extendida con funciones adicionales
-        database = UserStatsDatabaseExtended()
-        analyzer = UserStatsAnalyzer(database, years_back=args.years_back)
         html_generator = UserStatsHTMLGeneratorFixed()
 
-        # Analizar estadísticas para todos los usuarios
+        # Analizar estadísticas para todos los usuarios: cada usuario es independiente,
+        # así que se reparten entre procesos (cada uno abre su conexión a la base de datos extendida)
         print(f"👤 Analizando {len(users)} usuarios...")
-        all_user_stats = {}
-
-        for user in users:
-            print(f"  • Procesando {user}...")
-            user_stats = analyzer.analyze_user(user, users)
-            all_user_stats[user] = user_stats
+        max_workers = min(len(users), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_analyze_user, users, repeat(users), repeat(args.years_back)))
+        all_user_stats = dict(zip(users, results))
 
         # Generar HTML
         print("🎨 Generando HTML con conteos únicos...")
-        html_content = html_generator.generate_html(all_user_stats, users, args.years_back)
-
-        # Guardar archivo
+        # Detalles de los popups de evolución en una carpeta junto al HTML (salvo --inline-details)
+        compress = args.output.endswith('.gz')
+        html_path = args.output[:-3] if compress else args.output
+        details_dir = None
+        if not args.inline_details:
+            details_dir = os.path.splitext(html_path)[0] + '_detalles'
+
+        # Guardar archivo (el HTML se escribe directamente, sin montarlo entero en memoria)
         os.makedirs(os.path.dirname(args.output), exist_ok=True)
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        if compress:
+            output_file = gzip.open(args.output, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            output_file = open(args.output, 'w', encoding='utf-8')
+        with output_file as f:
+            html_generator.generate_html(all_user_stats, users, args.years_back, out=f, details_dir=details_dir)
 
         print(f"✅ Archivo generado: {args.output}")
         print(f"📊 Características FINALES:")
@@ -113,8 +134,6 @@ def main():
             else:
                 print(f"  • {user}: {total_scrobbles:,} scrobbles (❌ sin conteos únicos)")
 
-        database.close()
-
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
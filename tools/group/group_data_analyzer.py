@@ -4,15 +4,45 @@ GroupDataAnalyzer - Analizador para datos de coincidencias por nivel de usuarios
 Permite obtener TOPs de elementos compartidos por N usuarios EXACTAMENTE
 """
 
+import sqlite3
 from datetime import datetime
 from typing import List, Dict, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import json
 
 
 class GroupDataAnalyzer:
     """Clase para analizar datos de coincidencias por nivel de usuarios"""
 
+    # Tamaño del top de cada nivel
+    LEVEL_TOP_LIMIT = 25
+
+    # Entidades agregadas en SQL, en el orden de salida: (columnas clave, FROM, filtro extra, expresión del nombre)
+    SQL_LEVEL_ENTITIES = {
+        'artists': (['s.artist AS artist'], 'scrobbles s', '', 'r.artist'),
+        'albums': (['s.artist AS artist', 's.album AS album'], 'scrobbles s',
+                   "AND s.album IS NOT NULL AND s.album != ''", "(r.artist || ' - ' || r.album)"),
+        'tracks': (['s.artist AS artist', 's.track AS track'], 'scrobbles s', '',
+                   "(r.artist || ' - ' || r.track)"),
+        # Primeros 3 géneros de cada artista, ya extraídos del JSON (tabla temporal de GroupStatsDatabase,
+        # creada al consultar con _ensure_artist_genre_flat)
+        'genres': (['g.genre AS genre'], 'scrobbles s JOIN artist_genre_flat g ON s.artist = g.artist', '', 'r.genre'),
+        'labels': (['al.label AS label'],
+                   'scrobbles s JOIN album_labels al ON s.artist = al.artist AND s.album = al.album',
+                   "AND al.label IS NOT NULL AND al.label != ''", 'r.label'),
+        # Misma etiqueta que _get_decade, calculada por SQLite al agrupar
+        'decades': (["CASE WHEN ard.release_year < 1950 THEN 'Antes de 1950' "
+                     "WHEN ard.release_year >= 2020 THEN '2020s+' "
+                     "ELSE ((ard.release_year / 10) * 10) || 's' END AS decade"],
+                    'scrobbles s JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album',
+                    'AND ard.release_year IS NOT NULL', 'r.decade'),
+    }
+
+    # Entidades que se resuelven en la misma consulta: artistas, álbumes y canciones salen de un único
+    # recorrido de scrobbles agrupado por (artista, álbum, canción, usuario)
+    LEVEL_QUERY_GROUPS = (('artists', 'albums', 'tracks'), ('genres',), ('labels',), ('decades',))
+
     def __init__(self, database, years_back: int = 5, mbid_only: bool = False):
         self.database = database
         self.years_back = years_back
@@ -20,6 +50,15 @@ class GroupDataAnalyzer:
         self.current_year = datetime.now().year
         self.from_year = self.current_year - years_back
         self.to_year = self.current_year
+        # Periodo y filtro MBID fijos durante toda la vida del analizador
+        self._from_ts = int(datetime(self.from_year, 1, 1).timestamp())
+        self._to_ts = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
+        self._mbid_filter = database._get_mbid_filter(mbid_only)
+        # Top por nivel de cada entidad, compartido entre todos los niveles de usuarios
+        self._level_cache = {}
+        # Parámetros (usuarios + periodo) por lista de usuarios y SQL por (entidad, número de usuarios)
+        self._user_params_cache = {}
+        self._level_sql_cache = {}
 
     def analyze_data_by_user_levels(self, users: List[str]) -> Dict:
         """Analiza datos para diferentes niveles de coincidencia de usuarios"""
@@ -28,6 +67,9 @@ class GroupDataAnalyzer:
         total_users = len(users)
         data_by_levels = {}
 
+        # Las consultas de las seis entidades son independientes: se lanzan a la vez
+        self._prefetch_level_tops(users)
+
         # Generar datos para cada nivel de usuarios (todos, todos-1, todos-2, etc.)
         for min_users in range(total_users, 1, -1):  # Desde todos hasta 2 usuarios mínimo
             level_key = self._get_level_key(min_users, total_users)
@@ -62,309 +104,185 @@ class GroupDataAnalyzer:
             return f"Total menos {missing} ({remaining} usuarios)"
 
     def _get_data_for_level(self, users: List[str], min_users: int) -> Dict:
-        """Obtiene datos para un nivel específico de usuarios"""
-
-        # CORRIGIDO: Usar las funciones específicas para niveles exactos
-        # Top 25 artistas con exactamente min_users
-        top_artists = self._get_top_artists_by_exact_users(users, min_users, 25)
-
-        # Top 25 álbumes con exactamente min_users
-        top_albums = self._get_top_albums_by_exact_users(users, min_users, 25)
-
-        # Top 25 canciones con exactamente min_users
-        top_tracks = self._get_top_tracks_by_exact_users(users, min_users, 25)
-
-        # Top 25 géneros con exactamente min_users
-        top_genres = self._get_top_genres_by_exact_users(users, min_users, 25)
-
-        # Top 25 sellos con exactamente min_users
-        top_labels = self._get_top_labels_by_exact_users(users, min_users, 25)
-
-        # Top 25 décadas con exactamente min_users
-        top_decades = self._get_top_release_decades_by_exact_users(users, min_users, 25)
-
-        return {
-            'min_users': min_users,
-            'artists': self._prepare_data_items(top_artists),
-            'albums': self._prepare_data_items(top_albums),
-            'tracks': self._prepare_data_items(top_tracks),
-            'genres': self._prepare_data_items(top_genres),
-            'labels': self._prepare_data_items(top_labels),
-            'decades': self._prepare_data_items(top_decades),
-            'counts': {
-                'artists': len(top_artists),
-                'albums': len(top_albums),
-                'tracks': len(top_tracks),
-                'genres': len(top_genres),
-                'labels': len(top_labels),
-                'decades': len(top_decades)
-            }
+        """Obtiene datos para un nivel específico de usuarios: el top 25 de cada entidad
+        (artistas, álbumes, canciones, géneros, sellos y décadas) con EXACTAMENTE min_users,
+        sacado de los tops por nivel ya calculados"""
+        tops = {
+            entity: self._get_top_by_exact_users(entity, users, min_users, self.LEVEL_TOP_LIMIT)
+            for entity in self.SQL_LEVEL_ENTITIES
         }
 
-    def _get_top_artists_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene artistas compartidos por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT artist, user, COUNT(*) as plays
-            FROM scrobbles s
-            WHERE user IN ({','.join(['?'] * len(users))})
-              AND timestamp >= ? AND timestamp <= ?
-            {mbid_filter}
-            GROUP BY artist, user
-        ''', users + [from_timestamp, to_timestamp])
-
-        # Procesar por artista con user_plays
-        artist_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
-
-        for row in cursor.fetchall():
-            artist = row['artist']
-            user = row['user']
-            plays = row['plays']
-            artist_stats[artist]['users'].add(user)
-            artist_stats[artist]['total_scrobbles'] += plays
-            artist_stats[artist]['user_plays'][user] += plays
-
-        # Filtrar por número EXACTO de usuarios
-        result = []
-        for artist, stats in artist_stats.items():
-            if len(stats['users']) == exact_users:  # EXACTAMENTE el número de usuarios
-                result.append({
-                    'name': artist,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        # Ordenar por scrobbles totales (descendente)
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
-
-    def _get_top_albums_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene álbumes compartidos por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT (artist || ' - ' || album) as album_name,
-                   artist,
-                   album,
-                   user,
-                   COUNT(*) as plays
-            FROM scrobbles s
-            WHERE user IN ({','.join(['?'] * len(users))})
-              AND timestamp >= ? AND timestamp <= ?
-              AND album IS NOT NULL AND album != ''
-            {mbid_filter}
-            GROUP BY artist, album, user
-        ''', users + [from_timestamp, to_timestamp])
-
-        album_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int), 'artist': '', 'album': ''})
-
-        for row in cursor.fetchall():
-            album_key = row['album_name']
-            user = row['user']
-            plays = row['plays']
-            album_stats[album_key]['users'].add(user)
-            album_stats[album_key]['total_scrobbles'] += plays
-            album_stats[album_key]['user_plays'][user] += plays
-            album_stats[album_key]['artist'] = row['artist']
-            album_stats[album_key]['album'] = row['album']
-
-        result = []
-        for album_name, stats in album_stats.items():
-            if len(stats['users']) == exact_users:
-                result.append({
-                    'name': album_name,
-                    'artist': stats['artist'],
-                    'album': stats['album'],
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
-
-    def _get_top_tracks_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene canciones compartidas por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT (artist || ' - ' || track) as track_name,
-                   artist,
-                   track,
-                   user,
-                   COUNT(*) as plays
-            FROM scrobbles s
-            WHERE user IN ({','.join(['?'] * len(users))})
-              AND timestamp >= ? AND timestamp <= ?
-            {mbid_filter}
-            GROUP BY artist, track, user
-        ''', users + [from_timestamp, to_timestamp])
-
-        track_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int), 'artist': '', 'track': ''})
-
-        for row in cursor.fetchall():
-            track_key = row['track_name']
-            user = row['user']
-            plays = row['plays']
-            track_stats[track_key]['users'].add(user)
-            track_stats[track_key]['total_scrobbles'] += plays
-            track_stats[track_key]['user_plays'][user] += plays
-            track_stats[track_key]['artist'] = row['artist']
-            track_stats[track_key]['track'] = row['track']
-
-        result = []
-        for track_name, stats in track_stats.items():
-            if len(stats['users']) == exact_users:
-                result.append({
-                    'name': track_name,
-                    'artist': stats['artist'],
-                    'track': stats['track'],
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
-
-    def _get_top_genres_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene géneros compartidos por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT ag.genres, user, COUNT(*) as plays
-            FROM scrobbles s
-            JOIN artist_genres ag ON s.artist = ag.artist
-            WHERE s.user IN ({','.join(['?'] * len(users))})
-              AND s.timestamp >= ? AND s.timestamp <= ?
-            {mbid_filter}
-            GROUP BY ag.genres, user
-        ''', users + [from_timestamp, to_timestamp])
-
-        genre_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
-
-        for row in cursor.fetchall():
-            try:
-                genres_list = json.loads(row['genres']) if row['genres'] else []
-                for genre in genres_list[:3]:  # Solo primeros 3 géneros por artista
-                    genre_stats[genre]['users'].add(row['user'])
-                    genre_stats[genre]['total_scrobbles'] += row['plays']
-                    genre_stats[genre]['user_plays'][row['user']] += row['plays']
-            except json.JSONDecodeError:
-                continue
+        level_data = {'min_users': min_users}
+        level_data.update(tops)
+        level_data['counts'] = {entity: len(top) for entity, top in tops.items()}
+        return level_data
 
-        result = []
-        for genre, stats in genre_stats.items():
-            if len(stats['users']) == exact_users:
-                result.append({
-                    'name': genre,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
-
-    def _get_top_labels_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene sellos compartidos por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT al.label, s.user, COUNT(*) as plays
-            FROM scrobbles s
-            JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
-            WHERE s.user IN ({','.join(['?'] * len(users))})
-              AND s.timestamp >= ? AND s.timestamp <= ?
-              AND al.label IS NOT NULL AND al.label != ''
-            {mbid_filter}
-            GROUP BY al.label, s.user
-        ''', users + [from_timestamp, to_timestamp])
-
-        label_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
-
-        for row in cursor.fetchall():
-            label = row['label']
-            user = row['user']
-            plays = row['plays']
-            label_stats[label]['users'].add(user)
-            label_stats[label]['total_scrobbles'] += plays
-            label_stats[label]['user_plays'][user] += plays
+    def _get_top_by_exact_users(self, entity: str, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
+        """Top de una entidad compartida por EXACTAMENTE exact_users usuarios, sacado de los cubos por nivel
+        y ya en el formato de salida compatible con html_semanal.py"""
+        bucket = self._get_level_buckets(entity, users).get(exact_users, [])
 
         result = []
-        for label, stats in label_stats.items():
-            if len(stats['users']) == exact_users:
-                result.append({
-                    'name': label,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
-
-    def _get_top_release_decades_by_exact_users(self, users: List[str], exact_users: int, limit: int = 25) -> List[Dict]:
-        """Obtiene décadas compartidas por EXACTAMENTE el número especificado de usuarios"""
-        cursor = self.database.conn.cursor()
-        from_timestamp = int(datetime(self.from_year, 1, 1).timestamp())
-        to_timestamp = int(datetime(self.to_year + 1, 1, 1).timestamp()) - 1
-        mbid_filter = self.database._get_mbid_filter(self.mbid_only)
-
-        cursor.execute(f'''
-            SELECT ard.release_year, user, COUNT(*) as plays
-            FROM scrobbles s
-            JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album
-            WHERE s.user IN ({','.join(['?'] * len(users))})
-              AND s.timestamp >= ? AND s.timestamp <= ?
-              AND ard.release_year IS NOT NULL
-            {mbid_filter}
-            GROUP BY ard.release_year, user
-        ''', users + [from_timestamp, to_timestamp])
-
-        decade_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
-
-        for row in cursor.fetchall():
-            decade = self._get_decade(row['release_year'])
-            decade_stats[decade]['users'].add(row['user'])
-            decade_stats[decade]['total_scrobbles'] += row['plays']
-            decade_stats[decade]['user_plays'][row['user']] += row['plays']
+        for name, stats in bucket[:limit]:
+            user_plays = stats['user_plays']
+            item = {
+                'name': name,
+                'count': stats['total_scrobbles'],  # total_scrobbles como "count"
+                'users': list(user_plays),
+                'user_counts': user_plays,  # Scrobbles por usuario
+                'user_count': len(user_plays)
+            }
+            # Información adicional (artista/álbum/canción) si está disponible
+            item.update(stats['extra'])
+            result.append(item)
+        return result
 
-        result = []
-        for decade, stats in decade_stats.items():
-            if len(stats['users']) == exact_users:
-                result.append({
-                    'name': decade,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
-                })
-
-        result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        return result[:limit]
+    def _get_level_buckets(self, entity: str, users: List[str]) -> Dict[int, List]:
+        """Top de cada nivel de una entidad ({n_usuarios: [(nombre, stats), ...]} ordenado por scrobbles);
+        se calcula una vez para todos los niveles"""
+        cache_key = (entity, tuple(users))
+        if cache_key not in self._level_cache:
+            group = next(group for group in self.LEVEL_QUERY_GROUPS if entity in group)
+            for group_entity, level_tops in self._query_level_tops(group, users).items():
+                self._level_cache[(group_entity, tuple(users))] = level_tops
+        return self._level_cache[cache_key]
+
+    def _get_user_params(self, users: List[str]) -> List:
+        """Parámetros base de las consultas (usuarios + periodo), construidos una vez por lista de usuarios"""
+        cache_key = tuple(users)
+        if cache_key not in self._user_params_cache:
+            self._user_params_cache[cache_key] = list(users) + [self._from_ts, self._to_ts]
+        return self._user_params_cache[cache_key]
+
+    def _prefetch_level_tops(self, users: List[str]):
+        """Lanza en paralelo las consultas de todos los grupos de entidades pendientes, cada una con su propia
+        conexión (SQLite suelta el GIL mientras ejecuta y en WAL admite lectores concurrentes)"""
+        pending = [
+            group for group in self.LEVEL_QUERY_GROUPS
+            if any((entity, tuple(users)) not in self._level_cache for entity in group)
+        ]
+        db_path = getattr(self.database, 'db_path', None)
+        if len(pending) < 2 or not db_path or db_path == ':memory:':
+            return  # Se calculan bajo demanda con la conexión principal
+
+        def query(group):
+            # Conexión propia y ligera por consulta (sqlite3 no comparte conexiones entre hilos); la tabla
+            # temporal de géneros solo se construye en la que ejecuta el grupo de géneros
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                return self._query_level_tops(group, users, conn)
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            for group_tops in executor.map(query, pending):
+                for entity, level_tops in group_tops.items():
+                    self._level_cache[(entity, tuple(users))] = level_tops
+
+    def _get_level_sql(self, group: tuple, user_count: int) -> str:
+        """SQL del top por nivel de un grupo de entidades, especializado para un número de usuarios (el filtro
+        MBID es fijo en el analizador); se construye una vez y el texto idéntico reutiliza la sentencia
+        preparada en la caché de la conexión.
+
+        Cada entidad agrega (clave, usuario) en un CTE 'per_<entidad>', lo ordena por nivel en 'ranked_<entidad>'
+        y solo sus supervivientes llevan los plays por usuario. Si el grupo tiene varias entidades, todas
+        agregan desde un único recorrido de scrobbles ('base', por artista, álbum, canción y usuario).
+        Filas: entity, name, artist, item (álbum o canción), user_count, total, user_plays, rn"""
+        cache_key = (group, user_count)
+        if cache_key in self._level_sql_cache:
+            return self._level_sql_cache[cache_key]
+
+        where = f'''s.user IN ({','.join('?' * user_count)})
+                      AND s.timestamp >= ? AND s.timestamp <= ?'''
+        fused = len(group) > 1
+        ctes = []
+        if fused:
+            ctes.append(f'''base AS (
+                    SELECT s.artist AS artist, s.album AS album, s.track AS track, s.user AS user, COUNT(*) AS plays
+                    FROM scrobbles s
+                    WHERE {where}
+                    {self._mbid_filter}
+                    GROUP BY s.artist, s.album, s.track, s.user
+                )''')
+
+        selects = []
+        for entity in group:
+            key_columns, from_clause, extra_filter, name_expr = self.SQL_LEVEL_ENTITIES[entity]
+            keys = [column.rsplit(' AS ', 1)[1] for column in key_columns]
+            key_list = ', '.join(keys)
+            ranked_keys = ', '.join(f'r.{key}' for key in keys)
+            join_on = ' AND '.join(f'p.{key} = r.{key}' for key in keys)
+            artist_column, item_column = (f'r.{keys[0]}', f'r.{keys[1]}') if len(keys) > 1 else ('NULL', 'NULL')
+
+            if fused:
+                per_source = f'''SELECT {', '.join(key_columns)}, s.user AS user, SUM(s.plays) AS plays
+                    FROM base s
+                    WHERE 1 {extra_filter}'''
+            else:
+                per_source = f'''SELECT {', '.join(key_columns)}, s.user AS user, COUNT(*) AS plays
+                    FROM {from_clause}
+                    WHERE {where}
+                      {extra_filter}
+                    {self._mbid_filter}'''
+
+            ctes.append(f'''per_{entity} AS (
+                    {per_source}
+                    GROUP BY {key_list}, s.user
+                )''')
+            ctes.append(f'''ranked_{entity} AS (
+                    SELECT {key_list}, COUNT(*) AS user_count, SUM(plays) AS total,
+                           ROW_NUMBER() OVER (PARTITION BY COUNT(*) ORDER BY SUM(plays) DESC, {key_list}) AS rn
+                    FROM per_{entity}
+                    GROUP BY {key_list}
+                )''')
+            selects.append(f'''SELECT * FROM (
+                    SELECT '{entity}' AS entity, {name_expr} AS name, {artist_column} AS artist, {item_column} AS item,
+                           r.user_count, r.total, json_group_object(p.user, p.plays) AS user_plays, r.rn
+                    FROM ranked_{entity} r
+                    JOIN per_{entity} p ON {join_on}
+                    WHERE r.rn <= ?
+                    GROUP BY {ranked_keys}
+                )''')
+
+        sql = (
+            'WITH ' + ',\n                '.join(ctes) + '\n                '
+            + '\n                UNION ALL\n                '.join(selects)
+            + '\n                ORDER BY user_count, rn'
+        )
+        self._level_sql_cache[cache_key] = sql
+        return sql
+
+    def _query_level_tops(self, group: tuple, users: List[str], conn=None) -> Dict[str, Dict[int, List]]:
+        """Agrupa, filtra por número de usuarios y saca el top de cada nivel directamente en SQLite:
+        una sola consulta por grupo de entidades para todos los niveles. Devuelve {entidad: buckets}"""
+        sql = self._get_level_sql(group, len(users))
+        params = self._get_user_params(users)
+
+        conn = conn or self.database.conn
+        if 'genres' in group:
+            # Tabla temporal de géneros por artista: solo se construye en la conexión que la consulta
+            self.database._ensure_artist_genre_flat(conn)
+        cursor = conn.cursor()
+        cursor.execute(sql, params + [self.LEVEL_TOP_LIMIT] * len(group))
+
+        # Los datos extra (artista/álbum/canción) solo en álbumes y canciones, como en el resto del análisis
+        extra_keys = {}
+        for entity in group:
+            key_columns = self.SQL_LEVEL_ENTITIES[entity][0]
+            keys = [column.rsplit(' AS ', 1)[1] for column in key_columns]
+            extra_keys[entity] = keys if len(keys) > 1 else None
+
+        buckets = {entity: defaultdict(list) for entity in group}
+        for row in cursor:
+            entity = row['entity']
+            keys = extra_keys[entity]
+            buckets[entity][row['user_count']].append((row['name'], {
+                'total_scrobbles': row['total'],
+                'user_plays': json.loads(row['user_plays']),
+                'extra': {keys[0]: row['artist'], keys[1]: row['item']} if keys else {}
+            }))
+        return {entity: dict(entity_buckets) for entity, entity_buckets in buckets.items()}
 
     def _get_decade(self, year: int) -> str:
         """Convierte un año a etiqueta de década"""
@@ -376,33 +294,6 @@ class GroupDataAnalyzer:
             decade_start = (year // 10) * 10
             return f"{decade_start}s"
 
-    def _prepare_data_items(self, raw_data: List[Dict]) -> List[Dict]:
-        """Prepara los elementos para mostrar en formato compatible con html_semanal.py"""
-        if not raw_data:
-            return []
-
-        result = []
-        for item in raw_data:
-            prepared_item = {
-                'name': item['name'],
-                'count': item['total_scrobbles'],  # Usar total_scrobbles como "count"
-                'users': item['shared_users'],
-                'user_counts': item.get('user_plays', {}),  # Scrobbles por usuario
-                'user_count': item['user_count']
-            }
-
-            # Agregar información adicional si está disponible
-            if 'artist' in item:
-                prepared_item['artist'] = item['artist']
-            if 'album' in item:
-                prepared_item['album'] = item['album']
-            if 'track' in item:
-                prepared_item['track'] = item['track']
-
-            result.append(prepared_item)
-
-        return result
-
     def get_level_labels(self, users: List[str]) -> Dict[str, str]:
         """Obtiene las etiquetas para todos los niveles disponibles"""
         total_users = len(users)
@@ -6,14 +6,67 @@ Crea archivos JSON con datos pre-calculados para diferentes combinaciones de usu
 
 import os
 import json
+import hashlib
+import heapq
+from contextlib import closing
+from operator import itemgetter
 from datetime import datetime
 from typing import List, Dict
-from itertools import combinations
+from itertools import combinations, repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Generador propio de cada proceso del pool de combinaciones (con su conexión a la base de datos)
+_worker_generator = None
+
+
+def _init_combo_worker(database_class, db_path: str, years_back: int, mbid_only: bool, user_plays_cache: Dict,
+                       user_yearly_plays_cache: Dict):
+    """Inicializa un proceso del pool: abre su propia conexión y recibe los scrobbles por usuario (totales
+    y por año) ya consultados"""
+    global _worker_generator
+    _worker_generator = GroupDataJSONGenerator(database_class(db_path), years_back=years_back, mbid_only=mbid_only)
+    _worker_generator._user_plays_cache = user_plays_cache
+    _worker_generator._user_yearly_plays_cache = user_yearly_plays_cache
+
+
+def _name_order(name) -> str:
+    """Desempate por nombre de los tops combinados en memoria (el nombre puede ser None)"""
+    return '' if name is None else str(name)
+
+
+def _process_combo(user_combo: tuple, user_key: str, output_dir: str, bundle: bool) -> Dict:
+    """Genera los datos de una combinación de usuarios en un proceso del pool: escribe sus archivos o,
+    en modo paquete, devuelve los JSON serializados para añadirlos a data.ndjson"""
+    if bundle:
+        return _worker_generator._generate_combo_payloads(list(user_combo))
+    return _worker_generator._generate_combo_files(list(user_combo), user_key, output_dir)
 
 
 class GroupDataJSONGenerator:
     """Generador de datos JSON para filtros dinámicos de usuarios"""
 
+    # Versión del formato de los archivos: forma parte de la clave de caché de cada combinación
+    CACHE_VERSION = 4
+
+    # Prefijo de archivo (y de registro en el paquete) de cada tipo de datos por combinación
+    FILE_PREFIXES = {'shared_charts': 'shared', 'scrobbles_charts': 'scrobbles', 'evolution': 'evolution'}
+
+    # Modo paquete: todas las combinaciones en un único data.ndjson (un JSON por línea) y sus rangos de
+    # bytes en bundle.json, para que la página pida cada registro con una petición Range
+    BUNDLE_FILE = 'data.ndjson'
+    BUNDLE_INDEX_FILE = 'bundle.json'
+
+    # Índice: cabecera pequeña en index.json y un registro por combinación (usuarios, clave, clave de
+    # caché y archivos) en index.ndjson, para leerlo línea a línea sin cargar todas las combinaciones
+    INDEX_FILE = 'index.json'
+    COMBOS_INDEX_FILE = 'index.ndjson'
+
     def __init__(self, database, years_back: int = 5, mbid_only: bool = False):
         self.database = database
         self.years_back = years_back
@@ -21,9 +74,24 @@ class GroupDataJSONGenerator:
         self.current_year = datetime.now().year
         self.from_year = self.current_year - years_back
         self.to_year = self.current_year
-
-    def generate_all_user_combinations_data(self, users: List[str], output_dir: str = "docs/data") -> Dict:
-        """Genera datos JSON para todas las combinaciones relevantes de usuarios"""
+        # Texto de cada año del periodo, para las claves de los datos de evolución
+        self._year_keys = {year: str(year) for year in range(self.from_year, self.to_year + 1)}
+        # Scrobbles de cada usuario por entidad, consultados una sola vez y reutilizados en todas
+        # las combinaciones de usuarios en las que aparece
+        self._user_plays_cache = {}
+        # Lo mismo por año de escucha, para los datos de evolución
+        self._user_yearly_plays_cache = {}
+        # Géneros completos de cada JSON de artist_genres ya decodificado (desglose por usuario en la evolución)
+        self._artist_genre_sets = {}
+        # Plantillas de ruta de los archivos por directorio de salida
+        self._path_templates = {}
+
+    def generate_all_user_combinations_data(self, users: List[str], output_dir: str = "docs/data",
+                                            force: bool = False, bundle: bool = False) -> Dict:
+        """Genera datos JSON para todas las combinaciones relevantes de usuarios; las combinaciones
+        cuyos archivos ya están al día (misma clave de caché en el índice anterior) no se regeneran
+        salvo force=True. Con bundle=True se escribe un único data.ndjson en lugar de tres archivos
+        por combinación"""
         print("    • Generando datos JSON para filtros de usuarios...")
         print(f"    • Directorio de salida: {output_dir}")
 
@@ -37,120 +105,395 @@ class GroupDataJSONGenerator:
             'evolution': {}
         }
 
-        # Generar para todas las combinaciones de 2 o más usuarios
-        total_combinations = sum(1 for r in range(2, len(users) + 1) for _ in combinations(users, r))
-        current_combination = 0
-
-        for r in range(2, len(users) + 1):
-            for user_combo in combinations(users, r):
-                user_list = list(user_combo)
-                user_key = "_".join(sorted(user_list))
-                current_combination += 1
-
-                print(f"      • Procesando combinación {current_combination}/{total_combinations}: {', '.join(user_list)}")
-
-                # Datos por usuarios compartidos
-                shared_data = self._generate_shared_charts_data(user_list)
-                shared_file = f"{output_dir}/shared_{user_key}.json"
-                with open(shared_file, 'w', encoding='utf-8') as f:
-                    json.dump(shared_data, f, indent=2, ensure_ascii=False)
-                generated_files['shared_charts'][user_key] = shared_file
-
-                # Datos por scrobbles totales
-                scrobbles_data = self._generate_scrobbles_charts_data(user_list)
-                scrobbles_file = f"{output_dir}/scrobbles_{user_key}.json"
-                with open(scrobbles_file, 'w', encoding='utf-8') as f:
-                    json.dump(scrobbles_data, f, indent=2, ensure_ascii=False)
-                generated_files['scrobbles_charts'][user_key] = scrobbles_file
-
-                # Datos de evolución temporal
-                evolution_data = self._generate_evolution_data(user_list)
-                evolution_file = f"{output_dir}/evolution_{user_key}.json"
-                with open(evolution_file, 'w', encoding='utf-8') as f:
-                    json.dump(evolution_data, f, indent=2, ensure_ascii=False)
-                generated_files['evolution'][user_key] = evolution_file
-
-        # Generar archivo de índice con metadatos
+        # Todas las combinaciones de 2 o más usuarios, enumeradas una sola vez; con los usuarios ya
+        # ordenados cada combinación sale ordenada y su clave no necesita volver a ordenarse
+        sorted_users = sorted(users)
+        all_combos = [combo for r in range(2, len(users) + 1) for combo in combinations(sorted_users, r)]
+        combo_keys = ["_".join(combo) for combo in all_combos]
+        total_combinations = len(all_combos)
+
+        # Claves de caché: combinación, periodo, filtro MBID y huella de la base de datos. Las
+        # combinaciones con la misma clave en el índice anterior y sus archivos presentes se saltan
+        index_file = os.path.join(output_dir, self.INDEX_FILE)
+        combos_index_file = os.path.join(output_dir, self.COMBOS_INDEX_FILE)
+        fingerprint = self.database.get_data_fingerprint()
+        cache_keys = {user_key: self._combo_cache_key(user_key, fingerprint) for user_key in combo_keys}
+        previous_keys = {} if force else self._load_previous_cache_keys(index_file, combos_index_file)
+
+        # Rangos del paquete anterior: en modo paquete las combinaciones al día se copian de ahí
+        bundle_file = os.path.join(output_dir, self.BUNDLE_FILE)
+        bundle_index_file = os.path.join(output_dir, self.BUNDLE_INDEX_FILE)
+        previous_ranges = {}
+        if bundle and previous_keys and os.path.exists(bundle_file):
+            previous_ranges = self._load_previous_bundle_ranges(bundle_index_file)
+
+        # Una sola pasada por las combinaciones: rutas y entradas del índice, y las que hay que regenerar
+        pending = []
+        user_combinations = []
+        for user_combo, user_key in zip(all_combos, combo_keys):
+            user_combinations.append({'users': list(user_combo), 'key': user_key})
+            if bundle:
+                up_to_date = all(f"{prefix}_{user_key}" in previous_ranges for prefix in self.FILE_PREFIXES.values())
+            else:
+                files = self._combo_file_paths(user_key, output_dir)
+                for file_type, file_path in files.items():
+                    generated_files[file_type][user_key] = file_path
+                up_to_date = all(map(os.path.exists, files.values()))
+            if previous_keys.get(user_key) != cache_keys[user_key] or not up_to_date:
+                pending.append((user_combo, user_key))
+        if len(pending) < total_combinations:
+            print(f"      • Combinaciones al día (sin regenerar): {total_combinations - len(pending)}/{total_combinations}")
+
+        with closing(self._process_pending_combos(pending, output_dir, bundle)) as results:
+            if bundle:
+                bundle_ranges = self._write_bundle(combo_keys, pending, results, bundle_file, previous_ranges)
+            # Agotar el generador antes de escribir los índices: cierra el pool y propaga los errores de
+            # escritura (en modo paquete _write_bundle ya ha tomado todos los resultados)
+            for _ in results:
+                pass
+        if bundle:
+            self._write_json(bundle_index_file, {'file': self.BUNDLE_FILE, 'ranges': bundle_ranges})
+        else:
+            # Un paquete de una generación anterior dejaría a la página leyendo datos viejos
+            for stale_file in (bundle_index_file, bundle_file):
+                if os.path.exists(stale_file):
+                    os.remove(stale_file)
+
+        # Generar los archivos de índice (al final: sus claves de caché solo valen si todas las
+        # combinaciones pendientes se han escrito)
         index_data = {
             'users': users,
             'period': f"{self.from_year}-{self.to_year}",
             'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'files': generated_files,
-            'user_combinations': [
-                {
-                    'users': list(combo),
-                    'key': "_".join(sorted(combo))
-                }
-                for r in range(2, len(users) + 1)
-                for combo in combinations(users, r)
-            ]
+            'cache_keys': cache_keys,
+            'user_combinations': user_combinations
         }
 
-        index_file = f"{output_dir}/index.json"
-        with open(index_file, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, indent=2, ensure_ascii=False)
+        self._write_combos_index(combos_index_file, user_combinations, cache_keys, generated_files)
+        self._write_json(index_file, {
+            'users': users,
+            'period': index_data['period'],
+            'generated_at': index_data['generated_at'],
+            'combinations': total_combinations,
+            'combinations_file': self.COMBOS_INDEX_FILE,
+            'bundle': bundle
+        }, pretty=True)
 
         print(f"      • Archivos JSON generados en: {output_dir}")
         print(f"      • Combinaciones procesadas: {len(index_data['user_combinations'])}")
-        print(f"      • Archivos por tipo:")
-        print(f"        - Shared charts: {len(generated_files['shared_charts'])}")
-        print(f"        - Scrobbles charts: {len(generated_files['scrobbles_charts'])}")
-        print(f"        - Evolution data: {len(generated_files['evolution'])}")
+        if bundle:
+            print(f"      • Paquete: {self.BUNDLE_FILE} ({len(bundle_ranges)} registros, rangos en {self.BUNDLE_INDEX_FILE})")
+        else:
+            print(f"      • Archivos por tipo:")
+            print(f"        - Shared charts: {len(generated_files['shared_charts'])}")
+            print(f"        - Scrobbles charts: {len(generated_files['scrobbles_charts'])}")
+            print(f"        - Evolution data: {len(generated_files['evolution'])}")
 
         return index_data
 
-    def _generate_shared_charts_data(self, users: List[str]) -> Dict:
-        """Genera datos para gráficos por usuarios compartidos"""
-        # Top 15 artistas por usuarios compartidos
-        top_artists = self.database.get_top_artists_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _process_pending_combos(self, pending: List[tuple], output_dir: str, bundle: bool):
+        """Genera las combinaciones pendientes y devuelve sus resultados en orden (rutas escritas o, en
+        modo paquete, JSON serializados). Cada combinación es independiente: se reparten entre procesos,
+        cada uno con su conexión a la base de datos y los scrobbles por usuario ya consultados aquí una sola vez"""
+        db_path = getattr(self.database, 'db_path', None)
+        max_workers = min(len(pending), os.cpu_count() or 1)
+        if max_workers > 1 and db_path and db_path != ':memory:':
+            for user in sorted({user for user_combo, _ in pending for user in user_combo}):
+                self._get_user_plays(user)
+                self._get_user_yearly_plays(user)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_combo_worker,
+                                     initargs=(type(self.database), db_path, self.years_back,
+                                               self.mbid_only, self._user_plays_cache,
+                                               self._user_yearly_plays_cache)) as executor:
+                pending_combos = [user_combo for user_combo, _ in pending]
+                pending_keys = [user_key for _, user_key in pending]
+                done = executor.map(_process_combo, pending_combos, pending_keys, repeat(output_dir),
+                                    repeat(bundle), chunksize=4)
+                for current_combination, (user_combo, result) in enumerate(zip(pending_combos, done), 1):
+                    print(f"      • Procesada combinación {current_combination}/{len(pending)}: {', '.join(user_combo)}")
+                    yield result
+        else:
+            # En serie, la escritura a disco va en un hilo aparte (suelta el GIL) y se solapa con el
+            # cálculo de la combinación siguiente
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                writes = []
+                for current_combination, (user_combo, user_key) in enumerate(pending, 1):
+                    print(f"      • Procesando combinación {current_combination}/{len(pending)}: {', '.join(user_combo)}")
+                    if bundle:
+                        yield self._generate_combo_payloads(list(user_combo))
+                    else:
+                        yield self._generate_combo_files(list(user_combo), user_key, output_dir, writer, writes)
+                for write in writes:
+                    write.result()  # Propaga cualquier error de escritura
+
+    def _write_bundle(self, combo_keys: List[str], pending: List[tuple], results, bundle_file: str,
+                      previous_ranges: Dict[str, list]) -> Dict[str, list]:
+        """Escribe data.ndjson con un registro por línea (en el orden de las combinaciones): los de las
+        combinaciones pendientes desde sus resultados, el resto copiados del paquete anterior.
+        Devuelve {prefijo_clave: [inicio, longitud]} en bytes"""
+        pending_keys = {user_key for _, user_key in pending}
+        ranges = {}
+        offset = 0
+        tmp_file = bundle_file + '.tmp'
+        previous = open(bundle_file, 'rb') if previous_ranges else None
+        try:
+            with open(tmp_file, 'wb', buffering=1 << 20) as out:
+                for user_key in combo_keys:
+                    payloads = next(results) if user_key in pending_keys else None
+                    for prefix in self.FILE_PREFIXES.values():
+                        name = f"{prefix}_{user_key}"
+                        if payloads is not None:
+                            record = payloads[prefix]
+                        else:
+                            start, length = previous_ranges[name]
+                            previous.seek(start)
+                            record = previous.read(length)
+                        out.write(record)
+                        out.write(b'\n')
+                        ranges[name] = [offset, len(record)]
+                        offset += len(record) + 1
+        finally:
+            if previous is not None:
+                previous.close()
+        os.replace(tmp_file, bundle_file)
+        return ranges
+
+    def _load_previous_bundle_ranges(self, bundle_index_file: str) -> Dict[str, list]:
+        """Rangos de bytes del paquete de la generación anterior (vacío si no hay)"""
+        try:
+            with open(bundle_index_file, 'rb') as f:
+                return json.loads(f.read()).get('ranges', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _combo_file_paths(self, user_key: str, output_dir: str) -> Dict[str, str]:
+        """Rutas de los tres archivos de una combinación de usuarios ({tipo: ruta}), con las plantillas
+        de ruta del directorio construidas una sola vez"""
+        templates = self._path_templates.get(output_dir)
+        if templates is None:
+            templates = self._path_templates[output_dir] = {
+                file_type: os.path.join(output_dir, prefix + '_{}.json').format
+                for file_type, prefix in self.FILE_PREFIXES.items()
+            }
+        return {file_type: template(user_key) for file_type, template in templates.items()}
+
+    def _combo_cache_key(self, user_key: str, fingerprint: str) -> str:
+        """Clave de caché de una combinación: cambia si cambian los usuarios, el periodo, el filtro
+        MBID, los datos de la base de datos o el formato de los archivos"""
+        raw = f"{self.CACHE_VERSION}|{user_key}|{self.from_year}|{self.to_year}|{self.mbid_only}|{fingerprint}"
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _write_combos_index(self, combos_index_file: str, user_combinations: List[Dict],
+                            cache_keys: Dict[str, str], generated_files: Dict[str, Dict]):
+        """Escribe index.ndjson: un registro JSON compacto por línea y combinación"""
+        with open(combos_index_file, 'wb', buffering=1 << 20) as f:
+            for combo in user_combinations:
+                user_key = combo['key']
+                record = {'kind': 'combo', 'users': combo['users'], 'key': user_key, 'cache_key': cache_keys[user_key]}
+                files = {file_type: paths[user_key] for file_type, paths in generated_files.items() if user_key in paths}
+                if files:
+                    record['files'] = files
+                f.write(self._dumps(record))
+                f.write(b'\n')
+
+    def _load_previous_cache_keys(self, index_file: str, combos_index_file: str) -> Dict[str, str]:
+        """Claves de caché guardadas en el índice de la generación anterior (vacío si no hay), leyendo
+        index.ndjson línea a línea o, si no existe, el index.json de formato anterior (con cache_keys)"""
+        try:
+            if not os.path.exists(combos_index_file):
+                with open(index_file, 'rb') as f:
+                    return json.loads(f.read()).get('cache_keys', {})
+            cache_keys = {}
+            with open(combos_index_file, 'rb') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get('kind') == 'combo':
+                        cache_keys[record['key']] = record['cache_key']
+            return cache_keys
+        except (OSError, ValueError, AttributeError, KeyError):
+            return {}
+
+    def _generate_combo_files(self, user_list: List[str], user_key: str, output_dir: str,
+                              writer: ThreadPoolExecutor = None, writes: List = None) -> Dict[str, str]:
+        """Genera y escribe los tres archivos de una combinación de usuarios; devuelve {tipo: ruta}.
+        Con writer, cada archivo se serializa aquí y se escribe en ese hilo (los futuros van a writes)"""
+        files = self._combo_file_paths(user_key, output_dir)
+        generators = {
+            'shared_charts': self._generate_shared_charts_data,  # Datos por usuarios compartidos
+            'scrobbles_charts': self._generate_scrobbles_charts_data,  # Datos por scrobbles totales
+            'evolution': self._generate_evolution_data  # Datos de evolución temporal
+        }
 
-        # Top 15 álbumes por usuarios compartidos
-        top_albums = self.database.get_top_albums_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+        for file_type, generate in generators.items():
+            data = generate(user_list)
+            if writer is None:
+                self._write_json(files[file_type], data)
+            else:
+                writes.append(writer.submit(self._write_bytes, files[file_type], self._dumps(data)))
 
-        # Top 15 canciones por usuarios compartidos
-        top_tracks = self.database.get_top_tracks_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+        return files
 
-        # Top 15 géneros por usuarios compartidos
-        top_genres = self.database.get_top_genres_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _write_bytes(self, path: str, content: bytes):
+        """Escribe un JSON ya serializado"""
+        with open(path, 'wb') as f:
+            f.write(content)
 
-        # Top 15 sellos por usuarios compartidos
-        top_labels = self.database.get_top_labels_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _generate_combo_payloads(self, user_list: List[str]) -> Dict[str, bytes]:
+        """Genera los tres JSON compactos de una combinación para el paquete ({prefijo: bytes})"""
+        return {
+            'shared': self._dumps(self._generate_shared_charts_data(user_list)),
+            'scrobbles': self._dumps(self._generate_scrobbles_charts_data(user_list)),
+            'evolution': self._dumps(self._generate_evolution_data(user_list))
+        }
 
-        # Top 15 años individuales de lanzamiento por usuarios compartidos
-        top_release_years = self.database.get_top_individual_years_by_shared_users(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _dumps(self, data: Dict) -> bytes:
+        """JSON compacto en bytes (UTF-8, sin saltos de línea: un registro por línea en el paquete)"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def _write_json(self, path: str, data: Dict, pretty: bool = False):
+        """Escribe un JSON en un buffer grande (json.dump escribe token a token); compacto salvo
+        pretty=True (solo el índice, pequeño). Con orjson si está disponible (claves no-str incluidas),
+        directamente a bytes en una sola escritura"""
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+            with open(path, 'wb', buffering=1 << 20) as f:
+                f.write(orjson.dumps(data, option=option))
+            return
+
+        # Sin orjson: volcado por trozos al buffer con iterencode, sin montar el JSON entero en memoria
+        if pretty:
+            encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+        else:
+            encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+        with open(path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(encoder.iterencode(data))
 
+    def _generate_shared_charts_data(self, users: List[str]) -> Dict:
+        """Genera datos para gráficos por usuarios compartidos (top 15 de cada entidad, combinando en
+        memoria los scrobbles ya consultados de cada usuario)"""
         return {
-            'artists': self._prepare_pie_chart_data('Artistas (Por Usuarios Compartidos)', top_artists, 'shared'),
-            'albums': self._prepare_pie_chart_data('Álbumes (Por Usuarios Compartidos)', top_albums, 'shared'),
-            'tracks': self._prepare_pie_chart_data('Canciones (Por Usuarios Compartidos)', top_tracks, 'shared'),
-            'genres': self._prepare_pie_chart_data('Géneros (Por Usuarios Compartidos)', top_genres, 'shared'),
-            'labels': self._prepare_pie_chart_data('Sellos (Por Usuarios Compartidos)', top_labels, 'shared'),
-            'release_years': self._prepare_pie_chart_data('Años de Lanzamiento (Por Usuarios Compartidos)', top_release_years, 'shared')
+            'artists': self._prepare_pie_chart_data('Artistas (Por Usuarios Compartidos)', self._get_top_by_shared_users('artists', users), 'shared'),
+            'albums': self._prepare_pie_chart_data('Álbumes (Por Usuarios Compartidos)', self._get_top_by_shared_users('albums', users), 'shared'),
+            'tracks': self._prepare_pie_chart_data('Canciones (Por Usuarios Compartidos)', self._get_top_by_shared_users('tracks', users), 'shared'),
+            'genres': self._prepare_pie_chart_data('Géneros (Por Usuarios Compartidos)', self._get_top_by_shared_users('genres', users), 'shared'),
+            'labels': self._prepare_pie_chart_data('Sellos (Por Usuarios Compartidos)', self._get_top_by_shared_users('labels', users), 'shared'),
+            'release_years': self._prepare_pie_chart_data('Años de Lanzamiento (Por Usuarios Compartidos)', self._get_top_by_shared_users('release_years', users), 'shared')
         }
 
-    def _generate_scrobbles_charts_data(self, users: List[str]) -> Dict:
-        """Genera datos para gráficos por scrobbles totales"""
-        # Obtener todos los tops por scrobbles
-        scrobbles_data = self.database.get_top_by_total_scrobbles(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _get_user_plays(self, user: str) -> Dict[str, Dict]:
+        """Scrobbles de un usuario por entidad ({entidad: {clave: (nombres, extra, plays)}}), consultados
+        una vez por usuario; los nombres (varios en géneros) ya resueltos desde la clave"""
+        if user not in self._user_plays_cache:
+            raw = self.database.get_user_shared_plays(user, self.from_year, self.to_year, self.mbid_only)
+            raw['release_decades'] = raw['release_years']  # Mismos años, agrupados por década
+            self._user_plays_cache[user] = {
+                entity: {key: self._resolve_shared_names(entity, key) + (plays,) for key, plays in plays_by_key.items()}
+                for entity, plays_by_key in raw.items()
+            }
+        return self._user_plays_cache[user]
+
+    def _resolve_shared_names(self, entity: str, key) -> tuple:
+        """Nombres y datos extra de una clave, con el mismo formato que las consultas por usuarios compartidos"""
+        if entity == 'albums':
+            return (f"{key[0]} - {key[1]}",), {'artist': key[0], 'album': key[1]}
+        if entity == 'tracks':
+            return (f"{key[0]} - {key[1]}",), {'artist': key[0], 'track': key[1]}
+        if entity == 'genres':
+            try:
+                genres_list = json.loads(key) if key else []
+            except json.JSONDecodeError:
+                return (), {}
+            return tuple(genres_list[:3]), {}  # Solo primeros 3 géneros por artista
+        if entity == 'release_years':
+            return (str(key),), {}
+        if entity == 'release_decades':
+            # Misma etiqueta que _get_decade de la base de datos
+            decade = f"{(key // 10) * 10}s" if 1950 <= key < 2020 else ("Antes de 1950" if key < 1950 else "2020s+")
+            return (decade,), {}
+        return (key,), {}
+
+    # Entidades en las que cada clave da un único nombre (en géneros una clave da varios y en décadas
+    # varios años dan el mismo); en artista - álbum/canción se asume que no hay dos claves con el mismo nombre
+    ONE_NAME_PER_KEY = frozenset({'artists', 'albums', 'tracks', 'labels', 'release_years'})
+
+    def _aggregate_user_plays(self, entity: str, users: List[str], shared_only: bool = False) -> Dict[str, list]:
+        """Suma los scrobbles por usuario ya consultados de una combinación: {nombre: [extra, total, user_plays]},
+        con user_plays en orden de usuario. Con shared_only y solo dos usuarios basta la intersección de sus
+        claves (si cada clave da un nombre)"""
+        tallies = [(user, self._get_user_plays(user)[entity]) for user in sorted(users)]
+        keys = None
+        if shared_only and len(tallies) == 2 and entity in self.ONE_NAME_PER_KEY:
+            keys = tallies[0][1].keys() & tallies[1][1].keys()
+
+        stats = {}
+        for user, plays_by_key in tallies:
+            for key, (names, extra, plays) in plays_by_key.items():
+                if keys is not None and key not in keys:
+                    continue
+                for name in names:
+                    item = stats.get(name)
+                    if item is None:
+                        item = stats[name] = [extra, 0, {}]
+                    item[1] += plays
+                    item[2][user] = item[2].get(user, 0) + plays
+        return stats
+
+    def _get_top_by_shared_users(self, entity: str, users: List[str], limit: int = 15) -> List[Dict]:
+        """
+        Top de una entidad para una combinación de usuarios ordenado por:
+        1. Número de usuarios que lo escuchan (prioridad)
+        2. Total de scrobbles (desempate)
+        3. Nombre
+        Mismos elementos y orden que get_top_*_by_shared_users, sin consultar la base de datos, salvo en los
+        empates: SQLite no garantiza su orden y aquí se deshacen por nombre
+        """
+        result = []
+        for name, (extra, total_scrobbles, user_plays) in self._aggregate_user_plays(entity, users, shared_only=True).items():
+            if len(user_plays) >= 2:  # Solo elementos compartidos
+                item = {'name': name}
+                item.update(extra)
+                item.update({
+                    'user_count': len(user_plays),
+                    'total_scrobbles': total_scrobbles,
+                    'shared_users': list(user_plays),
+                    'user_plays': user_plays
+                })
+                result.append(item)
+
+        # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc) y por nombre
+        return heapq.nsmallest(limit, result, key=lambda x: (-x['user_count'], -x['total_scrobbles'], _name_order(x['name'])))
+
+    def _get_top_by_scrobbles(self, entity: str, users: List[str], limit: int = 15) -> List[Dict]:
+        """Top de una entidad para una combinación de usuarios solo por scrobbles totales (empates por nombre);
+        mismo resultado que get_top_*_by_scrobbles_only, sin consultar la base de datos, salvo el orden de los empates"""
+        result = []
+        for name, (extra, total_scrobbles, user_plays) in self._aggregate_user_plays(entity, users).items():
+            item = {'name': name}
+            item.update(extra)
+            item.update({
+                'user_count': len(user_plays),
+                'total_scrobbles': total_scrobbles,
+                'shared_users': list(user_plays)
+            })
+            result.append(item)
+
+        return heapq.nsmallest(limit, result, key=lambda x: (-x['total_scrobbles'], _name_order(x['name'])))
 
-        # También obtener años individuales
-        top_individual_years = self.database.get_top_individual_release_years_by_scrobbles_only(
-            users, self.from_year, self.to_year, 15, self.mbid_only
-        )
+    def _generate_scrobbles_charts_data(self, users: List[str]) -> Dict:
+        """Genera datos para gráficos por scrobbles totales (combinando en memoria los scrobbles ya
+        consultados de cada usuario)"""
+        scrobbles_data = {
+            'artists': self._get_top_by_scrobbles('artists', users),
+            'albums': self._get_top_by_scrobbles('albums', users),
+            'tracks': self._get_top_by_scrobbles('tracks', users),
+            'genres': self._get_top_by_scrobbles('genres', users),
+            'labels': self._get_top_by_scrobbles('labels', users),
+            'release_years': self._get_top_by_scrobbles('release_decades', users)
+        }
+        top_individual_years = self._get_top_by_scrobbles('release_years', users)
 
         return {
             'artists': self._prepare_pie_chart_data('Artistas (Por Scrobbles)', scrobbles_data['artists'], 'scrobbles'),
@@ -162,11 +505,97 @@ class GroupDataJSONGenerator:
             'all_combined': self._prepare_combined_chart_data(scrobbles_data)
         }
 
+    # Categorías de la evolución y entidad con cuyos nombres se resuelven sus claves
+    EVOLUTION_ENTITIES = {'artists': 'artists', 'albums': 'albums', 'tracks': 'tracks', 'genres': 'genres',
+                          'labels': 'labels', 'release_years': 'release_decades'}
+
+    def _get_user_yearly_plays(self, user: str) -> Dict[str, Dict]:
+        """Scrobbles de un usuario por categoría de evolución y año ({categoría: {año: {clave: (nombres, plays)}}}),
+        consultados una vez por usuario y reutilizados en todas sus combinaciones"""
+        if user not in self._user_yearly_plays_cache:
+            raw = self.database.get_user_yearly_plays(user, self.from_year, self.to_year, self.mbid_only)
+            self._user_yearly_plays_cache[user] = {
+                category: {
+                    year: {key: (self._resolve_shared_names(entity, key)[0], plays) for key, plays in plays_by_key.items()}
+                    for year, plays_by_key in raw[category].items()
+                }
+                for category, entity in self.EVOLUTION_ENTITIES.items()
+            }
+        return self._user_yearly_plays_cache[user]
+
+    def _get_evolution_data(self, users: List[str], limit: int = 15) -> Dict:
+        """
+        Mismo resultado que get_evolution_data de la base de datos, combinando en memoria los scrobbles por
+        año ya consultados de cada usuario: top por scrobbles de cada año, serie anual (total y desglose por
+        usuario) de todo elemento que entra en alguno de esos tops y top final por total del periodo.
+        Los empates se deshacen por nombre (en SQLite su orden no está garantizado)
+        """
+        years = list(range(self.from_year, self.to_year + 1))
+        tallies = [(user, self._get_user_yearly_plays(user)) for user in sorted(users)]
+        evolution = {}
+
+        for category in self.EVOLUTION_ENTITIES:
+            year_tops = {}
+            all_items = set()
+            for year in years:
+                year_plays = [(user, plays[category].get(year, {})) for user, plays in tallies]
+
+                # Usuarios en orden: el desglose de cada elemento sale en orden de usuario
+                stats = {}
+                for user, plays_by_key in year_plays:
+                    for names, plays in plays_by_key.values():
+                        for name in names:
+                            item = stats.get(name)
+                            if item is None:
+                                item = stats[name] = [0, {}]
+                            item[0] += plays
+                            item[1][user] = item[1].get(user, 0) + plays
+
+                top = heapq.nsmallest(limit, stats.items(), key=lambda entry: (-entry[1][0], _name_order(entry[0])))
+                if category == 'genres':
+                    # El desglose de géneros busca el género en todo el JSON del artista (no solo en los 3 primeros)
+                    top = [(name, (total, self._genre_user_breakdown(name, year_plays))) for name, (total, _) in top]
+                year_tops[year] = top
+                for name, _ in top:
+                    all_items.add(name)
+
+            series = {name: {year: {'total': 0, 'users': {}} for year in years} for name in all_items}
+            for year, top in year_tops.items():
+                for name, (total, user_plays) in top:
+                    series[name][year] = {'total': total, 'users': user_plays}
+
+            totals = {name: sum(year_data[year]['total'] for year in years) for name, year_data in series.items()}
+            top_items = sorted(totals.items(), key=lambda x: (-x[1], _name_order(x[0])))[:limit]
+            evolution[category] = {name: series[name] for name, _ in top_items}
+
+        evolution['years'] = years
+        return evolution
+
+    def _genre_user_breakdown(self, genre: str, year_plays: List[tuple]) -> Dict[str, int]:
+        """Scrobbles por usuario de un año de los artistas que tienen el género en cualquier posición de su
+        lista (no solo en los 3 primeros), como _get_user_breakdown_for_genre"""
+        breakdown = {}
+        for user, plays_by_key in year_plays:
+            plays = sum(plays for key, (_, plays) in plays_by_key.items() if genre in self._get_artist_genre_set(key))
+            if plays:
+                breakdown[user] = plays
+        return breakdown
+
+    def _get_artist_genre_set(self, genres_json) -> frozenset:
+        """Todos los géneros de un JSON de artist_genres, decodificado una sola vez"""
+        genre_set = self._artist_genre_sets.get(genres_json)
+        if genre_set is None:
+            try:
+                genres_list = json.loads(genres_json) if genres_json else []
+            except json.JSONDecodeError:
+                genres_list = []
+            genre_set = frozenset(genre for genre in genres_list if isinstance(genre, str)) if isinstance(genres_list, list) else frozenset()
+            self._artist_genre_sets[genres_json] = genre_set
+        return genre_set
+
     def _generate_evolution_data(self, users: List[str]) -> Dict:
         """Genera datos para gráficos de evolución temporal"""
-        evolution_data = self.database.get_evolution_data(
-            users, self.from_year, self.to_year, self.mbid_only
-        )
+        evolution_data = self._get_evolution_data(users)
 
         return {
             'artists': self._prepare_line_chart_data('Top 15 Artistas por Año', evolution_data['artists'], evolution_data['years']),
@@ -188,51 +617,58 @@ class GroupDataJSONGenerator:
                 'type': chart_type
             }
 
-        # Siempre usar scrobbles para el tamaño de las porciones
-        chart_data = {item['name']: item['total_scrobbles'] for item in raw_data}
-        total = sum(item['total_scrobbles'] for item in raw_data)
-
-        # Detalles para popups con user_plays incluido
+        # Una sola pasada: porciones (siempre por scrobbles), total y detalles para popups con user_plays.
+        # Las listas de usuarios se repiten mucho entre elementos: cada lista distinta va una vez en
+        # shared_user_lists y los detalles la referencian por posición (shared_users_ref)
+        chart_data = {}
         details = {}
+        user_lists = {}
+        total = 0
         for item in raw_data:
-            details[item['name']] = {
+            name = item['name']
+            scrobbles = item['total_scrobbles']
+            get = item.get
+            chart_data[name] = scrobbles
+            total += scrobbles
+            # Los campos vacíos no se escriben (el popup comprueba cada uno antes de usarlo)
+            detail = details[name] = {
                 'user_count': item['user_count'],
-                'total_scrobbles': item['total_scrobbles'],
-                'shared_users': item.get('shared_users', []),
-                'user_plays': item.get('user_plays', {}),
-                'artist': item.get('artist', ''),
-                'album': item.get('album', ''),
-                'track': item.get('track', '')
+                'total_scrobbles': scrobbles
             }
+            shared_users = get('shared_users')
+            if shared_users:
+                detail['shared_users_ref'] = user_lists.setdefault(tuple(shared_users), len(user_lists))
+            for field in ('user_plays', 'artist', 'album', 'track'):
+                value = get(field)
+                if value:
+                    detail[field] = value
 
         return {
             'title': title,
             'data': chart_data,
             'total': total,
             'details': details,
+            'shared_user_lists': [list(users) for users in user_lists],
             'type': chart_type
         }
 
     def _prepare_combined_chart_data(self, scrobbles_data: Dict) -> Dict:
         """Prepara datos combinados para el gráfico de "Todo por Scrobbles"""
-        all_items = []
-
-        # Combinar todos los tops con prefijo de categoría
-        for category, items in scrobbles_data.items():
-            for item in items[:5]:  # Solo top 5 de cada categoría para evitar saturación
-                prefixed_name = f"{category.capitalize()}: {item['name']}"
-                all_items.append({
-                    'name': prefixed_name,
-                    'original_name': item['name'],
-                    'category': category,
-                    'user_count': item['user_count'],
-                    'total_scrobbles': item['total_scrobbles'],
-                    'shared_users': item.get('shared_users', [])
-                })
-
-        # Ordenar por scrobbles y tomar top 15
-        all_items.sort(key=lambda x: x['total_scrobbles'], reverse=True)
-        top_combined = all_items[:15]
+        # Combinar todos los tops con prefijo de categoría (solo top 5 de cada categoría para evitar
+        # saturación) y quedarse con los 15 de más scrobbles sin ordenar la lista completa
+        all_items = (
+            {
+                'name': f"{category.capitalize()}: {item['name']}",
+                'original_name': item['name'],
+                'category': category,
+                'user_count': item['user_count'],
+                'total_scrobbles': item['total_scrobbles'],
+                'shared_users': item.get('shared_users', [])
+            }
+            for category, items in scrobbles_data.items()
+            for item in items[:5]
+        )
+        top_combined = heapq.nlargest(15, all_items, key=itemgetter('total_scrobbles'))
 
         chart_data = {item['name']: item['total_scrobbles'] for item in top_combined}
         total = sum(item['total_scrobbles'] for item in top_combined)
@@ -265,9 +701,14 @@ class GroupDataJSONGenerator:
                 'names': []
             }
 
+        # Claves de año ya como texto (las de JSON lo son): el serializador no convierte cada int
+        year_keys = self._year_keys
         return {
             'title': title,
-            'data': evolution_data,
+            'data': {
+                name: {year_keys[year]: values for year, values in series.items()}
+                for name, series in evolution_data.items()
+            },
             'years': years,
             'names': list(evolution_data.keys())
         }
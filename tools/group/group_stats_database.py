@@ -7,16 +7,55 @@ import sqlite3
 import json
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+
+
+class _SharedStats:
+    """Acumulador por elemento compartido (usuarios, scrobbles totales y por usuario, artista y
+    álbum/canción) con __slots__: un objeto por clave en lugar de un dict con un set y un defaultdict"""
+    __slots__ = ('users', 'total_scrobbles', 'user_plays', 'artist', 'album', 'track')
+
+    def __init__(self):
+        self.users = set()
+        self.total_scrobbles = 0
+        self.user_plays = {}
+        self.artist = ''
+        self.album = ''
+        self.track = ''
 
 
 class GroupStatsDatabase:
     """Base de datos para estadÃƒÂ­sticas grupales con optimizaciones y caching"""
 
+    # Scrobbles por usuario de cada entidad: (columnas de agrupación, origen, filtro adicional)
+    USER_PLAYS_QUERIES = {
+        'artists': ('s.artist', 'scrobbles s', ''),
+        'albums': ('s.artist, s.album', 'scrobbles s', "AND s.album IS NOT NULL AND s.album != ''"),
+        'tracks': ('s.artist, s.track', 'scrobbles s', ''),
+        'genres': ('ag.genres', 'scrobbles s JOIN artist_genres ag ON s.artist = ag.artist', ''),
+        'labels': ('al.label', 'scrobbles s JOIN album_labels al ON s.artist = al.artist AND s.album = al.album',
+                   "AND al.label IS NOT NULL AND al.label != ''"),
+        'release_years': ('ard.release_year',
+                          'scrobbles s JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album',
+                          'AND ard.release_year IS NOT NULL')
+    }
+
+    # Columnas que se rellenan con UPDATE sobre filas existentes (db/migrate_existing_data.py) y que
+    # COUNT(*) y MAX(rowid) no detectan: se cuentan sus valores no vacíos
+    FINGERPRINT_UPDATED_COLUMNS = {
+        'scrobbles': ('artist_mbid', 'album_mbid', 'track_mbid'),
+    }
+
     def __init__(self, db_path='db/lastfm_cache.db'):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Caché de sentencias amplia: las consultas especializadas por entidad y número de usuarios se repiten
+        self.conn = sqlite3.connect(db_path, cached_statements=256)
         self.conn.row_factory = sqlite3.Row
+        # WAL: varios lectores concurrentes (el análisis por niveles consulta desde varios hilos)
+        try:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        except sqlite3.OperationalError:
+            pass  # BD de solo lectura o bloqueada: se mantiene el modo de journal actual
         self._create_group_stats_table()
 
     def _create_group_stats_table(self):
@@ -38,6 +77,35 @@ class GroupStatsDatabase:
         ''')
         self.conn.commit()
 
+    def _ensure_artist_genre_flat(self, conn=None):
+        """Crea la tabla temporal artist_genre_flat en la conexión (por defecto la principal) si aún no
+        existe: una vez por conexión y solo en las que consultan géneros"""
+        conn = conn or self.conn
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_temp_master WHERE type = 'table' AND name = 'artist_genre_flat'"
+        ).fetchone()
+        if not exists:
+            self._create_artist_genre_flat_table(conn)
+
+    def _create_artist_genre_flat_table(self, conn):
+        """Tabla temporal (por conexión) con los 3 primeros géneros de cada artista ya extraídos del
+        JSON de artist_genres, indexada por artista para los JOIN"""
+        try:
+            conn.executescript('''
+                DROP TABLE IF EXISTS temp.artist_genre_flat;
+                CREATE TEMP TABLE artist_genre_flat AS
+                    SELECT ag.artist, CAST(j.key AS INTEGER) AS genre_rank, j.value AS genre
+                    FROM artist_genres ag, json_each(ag.genres) j
+                    WHERE json_valid(ag.genres) AND json_type(ag.genres) = 'array' AND j.key < 3;
+                CREATE INDEX temp.idx_artist_genre_flat_artist ON artist_genre_flat(artist);
+            ''')
+        except sqlite3.OperationalError:
+            # Base de datos sin artist_genres (o sin JSON1): no hay géneros que cruzar
+            conn.executescript('''
+                DROP TABLE IF EXISTS temp.artist_genre_flat;
+                CREATE TEMP TABLE artist_genre_flat (artist TEXT, genre_rank INTEGER, genre TEXT);
+            ''')
+
     def _get_mbid_filter(self, mbid_only: bool, table_alias: str = 's') -> str:
         """Genera filtro MBID segÃƒÂºn los parÃƒÂ¡metros"""
         if not mbid_only:
@@ -48,6 +116,21 @@ class GroupStatsDatabase:
             ({table_alias}.track_mbid IS NOT NULL AND {table_alias}.track_mbid != '')
         )"""
 
+    def get_data_fingerprint(self) -> str:
+        """Huella barata del contenido de las tablas que alimentan las estadísticas (filas, último rowid y
+        MBIDs rellenados): cambia al añadir, reemplazar o borrar scrobbles, géneros, sellos o fechas de
+        lanzamiento, y al completar los MBID de scrobbles ya existentes"""
+        parts = []
+        for table in ('scrobbles', 'artist_genres', 'album_labels', 'album_release_dates'):
+            columns = ''.join(f", SUM({column} IS NOT NULL AND {column} != '')"
+                              for column in self.FINGERPRINT_UPDATED_COLUMNS.get(table, ()))
+            try:
+                row = self.conn.execute(f'SELECT COUNT(*), MAX(rowid){columns} FROM {table}').fetchone()
+                parts.append(f"{table}:" + ':'.join(str(value) for value in row))
+            except sqlite3.OperationalError:
+                parts.append(f"{table}:-")  # Tabla inexistente en esta base de datos
+        return '|'.join(parts)
+
     def get_top_artists_by_shared_users(self, users: List[str], from_year: int, to_year: int,
                                       limit: int = 15, mbid_only: bool = False) -> List[Dict]:
         """
@@ -70,28 +153,31 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar por artista con user_plays
-        artist_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
+        artist_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             artist = row['artist']
             user = row['user']
             plays = row['plays']
-            artist_stats[artist]['users'].add(user)
-            artist_stats[artist]['total_scrobbles'] += plays
-            artist_stats[artist]['user_plays'][user] += plays
+            stats = artist_stats.get(artist)
+            if stats is None:
+                stats = artist_stats[artist] = _SharedStats()
+            stats.users.add(user)
+            stats.total_scrobbles += plays
+            stats.user_plays[user] = stats.user_plays.get(user, 0) + plays
 
         # Filtrar y ordenar
         result = []
         max_users = len(users)
 
         for artist, stats in artist_stats.items():
-            if len(stats['users']) >= 2:  # Solo artistas compartidos
+            if len(stats.users) >= 2:  # Solo artistas compartidos
                 result.append({
                     'name': artist,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -121,30 +207,33 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar por ÃƒÂ¡lbum con user_plays
-        album_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int), 'artist': '', 'album': ''})
+        album_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             album_key = row['album_name']
             user = row['user']
             plays = row['plays']
-            album_stats[album_key]['users'].add(user)
-            album_stats[album_key]['total_scrobbles'] += plays
-            album_stats[album_key]['user_plays'][user] += plays
-            album_stats[album_key]['artist'] = row['artist']
-            album_stats[album_key]['album'] = row['album']
+            stats = album_stats.get(album_key)
+            if stats is None:
+                stats = album_stats[album_key] = _SharedStats()
+            stats.users.add(user)
+            stats.total_scrobbles += plays
+            stats.user_plays[user] = stats.user_plays.get(user, 0) + plays
+            stats.artist = row['artist']
+            stats.album = row['album']
 
         # Filtrar y ordenar
         result = []
         for album_name, stats in album_stats.items():
-            if len(stats['users']) >= 2:  # Solo ÃƒÂ¡lbumes compartidos
+            if len(stats.users) >= 2:  # Solo ÃƒÂ¡lbumes compartidos
                 result.append({
                     'name': album_name,
-                    'artist': stats['artist'],
-                    'album': stats['album'],
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'artist': stats.artist,
+                    'album': stats.album,
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -173,30 +262,33 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar por canciÃƒÂ³n con user_plays
-        track_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int), 'artist': '', 'track': ''})
+        track_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             track_key = row['track_name']
             user = row['user']
             plays = row['plays']
-            track_stats[track_key]['users'].add(user)
-            track_stats[track_key]['total_scrobbles'] += plays
-            track_stats[track_key]['user_plays'][user] += plays
-            track_stats[track_key]['artist'] = row['artist']
-            track_stats[track_key]['track'] = row['track']
+            stats = track_stats.get(track_key)
+            if stats is None:
+                stats = track_stats[track_key] = _SharedStats()
+            stats.users.add(user)
+            stats.total_scrobbles += plays
+            stats.user_plays[user] = stats.user_plays.get(user, 0) + plays
+            stats.artist = row['artist']
+            stats.track = row['track']
 
         # Filtrar y ordenar
         result = []
         for track_name, stats in track_stats.items():
-            if len(stats['users']) >= 2:  # Solo canciones compartidas
+            if len(stats.users) >= 2:  # Solo canciones compartidas
                 result.append({
                     'name': track_name,
-                    'artist': stats['artist'],
-                    'track': stats['track'],
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'artist': stats.artist,
+                    'track': stats.track,
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -222,28 +314,31 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar gÃƒÂ©neros JSON
-        genre_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
+        genre_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             try:
                 genres_list = json.loads(row['genres']) if row['genres'] else []
                 for genre in genres_list[:3]:  # Solo primeros 3 gÃƒÂ©neros por artista
-                    genre_stats[genre]['users'].add(row['user'])
-                    genre_stats[genre]['total_scrobbles'] += row['plays']
-                    genre_stats[genre]['user_plays'][row['user']] += row['plays']
+                    stats = genre_stats.get(genre)
+                    if stats is None:
+                        stats = genre_stats[genre] = _SharedStats()
+                    stats.users.add(row['user'])
+                    stats.total_scrobbles += row['plays']
+                    stats.user_plays[row['user']] = stats.user_plays.get(row['user'], 0) + row['plays']
             except json.JSONDecodeError:
                 continue
 
         # Filtrar y ordenar
         result = []
         for genre, stats in genre_stats.items():
-            if len(stats['users']) >= 2:  # Solo gÃƒÂ©neros compartidos
+            if len(stats.users) >= 2:  # Solo gÃƒÂ©neros compartidos
                 result.append({
                     'name': genre,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -270,26 +365,29 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar por sello con user_plays
-        label_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
+        label_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             label = row['label']
             user = row['user']
             plays = row['plays']
-            label_stats[label]['users'].add(user)
-            label_stats[label]['total_scrobbles'] += plays
-            label_stats[label]['user_plays'][user] += plays
+            stats = label_stats.get(label)
+            if stats is None:
+                stats = label_stats[label] = _SharedStats()
+            stats.users.add(user)
+            stats.total_scrobbles += plays
+            stats.user_plays[user] = stats.user_plays.get(user, 0) + plays
 
         # Filtrar y ordenar
         result = []
         for label, stats in label_stats.items():
-            if len(stats['users']) >= 2:  # Solo sellos compartidos
+            if len(stats.users) >= 2:  # Solo sellos compartidos
                 result.append({
                     'name': label,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -317,35 +415,43 @@ class GroupStatsDatabase:
 
         if use_decades:
             # Procesar por dÃƒÂ©cadas
-            period_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
-
-            for row in cursor.fetchall():
-                decade = self._get_decade(row['release_year'])
-                period_stats[decade]['users'].add(row['user'])
-                period_stats[decade]['total_scrobbles'] += row['plays']
-                period_stats[decade]['user_plays'][row['user']] += row['plays']
+            period_stats = {}
+
+            for row in cursor:
+                year = row['release_year']
+                # Misma etiqueta que _get_decade, sin llamada a función por fila
+                decade = f"{(year // 10) * 10}s" if 1950 <= year < 2020 else ("Antes de 1950" if year < 1950 else "2020s+")
+                stats = period_stats.get(decade)
+                if stats is None:
+                    stats = period_stats[decade] = _SharedStats()
+                stats.users.add(row['user'])
+                stats.total_scrobbles += row['plays']
+                stats.user_plays[row['user']] = stats.user_plays.get(row['user'], 0) + row['plays']
         else:
             # Procesar por aÃƒÂ±os individuales
-            period_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0, 'user_plays': defaultdict(int)})
+            period_stats = {}
 
-            for row in cursor.fetchall():
+            for row in cursor:
                 year = str(row['release_year'])
-                period_stats[year]['users'].add(row['user'])
-                period_stats[year]['total_scrobbles'] += row['plays']
-                period_stats[year]['user_plays'][row['user']] += row['plays']
+                stats = period_stats.get(year)
+                if stats is None:
+                    stats = period_stats[year] = _SharedStats()
+                stats.users.add(row['user'])
+                stats.total_scrobbles += row['plays']
+                stats.user_plays[row['user']] = stats.user_plays.get(row['user'], 0) + row['plays']
 
         # Filtrar y ordenar por usuarios compartidos primero, luego por scrobbles
         result = []
         max_users = len(users)
 
         for period, stats in period_stats.items():
-            if len(stats['users']) >= 2:  # Solo perÃƒÂ­odos compartidos
+            if len(stats.users) >= 2:  # Solo perÃƒÂ­odos compartidos
                 result.append({
                     'name': period,
-                    'user_count': len(stats['users']),
-                    'total_scrobbles': stats['total_scrobbles'],
-                    'shared_users': list(stats['users']),
-                    'user_plays': dict(stats['user_plays'])
+                    'user_count': len(stats.users),
+                    'total_scrobbles': stats.total_scrobbles,
+                    'shared_users': list(stats.users),
+                    'user_plays': stats.user_plays
                 })
 
         # Ordenar: primero por usuarios compartidos (desc), luego por scrobbles (desc)
@@ -362,6 +468,72 @@ class GroupStatsDatabase:
         """Top aÃƒÂ±os individuales de lanzamiento por usuarios compartidos"""
         return self.get_top_release_years_by_shared_users(users, from_year, to_year, limit, mbid_only, use_decades=False)
 
+    def get_user_shared_plays(self, user: str, from_year: int, to_year: int,
+                              mbid_only: bool = False) -> Dict[str, Dict]:
+        """
+        Scrobbles de un usuario agrupados con las mismas claves que las consultas por usuarios compartidos,
+        para combinar usuarios en memoria sin volver a consultar por cada combinación:
+        artists (artista), albums (artista, álbum), tracks (artista, canción), genres (JSON de géneros
+        del artista), labels (sello) y release_years (año de lanzamiento) -> {clave: plays}
+        """
+        cursor = self.conn.cursor()
+        from_timestamp = int(datetime(from_year, 1, 1).timestamp())
+        to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
+        mbid_filter = self._get_mbid_filter(mbid_only)
+        params = [user, from_timestamp, to_timestamp]
+
+        result = {}
+        for entity, (group_by, from_clause, extra_filter) in self.USER_PLAYS_QUERIES.items():
+            cursor.execute(f'''
+                SELECT {group_by}, COUNT(*) as plays
+                FROM {from_clause}
+                WHERE s.user = ?
+                  AND s.timestamp >= ? AND s.timestamp <= ?
+                  {extra_filter}
+                {mbid_filter}
+                GROUP BY {group_by}
+            ''', params)
+            if ',' in group_by:
+                result[entity] = {(row[0], row[1]): row['plays'] for row in cursor}
+            else:
+                result[entity] = {row[0]: row['plays'] for row in cursor}
+        return result
+
+    def get_user_yearly_plays(self, user: str, from_year: int, to_year: int,
+                              mbid_only: bool = False) -> Dict[str, Dict]:
+        """
+        Scrobbles de un usuario por año de escucha, con las mismas claves que get_user_shared_plays
+        ({entidad: {año: {clave: plays}}}), para calcular en memoria la evolución de cualquier
+        combinación de usuarios sin volver a consultar año a año
+        """
+        cursor = self.conn.cursor()
+        from_timestamp = int(datetime(from_year, 1, 1).timestamp())
+        to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
+        mbid_filter = self._get_mbid_filter(mbid_only)
+        params = [user, from_timestamp, to_timestamp]
+
+        result = {}
+        for entity, (group_by, from_clause, extra_filter) in self.USER_PLAYS_QUERIES.items():
+            # Año en hora local, igual que los límites de cada año en las consultas por periodo
+            cursor.execute(f'''
+                SELECT CAST(strftime('%Y', s.timestamp, 'unixepoch', 'localtime') AS INTEGER) as year,
+                       {group_by}, COUNT(*) as plays
+                FROM {from_clause}
+                WHERE s.user = ?
+                  AND s.timestamp >= ? AND s.timestamp <= ?
+                  {extra_filter}
+                {mbid_filter}
+                GROUP BY year, {group_by}
+            ''', params)
+            by_year = result[entity] = {}
+            if ',' in group_by:
+                for row in cursor:
+                    by_year.setdefault(row[0], {})[(row[1], row[2])] = row['plays']
+            else:
+                for row in cursor:
+                    by_year.setdefault(row[0], {})[row[1]] = row['plays']
+        return result
+
     def get_top_by_total_scrobbles(self, users: List[str], from_year: int, to_year: int,
                                  limit: int = 15, mbid_only: bool = False) -> Dict[str, List[Dict]]:
         """
@@ -406,7 +578,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_albums_by_scrobbles_only(self, users: List[str], from_year: int, to_year: int,
@@ -443,7 +615,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_tracks_by_scrobbles_only(self, users: List[str], from_year: int, to_year: int,
@@ -479,7 +651,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_genres_by_scrobbles_only(self, users: List[str], from_year: int, to_year: int,
@@ -501,14 +673,17 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp])
 
         # Procesar gÃƒÂ©neros JSON
-        genre_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0})
+        genre_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             try:
                 genres_list = json.loads(row['genres']) if row['genres'] else []
                 for genre in genres_list[:3]:
-                    genre_stats[genre]['users'].add(row['user'])
-                    genre_stats[genre]['total_scrobbles'] += row['plays']
+                    stats = genre_stats.get(genre)
+                    if stats is None:
+                        stats = genre_stats[genre] = _SharedStats()
+                    stats.users.add(row['user'])
+                    stats.total_scrobbles += row['plays']
             except json.JSONDecodeError:
                 continue
 
@@ -517,9 +692,9 @@ class GroupStatsDatabase:
         for genre, stats in genre_stats.items():
             result.append({
                 'name': genre,
-                'user_count': len(stats['users']),
-                'total_scrobbles': stats['total_scrobbles'],
-                'shared_users': list(stats['users'])
+                'user_count': len(stats.users),
+                'total_scrobbles': stats.total_scrobbles,
+                'shared_users': list(stats.users)
             })
 
         result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
@@ -556,7 +731,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_release_years_by_scrobbles_only(self, users: List[str], from_year: int, to_year: int,
@@ -578,20 +753,25 @@ class GroupStatsDatabase:
             GROUP BY ard.release_year, user
         ''', users + [from_timestamp, to_timestamp])
 
-        decade_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0})
+        decade_stats = {}
 
-        for row in cursor.fetchall():
-            decade = self._get_decade(row['release_year'])
-            decade_stats[decade]['users'].add(row['user'])
-            decade_stats[decade]['total_scrobbles'] += row['plays']
+        for row in cursor:
+            year = row['release_year']
+            # Misma etiqueta que _get_decade, sin llamada a función por fila
+            decade = f"{(year // 10) * 10}s" if 1950 <= year < 2020 else ("Antes de 1950" if year < 1950 else "2020s+")
+            stats = decade_stats.get(decade)
+            if stats is None:
+                stats = decade_stats[decade] = _SharedStats()
+            stats.users.add(row['user'])
+            stats.total_scrobbles += row['plays']
 
         result = []
         for decade, stats in decade_stats.items():
             result.append({
                 'name': decade,
-                'user_count': len(stats['users']),
-                'total_scrobbles': stats['total_scrobbles'],
-                'shared_users': list(stats['users'])
+                'user_count': len(stats.users),
+                'total_scrobbles': stats.total_scrobbles,
+                'shared_users': list(stats.users)
             })
 
         result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
@@ -616,20 +796,23 @@ class GroupStatsDatabase:
             GROUP BY ard.release_year, user
         ''', users + [from_timestamp, to_timestamp])
 
-        year_stats = defaultdict(lambda: {'users': set(), 'total_scrobbles': 0})
+        year_stats = {}
 
-        for row in cursor.fetchall():
+        for row in cursor:
             year = str(row['release_year'])
-            year_stats[year]['users'].add(row['user'])
-            year_stats[year]['total_scrobbles'] += row['plays']
+            stats = year_stats.get(year)
+            if stats is None:
+                stats = year_stats[year] = _SharedStats()
+            stats.users.add(row['user'])
+            stats.total_scrobbles += row['plays']
 
         result = []
         for year, stats in year_stats.items():
             result.append({
                 'name': year,
-                'user_count': len(stats['users']),
-                'total_scrobbles': stats['total_scrobbles'],
-                'shared_users': list(stats['users'])
+                'user_count': len(stats.users),
+                'total_scrobbles': stats.total_scrobbles,
+                'shared_users': list(stats.users)
             })
 
         result.sort(key=lambda x: x['total_scrobbles'], reverse=True)
@@ -834,7 +1017,7 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp, len(users)])
 
         genre_count = 0
-        for row in cursor.fetchall():
+        for row in cursor:
             try:
                 genres_list = json.loads(row['genres']) if row['genres'] else []
                 genre_count += len(genres_list[:3])  # Contar hasta 3 gÃ©neros por artista
@@ -875,8 +1058,10 @@ class GroupStatsDatabase:
         ''', users + [from_timestamp, to_timestamp, len(users)])
 
         decade_count = set()
-        for row in cursor.fetchall():
-            decade = self._get_decade(row['release_year'])
+        for row in cursor:
+            year = row['release_year']
+            # Misma etiqueta que _get_decade, sin llamada a función por fila
+            decade = f"{(year // 10) * 10}s" if 1950 <= year < 2020 else ("Antes de 1950" if year < 1950 else "2020s+")
             decade_count.add(decade)
         results['shared_release_years'] = len(decade_count)
 
@@ -914,7 +1099,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_albums_for_label(self, label: str, users: List[str], from_year: int, to_year: int,
@@ -954,7 +1139,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
     def get_top_artists_for_period(self, period: str, users: List[str], from_year: int, to_year: int,
@@ -1003,7 +1188,7 @@ class GroupStatsDatabase:
                 'total_scrobbles': row['total_scrobbles'],
                 'shared_users': row['shared_users'].split(',') if row['shared_users'] else []
             }
-            for row in cursor.fetchall()
+            for row in cursor
         ]
 
 
@@ -1024,7 +1209,7 @@ class GroupStatsDatabase:
             GROUP BY user
         ''', users + [artist, from_timestamp, to_timestamp])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
     def _get_user_breakdown_for_album(self, users: List[str], artist: str, album: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, int]:
         """Obtiene el desglose de scrobbles por usuario para un Ã¡lbum especÃ­fico"""
@@ -1043,7 +1228,7 @@ class GroupStatsDatabase:
             GROUP BY user
         ''', users + [artist, album, from_timestamp, to_timestamp])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
     def _get_user_breakdown_for_track(self, users: List[str], artist: str, track: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, int]:
         """Obtiene el desglose de scrobbles por usuario para una canciÃ³n especÃ­fica"""
@@ -1062,7 +1247,7 @@ class GroupStatsDatabase:
             GROUP BY user
         ''', users + [artist, track, from_timestamp, to_timestamp])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
     def _get_user_breakdown_for_genre(self, users: List[str], genre: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, int]:
         """Obtiene el desglose de scrobbles por usuario para un gÃ©nero especÃ­fico"""
@@ -1082,7 +1267,7 @@ class GroupStatsDatabase:
             GROUP BY s.user
         ''', users + [from_timestamp, to_timestamp, f'%"{genre}"%'])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
     def _get_user_breakdown_for_label(self, users: List[str], label: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, int]:
         """Obtiene el desglose de scrobbles por usuario para un sello especÃ­fico"""
@@ -1102,7 +1287,7 @@ class GroupStatsDatabase:
             GROUP BY s.user
         ''', users + [from_timestamp, to_timestamp, label])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
     def _get_user_breakdown_for_release_year(self, users: List[str], period: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, int]:
         """Obtiene el desglose de scrobbles por usuario para un perÃ­odo de lanzamiento especÃ­fico"""
@@ -1132,7 +1317,7 @@ class GroupStatsDatabase:
             GROUP BY s.user
         ''', users + [from_timestamp, to_timestamp])
 
-        return {row['user']: row['plays'] for row in cursor.fetchall()}
+        return {row['user']: row['plays'] for row in cursor}
 
 
     def _get_decade(self, year: int) -> str:
@@ -3,20 +3,48 @@
 GroupStatsHTMLGenerator - Clase para generar HTML con gráficos interactivos de estadísticas grupales
 """
 
+import html
 import json
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, TextIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Separador de miles con punto: traducción de un carácter en una sola pasada
+_THOUSANDS_DOT = str.maketrans(',', '.')
 
 
 class GroupStatsHTMLGenerator:
     """Clase para generar HTML con gráficos interactivos de estadísticas grupales"""
 
+    # Paleta fija, compartida por todas las instancias
+    colors = [
+        '#cba6f7', '#f38ba8', '#fab387', '#f9e2af', '#a6e3a1',
+        '#94e2d5', '#89dceb', '#74c7ec', '#89b4fa', '#b4befe',
+        '#f5c2e7', '#f2cdcd', '#ddb6f2', '#ffc6ff', '#caffbf'
+    ]
+
+    # Campos de group_stats que lee la página (el resto no se incrusta): datos generales, totales de
+    # scrobbles del resumen y, por nivel y categoría, el HTML ya montado de la vista de datos
+    PAGE_STATS_KEYS = ('period', 'users', 'user_count', 'generated_at', 'total_counts')
+    SUMMARY_SCROBBLES_CHARTS = ('artists', 'all_combined')
+
+    # Categorías de la vista de datos, en el orden en que se muestran, y su título
+    DATA_CATEGORY_TITLES = {
+        'artists': 'Artistas',
+        'albums': 'Álbumes',
+        'tracks': 'Canciones',
+        'genres': 'Géneros',
+        'labels': 'Sellos',
+        'decades': 'Décadas'
+    }
+
     def __init__(self):
-        self.colors = [
-            '#cba6f7', '#f38ba8', '#fab387', '#f9e2af', '#a6e3a1',
-            '#94e2d5', '#89dceb', '#74c7ec', '#89b4fa', '#b4befe',
-            '#f5c2e7', '#f2cdcd', '#ddb6f2', '#ffc6ff', '#caffbf'
-        ]
+        # La paleta no cambia entre llamadas: se serializa una sola vez
+        self._colors_json = self._to_json(self.colors)
 
     def _get_user_icons(self):
         """Obtiene los iconos de usuarios desde variables de entorno"""
@@ -31,12 +59,89 @@ class GroupStatsHTMLGenerator:
                     user_icons[user.strip()] = icon.strip()
         return user_icons
 
-    def generate_html(self, group_stats: Dict, years_back: int, period_folder: str = None) -> str:
-        """Genera el HTML completo para estadísticas grupales"""
-        stats_json = json.dumps(group_stats, indent=2, ensure_ascii=False)
-        colors_json = json.dumps(self.colors, ensure_ascii=False)
+    def _to_json(self, data) -> str:
+        """Serializa a JSON compacto con orjson si está disponible (claves no-str incluidas), si no con json"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    def _project_page_stats(self, group_stats: Dict) -> Dict:
+        """Copia reducida de group_stats con solo los campos que lee el script de la página (los gráficos
+        por combinación de usuarios se cargan aparte desde data/)"""
+        page_stats = {key: group_stats[key] for key in self.PAGE_STATS_KEYS if key in group_stats}
+
+        scrobbles_charts = group_stats.get('scrobbles_charts')
+        if scrobbles_charts is not None:
+            page_stats['scrobbles_charts'] = {
+                chart: {'total': scrobbles_charts[chart].get('total', 0)}
+                for chart in self.SUMMARY_SCROBBLES_CHARTS if chart in scrobbles_charts
+            }
+
+        # Vista de datos: un fragmento HTML por nivel y categoría con elementos (la página solo lo inserta)
+        data_by_levels = group_stats.get('data_by_levels')
+        if data_by_levels is not None:
+            page_stats['data_by_levels'] = {
+                level_key: {
+                    category: self._render_data_category(category, level_data[category])
+                    for category in self.DATA_CATEGORY_TITLES if level_data.get(category)
+                }
+                for level_key, level_data in data_by_levels.items()
+            }
+        return page_stats
+
+    def _render_data_category(self, category: str, items: List[Dict]) -> str:
+        """HTML de una categoría de la vista de datos, igual al que montaba renderDataView elemento a
+        elemento; los usuarios de cada elemento van en data-users/data-user para destacarlos en la página"""
+        escape = html.escape
+        format_number = self._format_number
+        parts = [f'<div class="data-category visible"><h4>{self.DATA_CATEGORY_TITLES[category]} ({len(items)})</h4>']
+        for item in items:
+            parts.append(
+                f'<div class="data-item" data-users="{escape(" ".join(item.get("users", ())))}">'
+                f'<div class="data-item-name">{escape(item["name"] or "")}</div>'
+                f'<div class="data-item-meta"><span class="data-badge">{format_number(item["count"])} plays</span>'
+            )
+            # Usuarios por scrobbles descendente (orden estable en empates, como el sort del navegador)
+            for user, plays in sorted(item.get('user_counts', {}).items(), key=lambda entry: entry[1], reverse=True):
+                user_html = escape(user)
+                parts.append(f'<span class="data-user-badge" data-user="{user_html}">{user_html} ({format_number(plays)})</span>')
+            parts.append('</div></div>')
+        parts.append('</div>')
+        return ''.join(parts)
+
+    def _write_json(self, out: TextIO, data):
+        """Escribe el JSON compacto de _to_json en el stream; sin orjson, por trozos con iterencode
+        (sin montar antes el JSON entero en un string)"""
+        if orjson is not None:
+            out.write(self._to_json(data))
+        else:
+            out.writelines(json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).iterencode(data))
+
+    def generate_html(self, group_stats: Dict, years_back: int, period_folder: str = None,
+                      out: Optional[TextIO] = None) -> Optional[str]:
+        """Genera el HTML completo para estadísticas grupales.
+
+        Si se pasa out, el HTML se escribe por partes en ese stream y se devuelve None;
+        si no, se devuelve como string.
+        """
+        page_stats = self._project_page_stats(group_stats)
+        html_tail = self._html_tail(group_stats, years_back, period_folder)
+
+        if out is None:
+            # Tres trozos ya serializados: join reserva el string final de una vez, sin buffer intermedio
+            return ''.join((_HTML_HEAD, self._to_json(page_stats), html_tail))
+
+        # El JSON de estadísticas (la parte grande) se escribe aparte, sin concatenarlo a la plantilla
+        out.write(_HTML_HEAD)
+        self._write_json(out, page_stats)
+        out.write(html_tail)
+        return None
+
+    def _html_tail(self, group_stats: Dict, years_back: int, period_folder: str = None) -> str:
+        """Resto de la página tras el JSON de estadísticas: paleta, iconos, carpeta del periodo y plantilla final"""
+        colors_json = self._colors_json
         user_icons = self._get_user_icons()
-        user_icons_json = json.dumps(user_icons, ensure_ascii=False)
+        user_icons_json = self._to_json(user_icons)
 
         # Si no se proporciona period_folder, calcularlo desde group_stats
         if period_folder is None:
@@ -49,7 +154,21 @@ class GroupStatsHTMLGenerator:
                 from_year = current_year - years_back
                 period_folder = f"{from_year}-{current_year}"
 
-        return f"""<!DOCTYPE html>
+        return ''.join((
+            ';\n        const colors = ', colors_json,
+            ';\n        const userIcons = ', user_icons_json,
+            ';\n        const periodFolder = "', period_folder, '";',
+            _HTML_TAIL
+        ))
+
+    def _format_number(self, number: int) -> str:
+        """Formatea números con separadores de miles"""
+        return format(number, ',').translate(_THOUSANDS_DOT)
+
+
+# Plantilla de la página: texto fijo (sin f-string) antes y después de los datos incrustados, que
+# generate_html solo escribe junto a los JSON serializados de cada llamada
+_HTML_HEAD = """<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
@@ -58,24 +177,24 @@ class GroupStatsHTMLGenerator:
     <link rel="icon" type="image/png" href="images/music.png">
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
     <style>
-        :root {{
+        :root {
             --page-padding: 16px;
-        }}
-        * {{
+        }
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
 
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             background: #1e1e2e;
             color: #cdd6f4;
             padding: var(--page-padding);
             line-height: 1.6;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 1600px;
             margin: 0 auto;
             background: #181825;
@@ -83,36 +202,36 @@ class GroupStatsHTMLGenerator:
             box-shadow: 0 8px 32px rgba(0,0,0,0.3);
             overflow: hidden;
             position: relative;
-        }}
+        }
 
-        header {{
+        header {
             background: #1e1e2e;
             padding: 30px;
             border-bottom: 2px solid #cba6f7;
-        }}
+        }
 
-        h1 {{
+        h1 {
             font-size: 1.8em;
             color: #cba6f7;
             margin-bottom: 10px;
-        }}
+        }
 
-        @media (max-width: 768px) {{
-            h1 {{
+        @media (max-width: 768px) {
+            h1 {
                 font-size: 1.4em;
-            }}
-            :root {{
+            }
+            :root {
                 --page-padding: 6px;
-            }}
-        }}
+            }
+        }
 
-        .subtitle {{
+        .subtitle {
             color: #a6adc8;
             font-size: 1em;
-        }}
+        }
 
         /* Botón de usuario circular */
-        .user-button {{
+        .user-button {
             position: fixed;
             top: 20px;
             right: 20px;
@@ -131,22 +250,22 @@ class GroupStatsHTMLGenerator:
             display: flex;
             align-items: center;
             justify-content: center;
-        }}
+        }
 
-        .user-button:hover {{
+        .user-button:hover {
             background: #ddb6f2;
             transform: scale(1.1);
-        }}
+        }
 
-        .user-button img {{
+        .user-button img {
             width: 100%;
             height: 100%;
             border-radius: 50%;
             object-fit: cover;
-        }}
+        }
 
         /* Modal de selección de usuario */
-        .user-modal {{
+        .user-modal {
             position: fixed;
             top: 0;
             left: 0;
@@ -155,9 +274,9 @@ class GroupStatsHTMLGenerator:
             background: rgba(0,0,0,0.7);
             z-index: 999;
             display: none;
-        }}
+        }
 
-        .user-modal-content {{
+        .user-modal-content {
             position: absolute;
             top: 50%;
             left: 50%;
@@ -168,23 +287,23 @@ class GroupStatsHTMLGenerator:
             padding: 20px;
             max-width: 400px;
             width: 90%;
-        }}
+        }
 
-        .user-modal-header {{
+        .user-modal-header {
             color: #cba6f7;
             font-size: 1.0em;
             font-weight: 500;
             margin-bottom: 15px;
             text-align: center;
-        }}
+        }
 
-        .user-options {{
+        .user-options {
             display: flex;
             flex-direction: column;
             gap: 10px;
-        }}
+        }
 
-        .user-option {{
+        .user-option {
             padding: 12px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -197,27 +316,27 @@ class GroupStatsHTMLGenerator:
             align-items: center;
             justify-content: center;
             gap: 8px;
-        }}
+        }
 
-        .user-option img {{
+        .user-option img {
             width: 24px;
             height: 24px;
             border-radius: 50%;
             object-fit: cover;
-        }}
+        }
 
-        .user-option:hover {{
+        .user-option:hover {
             border-color: #cba6f7;
             background: #45475a;
-        }}
+        }
 
-        .user-option.selected {{
+        .user-option.selected {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .user-modal-close {{
+        .user-modal-close {
             display: block;
             margin: 15px auto 0;
             padding: 8px 16px;
@@ -226,13 +345,13 @@ class GroupStatsHTMLGenerator:
             border: none;
             border-radius: 6px;
             cursor: pointer;
-        }}
+        }
 
-        .user-modal-close:hover {{
+        .user-modal-close:hover {
             background: #6c7086;
-        }}
+        }
 
-        .controls {{
+        .controls {
             padding: var(--page-padding);
             background: #1e1e2e;
             border-bottom: 1px solid #313244;
@@ -240,26 +359,26 @@ class GroupStatsHTMLGenerator:
             gap: 20px;
             flex-wrap: wrap;
             align-items: center;
-        }}
+        }
 
-        .control-group {{
+        .control-group {
             display: flex;
             gap: 15px;
             align-items: center;
-        }}
+        }
 
-        label {{
+        label {
             color: #cba6f7;
             font-weight: 600;
-        }}
+        }
 
-        .view-buttons {{
+        .view-buttons {
             display: flex;
             gap: 10px;
             flex-wrap: wrap;
-        }}
+        }
 
-        .view-btn {{
+        .view-btn {
             padding: 8px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -269,136 +388,136 @@ class GroupStatsHTMLGenerator:
             transition: all 0.3s;
             font-size: 0.9em;
             font-weight: 600;
-        }}
+        }
 
-        .view-btn:hover {{
+        .view-btn:hover {
             border-color: #cba6f7;
             background: #45475a;
-        }}
+        }
 
-        .view-btn.active {{
+        .view-btn.active {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .stats-container {{
+        .stats-container {
             padding: var(--page-padding);
-        }}
+        }
 
-        .view {{
+        .view {
             display: none;
-        }}
+        }
 
-        .view.active {{
+        .view.active {
             display: block;
-        }}
+        }
 
-        .charts-grid {{
+        .charts-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(500px, 1fr));
             gap: 25px;
             margin-bottom: 30px;
-        }}
+        }
 
-        .chart-container {{
+        .chart-container {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 20px;
             border: 1px solid #313244;
-        }}
+        }
 
-        .chart-container h3 {{
+        .chart-container h3 {
             color: #cba6f7;
             font-size: 1.2em;
             margin-bottom: 15px;
             text-align: center;
-        }}
+        }
 
-        .chart-wrapper {{
+        .chart-wrapper {
             position: relative;
             height: 300px;
             margin-bottom: 10px;
-        }}
+        }
 
-        .chart-info {{
+        .chart-info {
             text-align: center;
             color: #a6adc8;
             font-size: 0.9em;
-        }}
+        }
 
-        .evolution-section {{
+        .evolution-section {
             margin-bottom: 40px;
-        }}
+        }
 
-        .evolution-section h3 {{
+        .evolution-section h3 {
             color: #cba6f7;
             font-size: 1.3em;
             margin-bottom: 20px;
             border-bottom: 2px solid #cba6f7;
             padding-bottom: 10px;
-        }}
+        }
 
-        .evolution-charts {{
+        .evolution-charts {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(600px, 1fr));
             gap: 25px;
-        }}
+        }
 
-        .evolution-chart {{
+        .evolution-chart {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 20px;
             border: 1px solid #313244;
-        }}
+        }
 
-        .evolution-chart h4 {{
+        .evolution-chart h4 {
             color: #cba6f7;
             font-size: 1.1em;
             margin-bottom: 15px;
             text-align: center;
-        }}
+        }
 
-        .line-chart-wrapper {{
+        .line-chart-wrapper {
             position: relative;
             height: 400px;
-        }}
+        }
 
-        .no-data {{
+        .no-data {
             text-align: center;
             padding: 40px;
             color: #6c7086;
             font-style: italic;
-        }}
+        }
 
-        .summary-stats {{
+        .summary-stats {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(120px, 1fr));
             gap: 10px;
             margin-bottom: 30px;
-        }}
+        }
 
-        .summary-card {{
+        .summary-card {
             background: #1e1e2e;
             padding: 10px;
             border-radius: 8px;
             border: 1px solid #313244;
             text-align: center;
-        }}
+        }
 
-        .summary-card .number {{
+        .summary-card .number {
             font-size: 1.4em;
             font-weight: 600;
             color: #cba6f7;
             margin-bottom: 3px;
-        }}
+        }
 
-        .summary-card .label {{
+        .summary-card .label {
             font-size: 0.8em;
             color: #a6adc8;
-        }}
+        }
 
-        .popup-overlay {{
+        .popup-overlay {
             position: fixed;
             top: 0;
             left: 0;
@@ -406,9 +525,9 @@ class GroupStatsHTMLGenerator:
             height: 100%;
             background: rgba(0,0,0,0.7);
             z-index: 999;
-        }}
+        }
 
-        .popup {{
+        .popup {
             position: fixed;
             top: 50%;
             left: 50%;
@@ -422,9 +541,9 @@ class GroupStatsHTMLGenerator:
             overflow-y: auto;
             z-index: 1000;
             box-shadow: 0 8px 32px rgba(0,0,0,0.5);
-        }}
+        }
 
-        .popup-header {{
+        .popup-header {
             color: #cba6f7;
             font-size: 1.1em;
             font-weight: 600;
@@ -434,57 +553,57 @@ class GroupStatsHTMLGenerator:
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
+        }
 
-        .popup-close {{
+        .popup-close {
             background: none;
             border: none;
             color: #cdd6f4;
             font-size: 1.2em;
             cursor: pointer;
             padding: 0;
-        }}
+        }
 
-        .popup-close:hover {{
+        .popup-close:hover {
             color: #cba6f7;
-        }}
+        }
 
-        .popup-content {{
+        .popup-content {
             max-height: 300px;
             overflow-y: auto;
-        }}
+        }
 
-        .popup-item {{
+        .popup-item {
             padding: 8px 12px;
             background: #181825;
             margin-bottom: 5px;
             border-radius: 6px;
             border-left: 3px solid #45475a;
-        }}
+        }
 
-        .popup-item .name {{
+        .popup-item .name {
             color: #cdd6f4;
             font-weight: 600;
             margin-bottom: 5px;
-        }}
+        }
 
-        .popup-item .details {{
+        .popup-item .details {
             color: #a6adc8;
             font-size: 0.9em;
-        }}
+        }
 
-        .popup-item .users {{
+        .popup-item .users {
             color: #6c7086;
             font-size: 0.85em;
             margin-top: 5px;
-        }}
+        }
 
         /* Estilos para la sección de datos */
-        .data-section {{
+        .data-section {
             margin-bottom: 40px;
-        }}
+        }
 
-        .data-controls {{
+        .data-controls {
             padding: var(--page-padding);
             background: #1e1e2e;
             border-bottom: 1px solid #313244;
@@ -492,15 +611,15 @@ class GroupStatsHTMLGenerator:
             gap: 20px;
             flex-wrap: wrap;
             align-items: center;
-        }}
+        }
 
-        .data-control-group {{
+        .data-control-group {
             display: flex;
             gap: 15px;
             align-items: center;
-        }}
+        }
 
-        .data-select {{
+        .data-select {
             padding: 8px 15px;
             background: #313244;
             color: #cdd6f4;
@@ -509,25 +628,25 @@ class GroupStatsHTMLGenerator:
             font-size: 0.95em;
             cursor: pointer;
             transition: all 0.3s;
-        }}
+        }
 
-        .data-select:hover {{
+        .data-select:hover {
             border-color: #cba6f7;
-        }}
+        }
 
-        .data-select:focus {{
+        .data-select:focus {
             outline: none;
             border-color: #cba6f7;
             box-shadow: 0 0 0 3px rgba(203, 166, 247, 0.2);
-        }}
+        }
 
-        .data-categories {{
+        .data-categories {
             display: flex;
             gap: 10px;
             flex-wrap: wrap;
-        }}
+        }
 
-        .data-category-filter {{
+        .data-category-filter {
             padding: 8px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -537,134 +656,134 @@ class GroupStatsHTMLGenerator:
             transition: all 0.3s;
             font-size: 0.9em;
             font-weight: 600;
-        }}
+        }
 
-        .data-category-filter:hover {{
+        .data-category-filter:hover {
             border-color: #cba6f7;
             background: #45475a;
-        }}
+        }
 
-        .data-category-filter.active {{
+        .data-category-filter.active {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .data-display {{
+        .data-display {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(450px, 1fr));
             gap: 25px;
             padding: var(--page-padding);
-        }}
+        }
 
-        .data-category {{
+        .data-category {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 20px;
             border: 1px solid #313244;
             display: none;
-        }}
+        }
 
-        .data-category.visible {{
+        .data-category.visible {
             display: block;
-        }}
+        }
 
-        .data-category h4 {{
+        .data-category h4 {
             color: #cba6f7;
             font-size: 1.2em;
             margin-bottom: 15px;
             padding-bottom: 10px;
             border-bottom: 2px solid #cba6f7;
-        }}
+        }
 
-        .data-item {{
+        .data-item {
             padding: 12px;
             margin-bottom: 10px;
             background: #181825;
             border-radius: 8px;
             border-left: 3px solid #45475a;
             transition: all 0.3s;
-        }}
+        }
 
-        .data-item:hover {{
+        .data-item:hover {
             transform: translateX(5px);
             border-left-color: #cba6f7;
-        }}
+        }
 
-        .data-item.highlighted {{
+        .data-item.highlighted {
             border-left-color: #cba6f7;
             background: #1e1e2e;
-        }}
+        }
 
-        .data-item-name {{
+        .data-item-name {
             color: #cdd6f4;
             font-weight: 600;
             margin-bottom: 8px;
-        }}
+        }
 
-        .data-item-meta {{
+        .data-item-meta {
             display: flex;
             gap: 10px;
             flex-wrap: wrap;
             font-size: 0.9em;
-        }}
+        }
 
-        .data-badge {{
+        .data-badge {
             padding: 4px 10px;
             background: #313244;
             color: #a6adc8;
             border-radius: 6px;
             font-size: 0.85em;
-        }}
+        }
 
-        .data-user-badge {{
+        .data-user-badge {
             padding: 4px 10px;
             background: #45475a;
             color: #cdd6f4;
             border-radius: 6px;
             font-size: 0.85em;
-        }}
+        }
 
-        .data-user-badge.highlighted-user {{
+        .data-user-badge.highlighted-user {
             background: #cba6f7;
             color: #1e1e2e;
             font-weight: 600;
-        }}
+        }
 
-        .data-no-data {{
+        .data-no-data {
             text-align: center;
             padding: 40px;
             color: #6c7086;
             font-style: italic;
             grid-column: 1 / -1;
-        }}
+        }
 
         /* Estilos para filtros de usuarios */
-        .user-filters {{
+        .user-filters {
             padding: var(--page-padding);
             background: #1e1e2e;
             border-bottom: 1px solid #313244;
             display: none; /* Oculto por defecto, se muestra solo en vistas específicas */
-        }}
+        }
 
-        .user-filters.active {{
+        .user-filters.active {
             display: block;
-        }}
+        }
 
-        .user-filters h4 {{
+        .user-filters h4 {
             color: #cba6f7;
             font-size: 1.1em;
             margin-bottom: 15px;
-        }}
+        }
 
-        .user-filter-buttons {{
+        .user-filter-buttons {
             display: flex;
             gap: 10px;
             flex-wrap: wrap;
             align-items: center;
-        }}
+        }
 
-        .user-filter-btn {{
+        .user-filter-btn {
             padding: 8px 16px;
             background: #cba6f7;
             color: #1e1e2e;
@@ -677,101 +796,101 @@ class GroupStatsHTMLGenerator:
             display: flex;
             align-items: center;
             gap: 8px;
-        }}
+        }
 
-        .user-filter-btn img {{
+        .user-filter-btn img {
             width: 20px;
             height: 20px;
             border-radius: 50%;
             object-fit: cover;
-        }}
+        }
 
-        .user-filter-btn:hover {{
+        .user-filter-btn:hover {
             background: #ddb6f2;
             border-color: #ddb6f2;
-        }}
+        }
 
-        .user-filter-btn.inactive {{
+        .user-filter-btn.inactive {
             background: #313244;
             color: #cdd6f4;
             border-color: #45475a;
-        }}
+        }
 
-        .user-filter-btn.inactive:hover {{
+        .user-filter-btn.inactive:hover {
             border-color: #cba6f7;
             background: #45475a;
-        }}
+        }
 
-        .filter-info {{
+        .filter-info {
             margin-left: 20px;
             color: #a6adc8;
             font-size: 0.9em;
-        }}
+        }
 
-        .loading-message {{
+        .loading-message {
             text-align: center;
             padding: 20px;
             color: #cba6f7;
             font-style: italic;
-        }}
+        }
 
-        @media (max-width: 768px) {{
+        @media (max-width: 768px) {
 
-            .charts-grid {{
+            .charts-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
 
-            .evolution-charts {{
+            .evolution-charts {
                 grid-template-columns: 1fr;
-            }}
+            }
 
-            .controls {{
+            .controls {
                 flex-direction: column;
                 align-items: stretch;
-            }}
+            }
 
-            .view-buttons {{
+            .view-buttons {
                 display: grid;
                 grid-template-columns: 1fr 1fr;
                 gap: 10px;
-            }}
+            }
 
-            .summary-stats {{
+            .summary-stats {
                 grid-template-columns: repeat(2, 1fr);
-            }}
+            }
 
-            .data-display {{
+            .data-display {
                 grid-template-columns: 1fr;
                 padding: var(--page-padding);
-            }}
+            }
 
-            .data-controls {{
+            .data-controls {
                 flex-direction: column;
                 align-items: stretch;
-            }}
+            }
 
-            @media (max-width: 768px) {{
-                .data-control-group {{
+            @media (max-width: 768px) {
+                .data-control-group {
                     flex-direction: column;
                     align-items: flex-start;
-                }}
-            }}
+                }
+            }
 
-            .data-categories {{
+            .data-categories {
                 display: grid;
                 grid-template-columns: 1fr 1fr;
                 gap: 10px;
-            }}
+            }
 
 
-            .user-button {{
+            .user-button {
                 top: 15px;
                 right: 15px;
                 width: 45px;
                 height: 45px;
                 font-size: 20px;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
@@ -1033,13 +1152,12 @@ class GroupStatsHTMLGenerator:
     </div>
 
     <script>
-        const groupStats = {stats_json};
-        const colors = {colors_json};
-        const userIcons = {user_icons_json};
-        const periodFolder = "{period_folder}";
+        const groupStats = """
+
+_HTML_TAIL = """
 
         let currentView = 'data';
-        let charts = {{}};
+        let charts = {};
 
         // Variables para la sección de datos
         let activeDataCategories = new Set(['artists']); // Por defecto mostrar artistas
@@ -1048,11 +1166,13 @@ class GroupStatsHTMLGenerator:
 
         // Variables para filtrado de usuarios dinámico
         let activeUsers = new Set(groupStats.users); // Por defecto todos los usuarios activos
-        let dynamicDataCache = {{}}; // Cache para datos cargados dinámicamente
+        let dynamicDataCache = {}; // Cache para datos cargados dinámicamente
+        let bundleIndexPromise = null; // Rangos de data.ndjson (null si los datos van en un archivo por combinación)
+        let bundleBufferPromise = null; // Paquete completo, solo si el servidor no atiende peticiones Range
         let isLoadingData = false;
 
         // Funcionalidad del botón de usuario
-        function initializeUserSelector() {{
+        function initializeUserSelector() {
             const userButton = document.getElementById('userButton');
             const userModal = document.getElementById('userModal');
             const userModalClose = document.getElementById('userModalClose');
@@ -1062,105 +1182,105 @@ class GroupStatsHTMLGenerator:
             selectedHighlightUser = localStorage.getItem('lastfm_selected_user') || '';
 
             // Llenar opciones de usuarios
-            groupStats.users.forEach(user => {{
+            groupStats.users.forEach(user => {
                 const option = document.createElement('div');
                 option.className = 'user-option';
                 option.dataset.user = user;
 
                 const icon = userIcons[user];
-                if (icon) {{
-                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {{
-                        option.innerHTML = `<img src="${{icon}}" alt="${{user}}"> ${{user}}`;
-                    }} else {{
-                        option.innerHTML = `<span style="font-size:1.2em;">${{icon}}</span> ${{user}}`;
-                    }}
-                }} else {{
+                if (icon) {
+                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {
+                        option.innerHTML = `<img src="${icon}" alt="${user}"> ${user}`;
+                    } else {
+                        option.innerHTML = `<span style="font-size:1.2em;">${icon}</span> ${user}`;
+                    }
+                } else {
                     option.textContent = user;
-                }}
+                }
 
                 userOptions.appendChild(option);
-            }});
+            });
 
             // Marcar opción seleccionada y actualizar botón
             updateSelectedUserOption();
             updateUserButtonIcon();
 
             // Event listeners
-            userButton.addEventListener('click', () => {{
+            userButton.addEventListener('click', () => {
                 userModal.style.display = 'block';
-            }});
+            });
 
-            userModalClose.addEventListener('click', () => {{
+            userModalClose.addEventListener('click', () => {
                 userModal.style.display = 'none';
-            }});
+            });
 
-            userModal.addEventListener('click', (e) => {{
-                if (e.target === userModal) {{
+            userModal.addEventListener('click', (e) => {
+                if (e.target === userModal) {
                     userModal.style.display = 'none';
-                }}
-            }});
+                }
+            });
 
-            userOptions.addEventListener('click', (e) => {{
-                if (e.target.classList.contains('user-option')) {{
+            userOptions.addEventListener('click', (e) => {
+                if (e.target.classList.contains('user-option')) {
                     const user = e.target.dataset.user;
                     selectedHighlightUser = user;
 
                     // Guardar en localStorage
-                    if (user) {{
+                    if (user) {
                         localStorage.setItem('lastfm_selected_user', user);
-                    }} else {{
+                    } else {
                         localStorage.removeItem('lastfm_selected_user');
-                    }}
+                    }
 
                     updateSelectedUserOption();
                     updateUserButtonIcon();
                     userModal.style.display = 'none';
 
                     // Actualizar vista si estamos en datos
-                    if (currentView === 'data') {{
+                    if (currentView === 'data') {
                         renderDataView();
-                    }}
-                }}
-            }});
-        }}
+                    }
+                }
+            });
+        }
 
-        function updateUserButtonIcon() {{
+        function updateUserButtonIcon() {
             const userButton = document.getElementById('userButton');
             const icon = userIcons[selectedHighlightUser];
-            if (selectedHighlightUser && icon) {{
-                if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {{
-                    userButton.innerHTML = `<img src="${{icon}}" alt="${{selectedHighlightUser}}">`;
-                }} else {{
+            if (selectedHighlightUser && icon) {
+                if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {
+                    userButton.innerHTML = `<img src="${icon}" alt="${selectedHighlightUser}">`;
+                } else {
                     userButton.textContent = icon;
-                }}
-            }} else {{
+                }
+            } else {
                 userButton.textContent = '👤';
-            }}
-        }}
+            }
+        }
 
-        function updateSelectedUserOption() {{
+        function updateSelectedUserOption() {
             const userOptions = document.getElementById('userOptions');
-            userOptions.querySelectorAll('.user-option').forEach(option => {{
+            userOptions.querySelectorAll('.user-option').forEach(option => {
                 option.classList.remove('selected');
-                if (option.dataset.user === selectedHighlightUser) {{
+                if (option.dataset.user === selectedHighlightUser) {
                     option.classList.add('selected');
-                }}
-            }});
-        }}
+                }
+            });
+        }
 
         // Inicialización
-        document.addEventListener('DOMContentLoaded', function() {{
+        document.addEventListener('DOMContentLoaded', function() {
             initializeUserSelector();
             updateSummaryStats();
 
             // Manejar botones de vista
             const viewButtons = document.querySelectorAll('.view-btn');
-            viewButtons.forEach(btn => {{
-                btn.addEventListener('click', function() {{
+            viewButtons.forEach(btn => {
+                btn.addEventListener('click', function() {
                     const view = this.dataset.view;
                     switchView(view);
-                }});
-            }});
+                });
+            });
 
             // Inicializar controles de datos
             initializeDataControls();
@@ -1170,51 +1290,51 @@ class GroupStatsHTMLGenerator:
 
             // Cargar vista inicial
             switchView('data');
-        }});
+        });
 
-        function switchView(view) {{
+        function switchView(view) {
             currentView = view;
 
             // Update buttons
-            document.querySelectorAll('.view-btn').forEach(btn => {{
+            document.querySelectorAll('.view-btn').forEach(btn => {
                 btn.classList.remove('active');
-            }});
-            document.querySelector(`[data-view="${{view}}"]`).classList.add('active');
+            });
+            document.querySelector(`[data-view="${view}"]`).classList.add('active');
 
             // Mostrar/ocultar filtros de usuarios según la vista
             const userFilters = document.getElementById('userFilters');
-            if (view === 'shared' || view === 'scrobbles' || view === 'evolution') {{
+            if (view === 'shared' || view === 'scrobbles' || view === 'evolution') {
                 userFilters.classList.add('active');
-            }} else {{
+            } else {
                 userFilters.classList.remove('active');
-            }}
+            }
 
             // Update views
-            document.querySelectorAll('.view').forEach(v => {{
+            document.querySelectorAll('.view').forEach(v => {
                 v.classList.remove('active');
-            }});
+            });
 
-            if (view === 'scrobbles') {{
+            if (view === 'scrobbles') {
                 document.getElementById('scribblesView').classList.add('active');
-            }} else {{
+            } else {
                 document.getElementById(view + 'View').classList.add('active');
-            }}
+            }
 
             // Render appropriate charts
-            if (view === 'data') {{
+            if (view === 'data') {
                 renderDataView();
-            }} else if (view === 'shared') {{
+            } else if (view === 'shared') {
                 renderSharedChartsWithFilter();
-            }} else if (view === 'scrobbles') {{
+            } else if (view === 'scrobbles') {
                 renderScrobblesChartsWithFilter();
-            }} else if (view === 'evolution') {{
+            } else if (view === 'evolution') {
                 renderEvolutionChartsWithFilter();
-            }}
-        }}
+            }
+        }
 
-        function updateSummaryStats() {{
+        function updateSummaryStats() {
             // Usar los totales reales de elementos compartidos por TODOS los usuarios
-            const totalCounts = groupStats.total_counts || {{}};
+            const totalCounts = groupStats.total_counts || {};
             const scrobblesCharts = groupStats.scrobbles_charts;
 
             const totalSharedArtists = totalCounts.shared_artists || 0;
@@ -1229,251 +1349,202 @@ class GroupStatsHTMLGenerator:
 
             const summaryHTML = `
                 <div class="summary-card">
-                    <div class="number">${{groupStats.user_count}}</div>
+                    <div class="number">${groupStats.user_count}</div>
                     <div class="label">Usuarios</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalSharedArtists}}</div>
+                    <div class="number">${totalSharedArtists}</div>
                     <div class="label">Artistas Compartidos</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalSharedAlbums}}</div>
+                    <div class="number">${totalSharedAlbums}</div>
                     <div class="label">Álbumes Compartidos</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalSharedTracks}}</div>
+                    <div class="number">${totalSharedTracks}</div>
                     <div class="label">Canciones Compartidas</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalSharedGenres}}</div>
+                    <div class="number">${totalSharedGenres}</div>
                     <div class="label">Géneros Compartidos</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalSharedLabels}}</div>
+                    <div class="number">${totalSharedLabels}</div>
                     <div class="label">Sellos Compartidos</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalScrobblesArtists.toLocaleString()}}</div>
+                    <div class="number">${totalScrobblesArtists.toLocaleString()}</div>
                     <div class="label">Scrobbles (Artistas)</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalScrobblesAll.toLocaleString()}}</div>
+                    <div class="number">${totalScrobblesAll.toLocaleString()}</div>
                     <div class="label">Scrobbles (Total)</div>
                 </div>
             `;
 
             document.getElementById('summaryStats').innerHTML = summaryHTML;
-        }}
-
-        function renderSharedCharts() {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
+        }
 
-            // Renderizar gráficos por usuarios compartidos
-            renderPieChart('sharedArtistsChart', groupStats.shared_charts.artists, 'sharedArtistsInfo');
-            renderPieChart('sharedAlbumsChart', groupStats.shared_charts.albums, 'sharedAlbumsInfo');
-            renderPieChart('sharedTracksChart', groupStats.shared_charts.tracks, 'sharedTracksInfo');
-            renderPieChart('sharedGenresChart', groupStats.shared_charts.genres, 'sharedGenresInfo');
-            renderPieChart('sharedLabelsChart', groupStats.shared_charts.labels, 'sharedLabelsInfo');
-            renderPieChart('sharedReleaseYearsChart', groupStats.shared_charts.release_years, 'sharedReleaseYearsInfo');
-        }}
-
-        function renderScrobblesCharts() {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
-
-            // Renderizar gráficos por scrobbles totales
-            renderPieChart('scrobblesArtistsChart', groupStats.scrobbles_charts.artists, 'scrobblesArtistsInfo');
-            renderPieChart('scrobblesAlbumsChart', groupStats.scrobbles_charts.albums, 'scrobblesAlbumsInfo');
-            renderPieChart('scrobblesTracksChart', groupStats.scrobbles_charts.tracks, 'scrobblesTracksInfo');
-            renderPieChart('scrobblesGenresChart', groupStats.scrobbles_charts.genres, 'scrobblesGenresInfo');
-            renderPieChart('scrobblesLabelsChart', groupStats.scrobbles_charts.labels, 'scrobblesLabelsInfo');
-            renderPieChart('scrobblesReleaseYearsChart', groupStats.scrobbles_charts.release_years, 'scrobblesReleaseYearsInfo');
-            renderPieChart('scrobblesAllCombinedChart', groupStats.scrobbles_charts.all_combined, 'scrobblesAllCombinedInfo');
-        }}
-
-        function renderEvolutionCharts() {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
-
-            // Renderizar gráficos de evolución
-            renderLineChart('evolutionArtistsChart', groupStats.evolution.artists);
-            renderLineChart('evolutionAlbumsChart', groupStats.evolution.albums);
-            renderLineChart('evolutionTracksChart', groupStats.evolution.tracks);
-            renderLineChart('evolutionGenresChart', groupStats.evolution.genres);
-            renderLineChart('evolutionLabelsChart', groupStats.evolution.labels);
-            renderLineChart('evolutionReleaseYearsChart', groupStats.evolution.release_years);
-        }}
-
-        function renderPieChart(canvasId, chartData, infoId) {{
+        function renderPieChart(canvasId, chartData, infoId) {
             const canvas = document.getElementById(canvasId);
             const info = document.getElementById(infoId);
 
-            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {{
+            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {
                 canvas.style.display = 'none';
                 info.innerHTML = '<div class="no-data">No hay datos disponibles</div>';
                 return;
-            }}
+            }
 
             canvas.style.display = 'block';
             const unit = chartData.type === 'shared' ? 'usuarios' : 'scrobbles';
-            info.innerHTML = `Total: ${{chartData.total.toLocaleString()}} ${{unit}} | Click para detalles`;
+            info.innerHTML = `Total: ${chartData.total.toLocaleString()} ${unit} | Click para detalles`;
 
-            const data = {{
+            const data = {
                 labels: Object.keys(chartData.data),
-                datasets: [{{
+                datasets: [{
                     data: Object.values(chartData.data),
                     backgroundColor: colors.slice(0, Object.keys(chartData.data).length),
                     borderColor: '#181825',
                     borderWidth: 2
-                }}]
-            }};
+                }]
+            };
 
-            const config = {{
+            const config = {
                 type: 'pie',
                 data: data,
-                options: {{
+                options: {
                     responsive: true,
                     maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
+                    plugins: {
+                        legend: {
                             position: 'bottom',
-                            labels: {{
+                            labels: {
                                 color: '#cdd6f4',
                                 padding: 15,
                                 usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
+                            }
+                        },
+                        tooltip: {
                             backgroundColor: '#1e1e2e',
                             titleColor: '#cba6f7',
                             bodyColor: '#cdd6f4',
                             borderColor: '#cba6f7',
                             borderWidth: 1
-                        }}
-                    }},
-                    onClick: function(event, elements) {{
-                        if (elements.length > 0) {{
+                        }
+                    },
+                    onClick: function(event, elements) {
+                        if (elements.length > 0) {
                             const index = elements[0].index;
                             const label = data.labels[index];
                             showGroupPopup(chartData, label);
-                        }}
-                    }}
-                }}
-            }};
+                        }
+                    }
+                }
+            };
 
             charts[canvasId] = new Chart(canvas, config);
-        }}
+        }
 
-        function renderLineChart(canvasId, chartData) {{
+        function renderLineChart(canvasId, chartData) {
             const canvas = document.getElementById(canvasId);
 
-            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {{
+            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {
                 return;
-            }}
+            }
 
             const datasets = [];
             let colorIndex = 0;
 
-            Object.keys(chartData.data).forEach(item => {{
-                datasets.push({{
+            Object.keys(chartData.data).forEach(item => {
+                datasets.push({
                     label: item,
-                    data: chartData.years.map(year => {{
+                    data: chartData.years.map(year => {
                         const yearData = chartData.data[item][year];
-                        if (yearData !== undefined && yearData !== null) {{
+                        if (yearData !== undefined && yearData !== null) {
                             // Si es la nueva estructura con objetos total: X, users:
-                            if (typeof yearData === 'object' && 'total' in yearData) {{
+                            if (typeof yearData === 'object' && 'total' in yearData) {
                                 return yearData.total;
-                            }}
+                            }
                             // Si es la estructura antigua con números directos
-                            if (typeof yearData === 'number') {{
+                            if (typeof yearData === 'number') {
                                 return yearData;
-                            }}
-                        }}
+                            }
+                        }
                         return 0;
-                    }}),
+                    }),
                     borderColor: colors[colorIndex % colors.length],
                     backgroundColor: colors[colorIndex % colors.length] + '20',
                     tension: 0.4,
                     fill: false,
                     userData: chartData.data[item] // Guardar datos de usuario para tooltips
-                }});
+                });
                 colorIndex++;
-            }});
+            });
 
-            const config = {{
+            const config = {
                 type: 'line',
-                data: {{
+                data: {
                     labels: chartData.years,
                     datasets: datasets
-                }},
-                options: {{
+                },
+                options: {
                     responsive: true,
                     maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
+                    plugins: {
+                        legend: {
                             position: 'bottom',
-                            labels: {{
+                            labels: {
                                 color: '#cdd6f4',
                                 padding: 10,
                                 usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
+                            }
+                        },
+                        tooltip: {
                             backgroundColor: '#1e1e2e',
                             titleColor: '#cba6f7',
                             bodyColor: '#cdd6f4',
                             borderColor: '#cba6f7',
                             borderWidth: 1,
-                            callbacks: {{
-                                afterBody: function(context) {{
+                            callbacks: {
+                                afterBody: function(context) {
                                     const datasetIndex = context[0].datasetIndex;
                                     const dataset = datasets[datasetIndex];
                                     const year = chartData.years[context[0].dataIndex];
                                     const userData = dataset.userData[year];
 
                                     // Solo mostrar desglose si es la nueva estructura con datos de usuario
-                                    if (userData && typeof userData === 'object' && userData.users && Object.keys(userData.users).length > 0) {{
+                                    if (userData && typeof userData === 'object' && userData.users && Object.keys(userData.users).length > 0) {
                                         const userList = Object.entries(userData.users)
                                             .sort((a, b) => b[1] - a[1])
-                                            .map(([user, plays]) => `${{user}}: ${{plays}}`)
+                                            .map(([user, plays]) => `${user}: ${plays}`)
                                             .join('\\n');
                                         return '\\nDesglose por usuario:\\n' + userList;
-                                    }}
+                                    }
                                     return '';
-                                }}
-                            }}
-                        }}
-                    }},
-                    scales: {{
-                        x: {{
-                            ticks: {{
+                                }
+                            }
+                        }
+                    },
+                    scales: {
+                        x: {
+                            ticks: {
                                 color: '#a6adc8'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }}
-                        }},
-                        y: {{
-                            ticks: {{
+                            }
+                        },
+                        y: {
+                            ticks: {
                                 color: '#a6adc8'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }}
-                        }}
-                    }},
-                    onClick: function(event, elements) {{
-                        if (elements.length > 0) {{
+                            }
+                        }
+                    },
+                    onClick: function(event, elements) {
+                        if (elements.length > 0) {
                             const datasetIndex = elements[0].datasetIndex;
                             const pointIndex = elements[0].index;
                             const dataset = datasets[datasetIndex];
@@ -1481,54 +1552,57 @@ class GroupStatsHTMLGenerator:
                             const userData = dataset.userData[year];
 
                             // Solo mostrar popup si es la nueva estructura con datos de usuario
-                            if (userData && typeof userData === 'object' && userData.users && Object.keys(userData.users).length > 0) {{
+                            if (userData && typeof userData === 'object' && userData.users && Object.keys(userData.users).length > 0) {
                                 showEvolutionPopup(dataset.label, year, userData);
-                            }}
-                        }}
-                    }}
-                }}
-            }};
+                            }
+                        }
+                    }
+                }
+            };
 
             charts[canvasId] = new Chart(canvas, config);
-        }}
+        }
 
-        function showGroupPopup(chartData, selectedLabel) {{
+        function showGroupPopup(chartData, selectedLabel) {
             const details = chartData.details[selectedLabel];
             if (!details) return;
 
-            let title = `${{selectedLabel}}`;
+            let title = `${selectedLabel}`;
             let content = '';
 
             content += `<div class="popup-item">
-                <div class="name">${{selectedLabel}}</div>
+                <div class="name">${selectedLabel}</div>
                 <div class="details">
-                    Usuarios: ${{details.user_count}} |
-                    Scrobbles: ${{details.total_scrobbles.toLocaleString()}}
+                    Usuarios: ${details.user_count} |
+                    Scrobbles: ${details.total_scrobbles.toLocaleString()}
                 </div>`;
 
-            if (details.shared_users && details.shared_users.length > 0) {{
-                content += `<div class="users">Compartido por: ${{details.shared_users.join(', ')}}</div>`;
-            }}
+            // Los datos por combinación referencian la lista de usuarios compartida del gráfico
+            const sharedUsers = details.shared_users
+                || (details.shared_users_ref !== undefined ? chartData.shared_user_lists[details.shared_users_ref] : null);
+            if (sharedUsers && sharedUsers.length > 0) {
+                content += `<div class="users">Compartido por: ${sharedUsers.join(', ')}</div>`;
+            }
 
-            if (details.artist && details.album) {{
-                content += `<div class="details">Artista: ${{details.artist}} | Álbum: ${{details.album}}</div>`;
-            }} else if (details.artist && details.track) {{
-                content += `<div class="details">Artista: ${{details.artist}} | Canción: ${{details.track}}</div>`;
-            }}
+            if (details.artist && details.album) {
+                content += `<div class="details">Artista: ${details.artist} | Álbum: ${details.album}</div>`;
+            } else if (details.artist && details.track) {
+                content += `<div class="details">Artista: ${details.artist} | Canción: ${details.track}</div>`;
+            }
 
-            if (chartData.type === 'combined') {{
-                content += `<div class="details">Categoría: ${{details.category}}</div>`;
-            }}
+            if (chartData.type === 'combined') {
+                content += `<div class="details">Categoría: ${details.category}</div>`;
+            }
 
             // Agregar desglose por usuario si está disponible
-            if (details.user_plays && Object.keys(details.user_plays).length > 0) {{
+            if (details.user_plays && Object.keys(details.user_plays).length > 0) {
                 content += `<div class="details" style="margin-top: 10px; font-weight: bold;">Desglose por usuario:</div>`;
                 const userPlays = Object.entries(details.user_plays)
                     .sort((a, b) => b[1] - a[1]) // Ordenar por scrobbles desc
-                    .map(([user, plays]) => `${{user}} (${{plays.toLocaleString()}})`)
+                    .map(([user, plays]) => `${user} (${plays.toLocaleString()})`)
                     .join(', ');
-                content += `<div class="users">${{userPlays}}</div>`;
-            }}
+                content += `<div class="users">${userPlays}</div>`;
+            }
 
             content += `</div>`;
 
@@ -1536,27 +1610,27 @@ class GroupStatsHTMLGenerator:
             document.getElementById('popupContent').innerHTML = content;
             document.getElementById('popupOverlay').style.display = 'block';
             document.getElementById('popup').style.display = 'block';
-        }}
+        }
 
-        function showEvolutionPopup(itemName, year, userData) {{
-            let title = `${{itemName}} en ${{year}}`;
+        function showEvolutionPopup(itemName, year, userData) {
+            let title = `${itemName} en ${year}`;
             let content = '';
 
             content += `<div class="popup-item">
-                <div class="name">${{itemName}}</div>
+                <div class="name">${itemName}</div>
                 <div class="details">
-                    Año: ${{year}} |
-                    Scrobbles: ${{userData.total.toLocaleString()}}
+                    Año: ${year} |
+                    Scrobbles: ${userData.total.toLocaleString()}
                 </div>`;
 
-            if (userData.users && Object.keys(userData.users).length > 0) {{
+            if (userData.users && Object.keys(userData.users).length > 0) {
                 content += `<div class="details" style="margin-top: 10px; font-weight: bold;">Desglose por usuario:</div>`;
                 const userPlays = Object.entries(userData.users)
                     .sort((a, b) => b[1] - a[1]) // Ordenar por scrobbles desc
-                    .map(([user, plays]) => `${{user}} (${{plays.toLocaleString()}})`)
+                    .map(([user, plays]) => `${user} (${plays.toLocaleString()})`)
                     .join(', ');
-                content += `<div class="users">${{userPlays}}</div>`;
-            }}
+                content += `<div class="users">${userPlays}</div>`;
+            }
 
             content += `</div>`;
 
@@ -1564,193 +1638,120 @@ class GroupStatsHTMLGenerator:
             document.getElementById('popupContent').innerHTML = content;
             document.getElementById('popupOverlay').style.display = 'block';
             document.getElementById('popup').style.display = 'block';
-        }}
+        }
 
         // Configurar cierre de popup
-        document.getElementById('popupClose').addEventListener('click', function() {{
+        document.getElementById('popupClose').addEventListener('click', function() {
             document.getElementById('popupOverlay').style.display = 'none';
             document.getElementById('popup').style.display = 'none';
-        }});
+        });
 
-        document.getElementById('popupOverlay').addEventListener('click', function() {{
+        document.getElementById('popupOverlay').addEventListener('click', function() {
             document.getElementById('popupOverlay').style.display = 'none';
             document.getElementById('popup').style.display = 'none';
-        }});
+        });
 
         // Funciones para la sección de datos
-        function initializeDataControls() {{
+        function initializeDataControls() {
             console.log('Inicializando controles de datos...'); // Debug
             const userLevelSelect = document.getElementById('userLevelSelect');
 
             // Llenar select de niveles de usuarios
-            if (groupStats.data_by_levels) {{
+            if (groupStats.data_by_levels) {
                 console.log('data_by_levels encontrado:', Object.keys(groupStats.data_by_levels)); // Debug
                 const levels = Object.keys(groupStats.data_by_levels);
-                levels.forEach((levelKey, index) => {{
+                levels.forEach((levelKey, index) => {
                     const option = document.createElement('option');
                     option.value = levelKey;
                     option.textContent = getLevelLabel(levelKey);
                     userLevelSelect.appendChild(option);
 
-                    if (index === 0) {{
+                    if (index === 0) {
                         currentUserLevel = levelKey;
                         option.selected = true;
                         console.log('Nivel inicial establecido:', currentUserLevel); // Debug
-                    }}
-                }});
-            }} else {{
+                    }
+                });
+            } else {
                 console.error('data_by_levels no encontrado en groupStats'); // Debug
-            }}
+            }
 
             // Event listeners
-            userLevelSelect.addEventListener('change', function() {{
+            userLevelSelect.addEventListener('change', function() {
                 currentUserLevel = this.value;
                 console.log('Cambiando a nivel:', currentUserLevel); // Debug
                 renderDataView();
-            }});
+            });
 
             // Manejar filtros de categorías
             const dataCategoryFilters = document.querySelectorAll('.data-category-filter');
-            dataCategoryFilters.forEach(filter => {{
-                filter.addEventListener('click', () => {{
+            dataCategoryFilters.forEach(filter => {
+                filter.addEventListener('click', () => {
                     const category = filter.dataset.category;
 
-                    if (activeDataCategories.has(category)) {{
+                    if (activeDataCategories.has(category)) {
                         activeDataCategories.delete(category);
                         filter.classList.remove('active');
-                    }} else {{
+                    } else {
                         activeDataCategories.add(category);
                         filter.classList.add('active');
-                    }}
+                    }
 
                     renderDataView();
-                }});
-            }});
-        }}
+                });
+            });
+        }
 
-        function getLevelLabel(levelKey) {{
+        function getLevelLabel(levelKey) {
             const totalUsers = groupStats.user_count;
-            if (levelKey === 'total_usuarios') {{
-                return `Total de usuarios (${{totalUsers}})`;
-            }} else {{
+            if (levelKey === 'total_usuarios') {
+                return `Total de usuarios (${totalUsers})`;
+            } else {
                 const missing = parseInt(levelKey.replace('total_menos_', ''));
                 const remaining = totalUsers - missing;
-                return `Total menos ${{missing}} (${{remaining}} usuarios)`;
-            }}
-        }}
+                return `Total menos ${missing} (${remaining} usuarios)`;
+            }
+        }
 
-        function renderDataView() {{
+        function renderDataView() {
             console.log('=== RENDER DATA VIEW ==='); // Debug
             console.log('currentUserLevel:', currentUserLevel); // Debug
-            console.log('data_by_levels keys:', Object.keys(groupStats.data_by_levels || {{}})); // Debug
+            console.log('data_by_levels keys:', Object.keys(groupStats.data_by_levels || {})); // Debug
 
             const dataDisplay = document.getElementById('dataDisplay');
             console.log('dataDisplay element:', dataDisplay); // Debug
             dataDisplay.innerHTML = '';
             console.log('innerHTML cleared'); // Debug
 
-            if (!currentUserLevel || !groupStats.data_by_levels || !groupStats.data_by_levels[currentUserLevel]) {{
+            if (!currentUserLevel || !groupStats.data_by_levels || !groupStats.data_by_levels[currentUserLevel]) {
                 console.log('No hay datos para el nivel:', currentUserLevel); // Debug
-                console.log('Niveles disponibles:', Object.keys(groupStats.data_by_levels || {{}})); // Debug
+                console.log('Niveles disponibles:', Object.keys(groupStats.data_by_levels || {})); // Debug
                 dataDisplay.innerHTML = '<div class="data-no-data">No hay datos disponibles</div>';
                 return;
-            }}
+            }
 
-            const levelData = groupStats.data_by_levels[currentUserLevel];
-            console.log('Datos del nivel seleccionado:', levelData); // Debug
+            const levelFragments = groupStats.data_by_levels[currentUserLevel];
             console.log('Categorías activas:', Array.from(activeDataCategories)); // Debug
 
+            // Cada categoría llega como HTML ya montado: basta con insertar las activas, en orden
             const categoryOrder = ['artists', 'albums', 'tracks', 'genres', 'labels', 'decades'];
-            const categoryTitles = {{
-                artists: 'Artistas',
-                albums: 'Álbumes',
-                tracks: 'Canciones',
-                genres: 'Géneros',
-                labels: 'Sellos',
-                decades: 'Décadas'
-            }};
-
-            let hasVisibleData = false;
-            let elementsAdded = 0;
-
-            categoryOrder.forEach(categoryKey => {{
-                console.log(`Procesando categoría: ${{categoryKey}}`); // Debug
-                console.log(`- Está activa: ${{activeDataCategories.has(categoryKey)}}`); // Debug
-                console.log(`- Tiene datos: ${{levelData[categoryKey] ? levelData[categoryKey].length : 0}} items`); // Debug
-
-                if (!activeDataCategories.has(categoryKey)) return;
-                if (!levelData[categoryKey] || levelData[categoryKey].length === 0) return;
-
-                hasVisibleData = true;
-
-                const categoryDiv = document.createElement('div');
-                categoryDiv.className = 'data-category visible';
-                console.log(`Creando div para ${{categoryKey}}, className: ${{categoryDiv.className}}`); // Debug
-
-                const title = document.createElement('h4');
-                title.textContent = `${{categoryTitles[categoryKey]}} (${{levelData[categoryKey].length}})`;
-                categoryDiv.appendChild(title);
-                console.log(`Título agregado: ${{title.textContent}}`); // Debug
-
-                let itemsAdded = 0;
-                levelData[categoryKey].forEach(item => {{
-                    const itemDiv = document.createElement('div');
-                    itemDiv.className = 'data-item';
-
-                    // Destacar si el usuario seleccionado está en la lista
-                    if (selectedHighlightUser && item.users.includes(selectedHighlightUser)) {{
-                        itemDiv.classList.add('highlighted');
-                    }}
-
-                    const itemName = document.createElement('div');
-                    itemName.className = 'data-item-name';
-                    itemName.textContent = item.name;
-                    itemDiv.appendChild(itemName);
-
-                    const itemMeta = document.createElement('div');
-                    itemMeta.className = 'data-item-meta';
-
-                    // Badge con total de scrobbles
-                    const countBadge = document.createElement('span');
-                    countBadge.className = 'data-badge';
-                    countBadge.textContent = `${{item.count.toLocaleString()}} plays`;
-                    itemMeta.appendChild(countBadge);
-
-                    // Badges de usuarios
-                    // Ordenar usuarios por scrobbles descendente antes de mostrarlos
-                    const sortedUsers = Object.entries(item.user_counts)
-                        .sort((a, b) => b[1] - a[1])
-                        .map(([user]) => user);
-
-                    sortedUsers.forEach(user => {{
-                        const userBadge = document.createElement('span');
-                        userBadge.className = 'data-user-badge';
-                        if (user === selectedHighlightUser) {{
-                            userBadge.classList.add('highlighted-user');
-                        }}
-
-                        const userPlays = item.user_counts[user] || 0;
-                        userBadge.textContent = `${{user}} (${{userPlays.toLocaleString()}})`;
-                        itemMeta.appendChild(userBadge);
-                    }});
-
-                    itemDiv.appendChild(itemMeta);
-                    categoryDiv.appendChild(itemDiv);
-                    itemsAdded++;
-                }});
-
-                console.log(`Items agregados a ${{categoryKey}}: ${{itemsAdded}}`); // Debug
-                dataDisplay.appendChild(categoryDiv);
-                elementsAdded++;
-                console.log(`CategoryDiv agregado al DOM. Total elementos en dataDisplay: ${{dataDisplay.children.length}}`); // Debug
-            }});
-
-            console.log('hasVisibleData:', hasVisibleData); // Debug
-            console.log('elementsAdded:', elementsAdded); // Debug
-            console.log('dataDisplay final innerHTML length:', dataDisplay.innerHTML.length); // Debug
-            console.log('dataDisplay final children count:', dataDisplay.children.length); // Debug
-
-            if (!hasVisibleData) {{
+            const fragments = categoryOrder
+                .filter(categoryKey => activeDataCategories.has(categoryKey) && levelFragments[categoryKey])
+                .map(categoryKey => levelFragments[categoryKey]);
+            console.log('Categorías con datos visibles:', fragments.length); // Debug
+
+            if (fragments.length > 0) {
+                dataDisplay.innerHTML = fragments.join('');
+
+                // Destacar los elementos y badges del usuario seleccionado
+                if (selectedHighlightUser) {
+                    const user = CSS.escape(selectedHighlightUser);
+                    dataDisplay.querySelectorAll(`.data-item[data-users~="${user}"]`)
+                        .forEach(itemDiv => itemDiv.classList.add('highlighted'));
+                    dataDisplay.querySelectorAll(`.data-user-badge[data-user="${user}"]`)
+                        .forEach(userBadge => userBadge.classList.add('highlighted-user'));
+                }
+            } else {
                 const noDataDiv = document.createElement('div');
                 noDataDiv.className = 'data-no-data';
                 noDataDiv.textContent = activeDataCategories.size === 0
@@ -1758,163 +1759,202 @@ class GroupStatsHTMLGenerator:
                     : 'No hay datos disponibles para este nivel';
                 dataDisplay.appendChild(noDataDiv);
                 console.log('Agregado mensaje de no data'); // Debug
-            }}
+            }
 
             // Forzar un repaint
             dataDisplay.style.display = 'none';
             dataDisplay.offsetHeight; // trigger reflow
             dataDisplay.style.display = '';
             console.log('Repaint forzado'); // Debug
-        }}
+        }
 
         // ==================== FUNCIONES PARA FILTRADO DINÁMICO ====================
 
-        function initializeUserFilters() {{
+        function initializeUserFilters() {
             console.log('Inicializando filtros de usuarios...');
             const userFilterButtons = document.getElementById('userFilterButtons');
 
             // Crear botones para cada usuario
-            groupStats.users.forEach(user => {{
+            groupStats.users.forEach(user => {
                 const btn = document.createElement('button');
                 btn.className = 'user-filter-btn'; // Empezar sin clase active/inactive
                 btn.dataset.user = user;
 
                 const icon = userIcons[user];
-                if (icon) {{
-                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {{
-                        btn.innerHTML = `<img src="${{icon}}" alt="${{user}}"> ${{user}}`;
-                    }} else {{
-                        btn.innerHTML = `<span style="font-size:1.1em;">${{icon}}</span> ${{user}}`;
-                    }}
-                }} else {{
+                if (icon) {
+                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {
+                        btn.innerHTML = `<img src="${icon}" alt="${user}"> ${user}`;
+                    } else {
+                        btn.innerHTML = `<span style="font-size:1.1em;">${icon}</span> ${user}`;
+                    }
+                } else {
                     btn.textContent = user;
-                }}
+                }
 
-                btn.addEventListener('click', () => {{
+                btn.addEventListener('click', () => {
                     toggleUser(user);
-                }});
+                });
 
                 userFilterButtons.appendChild(btn);
-            }});
+            });
 
             // Actualizar estados iniciales
             updateUserFilterButtons();
             updateFilterInfo();
-        }}
+        }
 
-        function updateUserFilterButtons() {{
+        function updateUserFilterButtons() {
             const userFilterButtons = document.getElementById('userFilterButtons');
-            userFilterButtons.querySelectorAll('.user-filter-btn').forEach(btn => {{
+            userFilterButtons.querySelectorAll('.user-filter-btn').forEach(btn => {
                 const user = btn.dataset.user;
                 // Remover clases existentes
                 btn.classList.remove('inactive');
 
-                if (activeUsers.has(user)) {{
+                if (activeUsers.has(user)) {
                     // Usuario activo: clase base (sin inactive)
                     // El CSS por defecto ya maneja el estilo activo
-                }} else {{
+                } else {
                     // Usuario inactivo: agregar clase inactive
                     btn.classList.add('inactive');
-                }}
-            }});
-        }}
+                }
+            });
+        }
 
-        function toggleUser(user) {{
-            const btn = document.querySelector(`[data-user="${{user}}"]`);
+        function toggleUser(user) {
+            const btn = document.querySelector(`[data-user="${user}"]`);
 
-            if (activeUsers.has(user)) {{
+            if (activeUsers.has(user)) {
                 // Si solo queda este usuario activo, no permitir desactivarlo
-                if (activeUsers.size <= 1) {{
+                if (activeUsers.size <= 1) {
                     alert('Debe haber al menos 1 usuario activo');
                     return;
-                }}
+                }
                 activeUsers.delete(user);
-            }} else {{
+            } else {
                 activeUsers.add(user);
-            }}
+            }
 
             updateUserFilterButtons();
             updateFilterInfo();
 
             // Recargar gráficos si estamos en una vista filtrable
-            if (['shared', 'scrobbles', 'evolution'].includes(currentView)) {{
+            if (['shared', 'scrobbles', 'evolution'].includes(currentView)) {
                 refreshCurrentView();
-            }}
-        }}
+            }
+        }
 
-        function updateFilterInfo() {{
+        function updateFilterInfo() {
             const filterInfo = document.getElementById('filterInfo');
             const activeCount = activeUsers.size;
             const totalCount = groupStats.users.length;
 
-            if (activeCount < 2) {{
-                filterInfo.textContent = `${{activeCount}}/${{totalCount}} usuarios activos - Selecciona al menos 2 usuarios`;
+            if (activeCount < 2) {
+                filterInfo.textContent = `${activeCount}/${totalCount} usuarios activos - Selecciona al menos 2 usuarios`;
                 filterInfo.style.color = '#f38ba8'; // Color de advertencia
-            }} else {{
-                filterInfo.textContent = `${{activeCount}}/${{totalCount}} usuarios activos`;
+            } else {
+                filterInfo.textContent = `${activeCount}/${totalCount} usuarios activos`;
                 filterInfo.style.color = '#a6adc8'; // Color normal
-            }}
-        }}
+            }
+        }
 
-        function refreshCurrentView() {{
+        function refreshCurrentView() {
             console.log('Refrescando vista actual:', currentView);
 
-            if (activeUsers.size < 2) {{
+            if (activeUsers.size < 2) {
                 showLoadingMessage('Selecciona al menos 2 usuarios');
                 return;
-            }}
+            }
 
-            if (currentView === 'shared') {{
+            if (currentView === 'shared') {
                 renderSharedChartsWithFilter();
-            }} else if (currentView === 'scrobbles') {{
+            } else if (currentView === 'scrobbles') {
                 renderScrobblesChartsWithFilter();
-            }} else if (currentView === 'evolution') {{
+            } else if (currentView === 'evolution') {
                 renderEvolutionChartsWithFilter();
-            }}
-        }}
+            }
+        }
 
-        function getUserKey() {{
+        function getUserKey() {
             return Array.from(activeUsers).sort().join('_');
-        }}
+        }
 
-        function showLoadingMessage(message) {{
+        function showLoadingMessage(message) {
             // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
+            Object.values(charts).forEach(chart => {
                 if (chart) chart.destroy();
-            }});
-            charts = {{}};
+            });
+            charts = {};
 
             // Mostrar mensaje en todos los contenedores de gráficos
             const containers = document.querySelectorAll('.chart-info, .chart-wrapper canvas');
-            containers.forEach(container => {{
-                if (container.tagName === 'CANVAS') {{
+            containers.forEach(container => {
+                if (container.tagName === 'CANVAS') {
                     container.style.display = 'none';
-                }} else {{
-                    container.innerHTML = `<div class="loading-message">${{message}}</div>`;
-                }}
-            }});
-        }}
-
-        async function loadDynamicData(dataType, userKey) {{
-            if (dynamicDataCache[`${{dataType}}_${{userKey}}`]) {{
-                return dynamicDataCache[`${{dataType}}_${{userKey}}`];
-            }}
-
-            try {{
-                const response = await fetch(`data/${{periodFolder}}/${{dataType}}_${{userKey}}.json`);
-                if (!response.ok) {{
-                    throw new Error(`HTTP error! status: ${{response.status}}`);
-                }}
-                const data = await response.json();
-                dynamicDataCache[`${{dataType}}_${{userKey}}`] = data;
+                } else {
+                    container.innerHTML = `<div class="loading-message">${message}</div>`;
+                }
+            });
+        }
+
+        function loadBundleIndex() {
+            // bundle.json solo existe si los datos se generaron como paquete data.ndjson
+            if (!bundleIndexPromise) {
+                bundleIndexPromise = fetch(`data/${periodFolder}/bundle.json`)
+                    .then(response => response.ok ? response.json() : null)
+                    .catch(() => null);
+            }
+            return bundleIndexPromise;
+        }
+
+        async function loadBundleRecord(bundle, name) {
+            const range = bundle.ranges[name];
+            if (!range) {
+                throw new Error(`Registro ${name} no encontrado en el paquete`);
+            }
+            const [start, length] = range;
+            const url = `data/${periodFolder}/${bundle.file}`;
+
+            if (!bundleBufferPromise) {
+                const response = await fetch(url, { headers: { 'Range': `bytes=${start}-${start + length - 1}` } });
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                if (response.status === 206) {
+                    return JSON.parse(await response.text());
+                }
+                // Sin soporte de Range llega el paquete entero: se guarda para el resto de registros
+                bundleBufferPromise = response.arrayBuffer();
+            }
+            const buffer = await bundleBufferPromise;
+            return JSON.parse(new TextDecoder().decode(buffer.slice(start, start + length)));
+        }
+
+        async function loadDynamicData(dataType, userKey) {
+            if (dynamicDataCache[`${dataType}_${userKey}`]) {
+                return dynamicDataCache[`${dataType}_${userKey}`];
+            }
+
+            try {
+                const bundle = await loadBundleIndex();
+                let data;
+                if (bundle) {
+                    data = await loadBundleRecord(bundle, `${dataType}_${userKey}`);
+                } else {
+                    const response = await fetch(`data/${periodFolder}/${dataType}_${userKey}.json`);
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    data = await response.json();
+                }
+                dynamicDataCache[`${dataType}_${userKey}`] = data;
                 return data;
-            }} catch (error) {{
-                console.error(`Error cargando datos ${{dataType}}_${{userKey}}:`, error);
+            } catch (error) {
+                console.error(`Error cargando datos ${dataType}_${userKey}:`, error);
                 return null;
-            }}
-        }}
+            }
+        }
 
-        async function renderSharedChartsWithFilter() {{
+        async function renderSharedChartsWithFilter() {
             if (isLoadingData) return;
             isLoadingData = true;
 
@@ -1924,17 +1964,17 @@ class GroupStatsHTMLGenerator:
             const userKey = getUserKey();
             const sharedData = await loadDynamicData('shared', userKey);
 
-            if (!sharedData) {{
+            if (!sharedData) {
                 showLoadingMessage('Error cargando datos');
                 isLoadingData = false;
                 return;
-            }}
+            }
 
             // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
+            Object.values(charts).forEach(chart => {
                 if (chart) chart.destroy();
-            }});
-            charts = {{}};
+            });
+            charts = {};
 
             // Renderizar gráficos por usuarios compartidos
             renderPieChart('sharedArtistsChart', sharedData.artists, 'sharedArtistsInfo');
@@ -1945,9 +1985,9 @@ class GroupStatsHTMLGenerator:
             renderPieChart('sharedReleaseYearsChart', sharedData.release_years, 'sharedReleaseYearsInfo');
 
             isLoadingData = false;
-        }}
+        }
 
-        async function renderScrobblesChartsWithFilter() {{
+        async function renderScrobblesChartsWithFilter() {
             if (isLoadingData) return;
             isLoadingData = true;
 
@@ -1957,17 +1997,17 @@ class GroupStatsHTMLGenerator:
             const userKey = getUserKey();
             const scrobblesData = await loadDynamicData('scrobbles', userKey);
 
-            if (!scrobblesData) {{
+            if (!scrobblesData) {
                 showLoadingMessage('Error cargando datos');
                 isLoadingData = false;
                 return;
-            }}
+            }
 
             // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
+            Object.values(charts).forEach(chart => {
                 if (chart) chart.destroy();
-            }});
-            charts = {{}};
+            });
+            charts = {};
 
             // Renderizar gráficos por scrobbles totales
             renderPieChart('scrobblesArtistsChart', scrobblesData.artists, 'scrobblesArtistsInfo');
@@ -1979,9 +2019,9 @@ class GroupStatsHTMLGenerator:
             renderPieChart('scrobblesAllCombinedChart', scrobblesData.all_combined, 'scrobblesAllCombinedInfo');
 
             isLoadingData = false;
-        }}
+        }
 
-        async function renderEvolutionChartsWithFilter() {{
+        async function renderEvolutionChartsWithFilter() {
             if (isLoadingData) return;
             isLoadingData = true;
 
@@ -1991,17 +2031,17 @@ class GroupStatsHTMLGenerator:
             const userKey = getUserKey();
             const evolutionData = await loadDynamicData('evolution', userKey);
 
-            if (!evolutionData) {{
+            if (!evolutionData) {
                 showLoadingMessage('Error cargando datos');
                 isLoadingData = false;
                 return;
-            }}
+            }
 
             // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
+            Object.values(charts).forEach(chart => {
                 if (chart) chart.destroy();
-            }});
-            charts = {{}};
+            });
+            charts = {};
 
             // Renderizar gráficos de evolución
             renderLineChart('evolutionArtistsChart', evolutionData.artists);
@@ -2012,11 +2052,7 @@ class GroupStatsHTMLGenerator:
             renderLineChart('evolutionReleaseYearsChart', evolutionData.release_years);
 
             isLoadingData = false;
-        }}
+        }
     </script>
 </body>
 </html>"""
-
-    def _format_number(self, number: int) -> str:
-        """Formatea números con separadores de miles"""
-        return f"{number:,}".replace(",", ".")
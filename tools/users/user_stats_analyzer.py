@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 from typing import List, Dict, Tuple, Optional
 import json
+import heapq
 
 
 class UserStatsAnalyzer:
@@ -19,6 +20,9 @@ class UserStatsAnalyzer:
         self.current_year = datetime.now().year
         self.from_year = self.current_year - years_back
         self.to_year = self.current_year
+        self._years = tuple(range(self.from_year, self.to_year + 1))
+        # Claves de año ya convertidas a str para los datos de evolución (JSON)
+        self._year_keys = {year: str(year) for year in self._years}
 
     def analyze_user(self, user: str, all_users: List[str]) -> Dict:
         """Analiza completamente un usuario y devuelve todas sus estadísticas"""
@@ -48,6 +52,7 @@ class UserStatsAnalyzer:
             'period': f"{self.from_year}-{self.to_year}",
             'yearly_scrobbles': yearly_scrobbles,
             'unique_counts': unique_counts,  # ✅ Añadir conteos únicos
+            'summary': self._build_summary(yearly_scrobbles, unique_counts),
             'top_artists': unique_counts['top_artists'],  # Para compatibilidad
             'top_albums': unique_counts['top_albums'],    # Para compatibilidad
             'top_tracks': unique_counts['top_tracks'],    # Para compatibilidad
@@ -114,7 +119,7 @@ class UserStatsAnalyzer:
                         'total': sum(plays for _, plays in top_genres)
                     },
                     'scatter_charts': genres_scatter_data,
-                    'years': list(range(self.from_year, self.to_year + 1))
+                    'years': list(self._years)
                 }
 
                 # Solo aÃ±adir datos de Ã¡lbumes si existen
@@ -165,7 +170,7 @@ class UserStatsAnalyzer:
                     'total': sum(plays for _, plays in top_labels)
                 },
                 'scatter_charts': labels_scatter_data,
-                'years': list(range(self.from_year, self.to_year + 1))
+                'years': list(self._years)
             }
 
         except Exception as e:
@@ -195,11 +200,7 @@ class UserStatsAnalyzer:
             user, self.from_year, self.to_year, self.mbid_only
         )
 
-        yearly_counts = {}
-        for year in range(self.from_year, self.to_year + 1):
-            yearly_counts[year] = scrobbles_by_year.get(year, 0)
-
-        return yearly_counts
+        return {year: scrobbles_by_year.get(year, 0) for year in self._years}
 
     def _analyze_coincidences(self, user: str, all_users: List[str]) -> Dict:
         """Analiza coincidencias del usuario con otros usuarios"""
@@ -442,24 +443,23 @@ class UserStatsAnalyzer:
                 # Para popups: obtener datos especÃ­ficos segÃºn el tipo
                 if count > 0:
                     if data_type == 'artists':
-                        # Top 5 Ã¡lbumes de estos artistas
-                        artists = list(coincidences[other_user].keys())[:10]
+                        # Top 5 Ã¡lbumes de estos artistas (solo los 5 artistas que muestra el popup)
+                        artists = list(coincidences[other_user].keys())[:5]
                         popup_details[other_user] = self.database.get_top_albums_for_artists(
                             user, artists, self.from_year, self.to_year, 5
                         )
                     elif data_type == 'albums':
-                        # Top 5 canciones de estos Ã¡lbumes
-                        albums = list(coincidences[other_user].keys())[:10]
+                        # Top 5 canciones de estos Ã¡lbumes (solo los 5 Ã¡lbumes que muestra el popup)
+                        albums = list(coincidences[other_user].keys())[:5]
                         popup_details[other_user] = self.database.get_top_tracks_for_albums(
                             user, albums, self.from_year, self.to_year, 5
                         )
                     else:  # tracks
                         # Solo mostrar las top 5 canciones mÃ¡s escuchadas
-                        sorted_tracks = sorted(
-                            coincidences[other_user].items(),
-                            key=lambda x: x[1]['user_plays'],
-                            reverse=True
-                        )[:5]
+                        sorted_tracks = heapq.nlargest(
+                            5, coincidences[other_user].items(),
+                            key=lambda x: x[1]['user_plays']
+                        )
                         popup_details[other_user] = dict(sorted_tracks)
                 else:
                     popup_details[other_user] = {}
@@ -485,13 +485,10 @@ class UserStatsAnalyzer:
         top_genres = dict(user_genres[:8])
         total_plays = sum(top_genres.values()) if top_genres else 0
 
-        # Para popup: obtener top 5 artistas por gÃ©nero
-        popup_details = {}
-        for genre, plays in user_genres[:8]:
-            artists = self.database.get_top_artists_for_genre(
-                user, genre, self.from_year, self.to_year, 5, self.mbid_only
-            )
-            popup_details[genre] = artists
+        # Para popup: top 5 artistas de los 8 gÃ©neros en una sola consulta
+        popup_details = self.database.get_top_artists_for_genres(
+            user, list(top_genres), self.from_year, self.to_year, 5, self.mbid_only
+        )
 
         return {
             'title': 'DistribuciÃ³n de GÃ©neros',
@@ -533,33 +530,33 @@ class UserStatsAnalyzer:
             evolution_data[other_user] = {}
             evolution_details[other_user] = {}
 
-            for year in range(self.from_year, self.to_year + 1):
+            for year in self._years:
+                year_key = self._year_keys[year]
                 genre_coincidences = self.database.get_common_genres_with_users(
                     user, [other_user], year, year, self.mbid_only
                 )
 
                 if other_user in genre_coincidences:
                     count = len(genre_coincidences[other_user])
-                    evolution_data[other_user][year] = count
+                    evolution_data[other_user][year_key] = count
 
                     # Top 5 gÃ©neros simples (no detallados)
-                    top_genres = sorted(
-                        genre_coincidences[other_user].items(),
-                        key=lambda x: x[1]['total_plays'],
-                        reverse=True
-                    )[:5]
-                    evolution_details[other_user][year] = [
+                    top_genres = heapq.nlargest(
+                        5, genre_coincidences[other_user].items(),
+                        key=lambda x: x[1]['total_plays']
+                    )
+                    evolution_details[other_user][year_key] = [
                         {'name': name, 'plays': data['total_plays']}
                         for name, data in top_genres
                     ]
                 else:
-                    evolution_data[other_user][year] = 0
-                    evolution_details[other_user][year] = []
+                    evolution_data[other_user][year_key] = 0
+                    evolution_details[other_user][year_key] = []
 
         return {
-            'data': evolution_data,
+            'series': self._to_series(evolution_data),
             'details': evolution_details,
-            'years': list(range(self.from_year, self.to_year + 1)),
+            'years': list(self._years),
             'users': other_users
         }
 
@@ -572,33 +569,33 @@ class UserStatsAnalyzer:
             evolution_data[other_user] = {}
             evolution_details[other_user] = {}
 
-            for year in range(self.from_year, self.to_year + 1):
+            for year in self._years:
+                year_key = self._year_keys[year]
                 label_coincidences = self.database.get_common_labels_with_users(
                     user, [other_user], year, year, self.mbid_only
                 )
 
                 if other_user in label_coincidences:
                     count = len(label_coincidences[other_user])
-                    evolution_data[other_user][year] = count
+                    evolution_data[other_user][year_key] = count
 
                     # Top 5 sellos simples
-                    top_labels = sorted(
-                        label_coincidences[other_user].items(),
-                        key=lambda x: x[1]['total_plays'],
-                        reverse=True
-                    )[:5]
-                    evolution_details[other_user][year] = [
+                    top_labels = heapq.nlargest(
+                        5, label_coincidences[other_user].items(),
+                        key=lambda x: x[1]['total_plays']
+                    )
+                    evolution_details[other_user][year_key] = [
                         {'name': name, 'plays': data['total_plays']}
                         for name, data in top_labels
                     ]
                 else:
-                    evolution_data[other_user][year] = 0
-                    evolution_details[other_user][year] = []
+                    evolution_data[other_user][year_key] = 0
+                    evolution_details[other_user][year_key] = []
 
         return {
-            'data': evolution_data,
+            'series': self._to_series(evolution_data),
             'details': evolution_details,
-            'years': list(range(self.from_year, self.to_year + 1)),
+            'years': list(self._years),
             'users': other_users
         }
 
@@ -611,117 +608,104 @@ class UserStatsAnalyzer:
             evolution_data[other_user] = {}
             evolution_details[other_user] = {}
 
-            for year in range(self.from_year, self.to_year + 1):
+            for year in self._years:
+                year_key = self._year_keys[year]
                 album_year_coincidences = self.database.get_common_album_release_years_with_users(
                     user, [other_user], year, year, self.mbid_only
                 )
 
                 if other_user in album_year_coincidences:
                     count = len(album_year_coincidences[other_user])
-                    evolution_data[other_user][year] = count
+                    evolution_data[other_user][year_key] = count
 
                     # Top 5 aÃ±os de lanzamiento simples
-                    top_years = sorted(
-                        album_year_coincidences[other_user].items(),
-                        key=lambda x: x[1]['total_plays'],
-                        reverse=True
-                    )[:5]
-                    evolution_details[other_user][year] = [
+                    top_years = heapq.nlargest(
+                        5, album_year_coincidences[other_user].items(),
+                        key=lambda x: x[1]['total_plays']
+                    )
+                    evolution_details[other_user][year_key] = [
                         {'name': name, 'plays': data['total_plays']}
                         for name, data in top_years
                     ]
                 else:
-                    evolution_data[other_user][year] = 0
-                    evolution_details[other_user][year] = []
+                    evolution_data[other_user][year_key] = 0
+                    evolution_details[other_user][year_key] = []
 
         return {
-            'data': evolution_data,
+            'series': self._to_series(evolution_data),
             'details': evolution_details,
-            'years': list(range(self.from_year, self.to_year + 1)),
+            'years': list(self._years),
             'users': other_users
         }
 
     def _analyze_coincidences_evolution_optimized(self, user: str, other_users: List[str]) -> Dict:
         """Analiza la evoluciÃ³n de coincidencias por aÃ±o - VERSIÃ“N OPTIMIZADA"""
-        evolution_data = {
-            'artists': {},
-            'albums': {},
-            'tracks': {}
-        }
+        evolution_series = {}
+        evolution_details = {}
+
+        # Una pasada completa por entidad (todos los aÃ±os y usuarios a la vez)
+        for entity in ('artists', 'albums', 'tracks'):
+            evolution_series[entity], evolution_details[entity] = self._compute_entity_evolution(
+                entity, user, other_users
+            )
 
-        evolution_details = {
-            'artists': {},
-            'albums': {},
-            'tracks': {}
+        return {
+            'series': evolution_series,
+            'details': evolution_details,
+            'years': list(self._years),
+            'users': other_users
         }
 
-        # Para cada aÃ±o, calcular coincidencias simples (sin detalles complejos)
-        for year in range(self.from_year, self.to_year + 1):
-            # Obtener coincidencias bÃ¡sicas
-            artist_coincidences = self.database.get_common_artists_with_users(
-                user, other_users, year, year, self.mbid_only
-            )
-            album_coincidences = self.database.get_common_albums_with_users(
-                user, other_users, year, year, self.mbid_only
-            )
-            track_coincidences = self.database.get_common_tracks_with_users(
-                user, other_users, year, year, self.mbid_only
-            )
+    def _compute_entity_evolution(self, entity: str, user: str, other_users: List[str]) -> Tuple[List[Dict], Dict]:
+        """Calcula las series de recuentos y el top 5 por (usuario, aÃ±o) de una entidad ('artists', 'albums' o 'tracks')"""
+        # Coincidencias de todos los aÃ±os en una sola consulta
+        by_year = getattr(self.database, f'get_common_{entity}_with_users_by_year')(
+            user, other_users, self.from_year, self.to_year, self.mbid_only
+        )
 
-            # Preparar datos por usuario
-            for other_user in other_users:
-                if other_user not in evolution_data['artists']:
-                    evolution_data['artists'][other_user] = {}
-                    evolution_data['albums'][other_user] = {}
-                    evolution_data['tracks'][other_user] = {}
-                    evolution_details['artists'][other_user] = {}
-                    evolution_details['albums'][other_user] = {}
-                    evolution_details['tracks'][other_user] = {}
-
-                # Artistas - datos simples
-                artist_data = artist_coincidences.get(other_user, {})
-                evolution_data['artists'][other_user][year] = len(artist_data)
-                top_artists = sorted(
-                    artist_data.items(),
-                    key=lambda x: x[1]['total_plays'],
-                    reverse=True
-                )[:5]
-                evolution_details['artists'][other_user][year] = [
-                    {'name': name, 'plays': data['total_plays']}
-                    for name, data in top_artists
-                ]
+        # Celdas (clave de aÃ±o, coincidencias del aÃ±o) precalculadas una vez
+        get_year = by_year.get
+        year_cells = [(self._year_keys[year], get_year(year, {})) for year in self._years]
+        by_plays = lambda x: x[1]['total_plays']
 
-                # Ãlbumes - datos simples
-                album_data = album_coincidences.get(other_user, {})
-                evolution_data['albums'][other_user][year] = len(album_data)
-                top_albums = sorted(
-                    album_data.items(),
-                    key=lambda x: x[1]['total_plays'],
-                    reverse=True
-                )[:5]
-                evolution_details['albums'][other_user][year] = [
+        evolution_series = []
+        evolution_details = {}
+        for other_user in other_users:
+            data = [len(year_coincidences.get(other_user, {})) for _, year_coincidences in year_cells]
+            # Un usuario sin coincidencias en ningún aÃ±o no aporta línea ni detalles
+            if not any(data):
+                continue
+            evolution_series.append({'label': other_user, 'data': data})
+            evolution_details[other_user] = {
+                year_key: [
                     {'name': name, 'plays': data['total_plays']}
-                    for name, data in top_albums
+                    for name, data in heapq.nlargest(5, year_coincidences.get(other_user, {}).items(), key=by_plays)
                 ]
+                for year_key, year_coincidences in year_cells
+            }
 
-                # Canciones - datos simples
-                track_data = track_coincidences.get(other_user, {})
-                evolution_data['tracks'][other_user][year] = len(track_data)
-                top_tracks = sorted(
-                    track_data.items(),
-                    key=lambda x: x[1]['total_plays'],
-                    reverse=True
-                )[:5]
-                evolution_details['tracks'][other_user][year] = [
-                    {'name': name, 'plays': data['total_plays']}
-                    for name, data in top_tracks
-                ]
+        return evolution_series, evolution_details
 
+    def _to_series(self, evolution_data: Dict) -> List[Dict]:
+        """Convierte {usuario: {aÃ±o: valor}} en series densas alineadas con 'years' para Chart.js,
+        omitiendo las que son cero en todos los aÃ±os (no aportan nada al gráfico)"""
+        year_keys = [self._year_keys[year] for year in self._years]
+        series = (
+            {'label': label, 'data': [values.get(year_key, 0) for year_key in year_keys]}
+            for label, values in evolution_data.items()
+        )
+        return [item for item in series if any(item['data'])]
+
+    def _build_summary(self, yearly_scrobbles: Dict, unique_counts: Dict) -> Dict:
+        """Totales de la cabecera de resumen, calculados una vez aquí en lugar de en el navegador"""
         return {
-            'data': evolution_data,
-            'details': evolution_details,
-            'years': list(range(self.from_year, self.to_year + 1)),
-            'users': other_users
+            'total_scrobbles': sum(yearly_scrobbles.values()),
+            'total_artists': unique_counts.get('total_artists', 0),
+            'total_albums': unique_counts.get('total_albums', 0),
+            'total_tracks': unique_counts.get('total_tracks', 0),
+            'total_genres': unique_counts.get('total_genres', {}),  # Por proveedor
+            'total_labels': unique_counts.get('total_labels', 0),
+            'total_years': len(yearly_scrobbles)
         }
 
     def _analyze_unique_counts(self, user: str) -> Dict:
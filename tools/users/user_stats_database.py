@@ -6,9 +6,11 @@ CORREGIDA para géneros por proveedor
 
 import sqlite3
 import json
+import heapq
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+from collections import defaultdict, Counter
+from operator import itemgetter
 
 
 
@@ -17,8 +19,18 @@ class UserStatsDatabase:
 
     def __init__(self, db_path='db/lastfm_cache.db'):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Caché de sentencias amplia: las consultas se repiten por usuario y año
+        self.conn = sqlite3.connect(db_path, cached_statements=512)
         self.conn.row_factory = sqlite3.Row
+        # Carga de solo lectura intensiva: WAL, mmap de 256 MB y ~200 MB de caché de páginas
+        try:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError:
+            pass  # BD de solo lectura o bloqueada: se mantiene el modo de journal actual
+        self.conn.execute('PRAGMA mmap_size=268435456')
+        self.conn.execute('PRAGMA cache_size=-200000')
+        # Pivote géneros-por-año ya calculado, por (usuario, desde, hasta, límite, mbid)
+        self._genres_by_year_cache = {}
 
     def _get_mbid_filter(self, mbid_only: bool, table_alias: str = 's') -> str:
         """Genera filtro MBID según los parámetros"""
@@ -31,16 +43,29 @@ class UserStatsDatabase:
             ({table_alias}.track_mbid IS NOT NULL AND {table_alias}.track_mbid != '')
         )"""
 
-    def get_user_scrobbles_by_year(self, user: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, int]:
-        """Obtiene conteo de scrobbles del usuario agrupados por año - con filtro MBID"""
+    def _execute_tuples(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Ejecuta una consulta devolviendo tuplas simples (sin sqlite3.Row) para bucles grandes"""
         cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        return cursor
+
+    def _get_decade_sql(self, column: str = 'ard.release_year') -> str:
+        """Expresión SQL equivalente a _get_decade para agrupar por década en la consulta"""
+        return f"""CASE
+            WHEN {column} < 1950 THEN 'Antes de 1950'
+            WHEN {column} >= 2020 THEN '2020s+'
+            ELSE (({column} / 10) * 10) || 's'
+        END"""
 
+    def get_user_scrobbles_by_year(self, user: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, int]:
+        """Obtiene conteo de scrobbles del usuario agrupados por año - con filtro MBID"""
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT strftime('%Y', datetime(timestamp, 'unixepoch')) as year,
                    COUNT(*) as count
             FROM scrobbles s
@@ -72,8 +97,6 @@ class UserStatsDatabase:
         Returns:
             Lista de tuplas (género, reproducciones)
         """
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -81,7 +104,7 @@ class UserStatsDatabase:
 
         # Intentar usar la tabla nueva primero
         try:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT agd.genre, COUNT(*) as plays
                 FROM scrobbles s
                 JOIN artist_genres_detailed agd ON s.artist = agd.artist
@@ -102,7 +125,7 @@ class UserStatsDatabase:
         # Fallback: usar la tabla antigua solo para lastfm
         if provider == 'lastfm':
             try:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT ag.genres, COUNT(*) as plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -123,8 +146,7 @@ class UserStatsDatabase:
                         continue
 
                 # Ordenar y limitar
-                sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)
-                return sorted_genres[:limit]
+                return heapq.nlargest(limit, genre_counts.items(), key=itemgetter(1))
 
             except sqlite3.OperationalError as e:
                 print(f"Error en fallback de géneros: {e}")
@@ -136,8 +158,6 @@ class UserStatsDatabase:
 
     def get_top_artists_for_genre_by_provider(self, user: str, genre: str, from_year: int, to_year: int, provider: str = 'lastfm', limit: int = 15, mbid_only: bool = False) -> List[Dict]:
         """Obtiene top artistas para un género específico por proveedor con datos temporales - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -145,7 +165,7 @@ class UserStatsDatabase:
 
         # Intentar usar la tabla nueva primero
         try:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT s.artist, COUNT(*) as total_plays
                 FROM scrobbles s
                 JOIN artist_genres_detailed agd ON s.artist = agd.artist
@@ -167,7 +187,7 @@ class UserStatsDatabase:
                         year_start = int(datetime(year, 1, 1).timestamp())
                         year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
 
-                        cursor.execute(f'''
+                        cursor = self.conn.execute(f'''
                             SELECT COUNT(*) as plays
                             FROM scrobbles s
                             JOIN artist_genres_detailed agd ON s.artist = agd.artist
@@ -193,7 +213,7 @@ class UserStatsDatabase:
         # Fallback: usar la tabla antigua solo para lastfm
         if provider == 'lastfm':
             try:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, COUNT(*) as total_plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -215,7 +235,7 @@ class UserStatsDatabase:
                         year_start = int(datetime(year, 1, 1).timestamp())
                         year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
 
-                        cursor.execute(f'''
+                        cursor = self.conn.execute(f'''
                             SELECT COUNT(*) as plays
                             FROM scrobbles s
                             JOIN artist_genres ag ON s.artist = ag.artist
@@ -245,8 +265,6 @@ class UserStatsDatabase:
 
     def get_user_top_album_genres_by_provider(self, user: str, from_year: int, to_year: int, provider: str, limit: int = 15, mbid_only: bool = False) -> List[Tuple[str, int]]:
         """Obtiene los géneros de álbumes más escuchados por el usuario según el proveedor - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -254,7 +272,7 @@ class UserStatsDatabase:
 
         # Intentar usar la tabla nueva primero
         try:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT ag.genre, COUNT(*) as plays
                 FROM scrobbles s
                 JOIN album_genres ag ON s.artist = ag.artist AND s.album = ag.album
@@ -276,7 +294,7 @@ class UserStatsDatabase:
         # FALLBACK: Si es lastfm, usar géneros de artistas como aproximación para álbumes
         if provider == 'lastfm':
             try:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT ag.genres, COUNT(*) as plays, s.album
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -313,8 +331,6 @@ class UserStatsDatabase:
 
     def get_top_albums_for_genre_by_provider(self, user: str, genre: str, from_year: int, to_year: int, provider: str, limit: int = 15, mbid_only: bool = False) -> List[Dict]:
         """Obtiene top álbumes para un género específico por proveedor con datos temporales - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -322,7 +338,7 @@ class UserStatsDatabase:
 
         # Intentar usar la tabla nueva primero
         try:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT s.artist, s.album, COUNT(*) as total_plays
                 FROM scrobbles s
                 JOIN album_genres ag ON s.artist = ag.artist AND s.album = ag.album
@@ -349,7 +365,7 @@ class UserStatsDatabase:
                         year_start = int(datetime(year, 1, 1).timestamp())
                         year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
 
-                        cursor.execute(f'''
+                        cursor = self.conn.execute(f'''
                             SELECT COUNT(*) as plays
                             FROM scrobbles s
                             JOIN album_genres ag ON s.artist = ag.artist AND s.album = ag.album
@@ -375,7 +391,7 @@ class UserStatsDatabase:
         # FALLBACK: usar géneros de artistas para aproximar álbumes (solo lastfm)
         if provider == 'lastfm':
             try:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, s.album, COUNT(*) as total_plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -402,7 +418,7 @@ class UserStatsDatabase:
                         year_start = int(datetime(year, 1, 1).timestamp())
                         year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
 
-                        cursor.execute(f'''
+                        cursor = self.conn.execute(f'''
                             SELECT COUNT(*) as plays
                             FROM scrobbles s
                             JOIN artist_genres ag ON s.artist = ag.artist
@@ -432,15 +448,13 @@ class UserStatsDatabase:
 
     def get_user_top_labels(self, user: str, from_year: int, to_year: int, limit: int = 15, mbid_only: bool = False) -> List[Tuple[str, int]]:
         """Obtiene los sellos más escuchados por el usuario usando album_labels - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         try:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT al.label, COUNT(*) as plays
                 FROM scrobbles s
                 LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -460,8 +474,6 @@ class UserStatsDatabase:
 
     def get_top_artists_for_label(self, user: str, label: str, from_year: int, to_year: int, limit: int = 15, mbid_only: bool = False) -> List[Dict]:
         """Obtiene top artistas para un sello específico con datos temporales usando album_labels - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -469,7 +481,7 @@ class UserStatsDatabase:
 
         try:
             # Obtener top artistas para este sello
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT s.artist, COUNT(*) as total_plays
                 FROM scrobbles s
                 LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -494,7 +506,7 @@ class UserStatsDatabase:
                     year_start = int(datetime(year, 1, 1).timestamp())
                     year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
 
-                    cursor.execute(f'''
+                    cursor = self.conn.execute(f'''
                         SELECT COUNT(*) as plays
                         FROM scrobbles s
                         LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -523,15 +535,13 @@ class UserStatsDatabase:
     # RESTO DE FUNCIONES - mantener las existentes del archivo original
     def get_common_artists_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene artistas comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's1')
 
         # Obtener artistas del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, COUNT(*) as plays
             FROM scrobbles s1
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -552,14 +562,14 @@ class UserStatsDatabase:
 
             mbid_filter2 = self._get_mbid_filter(mbid_only, 's2')
 
-            cursor.execute(f'''
+            # SQL fija por usuario (sin lista IN variable): la intersección se hace en Python
+            cursor = self.conn.execute(f'''
                 SELECT artist, COUNT(*) as plays
                 FROM scrobbles s2
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
-                  AND artist IN ({','.join(['?'] * len(user_artists))})
                 {mbid_filter2}
                 GROUP BY artist
-            ''', [other_user, from_timestamp, to_timestamp] + list(user_artists.keys()))
+            ''', (other_user, from_timestamp, to_timestamp))
 
             other_user_artists = {row['artist']: row['plays'] for row in cursor.fetchall()}
 
@@ -580,15 +590,13 @@ class UserStatsDatabase:
 
     def get_common_albums_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene álbumes comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's1')
 
         # Obtener álbumes del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT (artist || ' - ' || album) as album_key, COUNT(*) as plays
             FROM scrobbles s1
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -610,15 +618,14 @@ class UserStatsDatabase:
 
             mbid_filter2 = self._get_mbid_filter(mbid_only, 's2')
 
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT (artist || ' - ' || album) as album_key, COUNT(*) as plays
                 FROM scrobbles s2
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
                   AND album IS NOT NULL AND album != ''
-                  AND (artist || ' - ' || album) IN ({','.join(['?'] * len(user_albums))})
                 {mbid_filter2}
                 GROUP BY album_key
-            ''', [other_user, from_timestamp, to_timestamp] + list(user_albums.keys()))
+            ''', (other_user, from_timestamp, to_timestamp))
 
             other_user_albums = {row['album_key']: row['plays'] for row in cursor.fetchall()}
 
@@ -639,15 +646,13 @@ class UserStatsDatabase:
 
     def get_common_tracks_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene canciones comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's1')
 
         # Obtener canciones del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT (artist || ' - ' || track) as track_key, COUNT(*) as plays
             FROM scrobbles s1
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -668,14 +673,13 @@ class UserStatsDatabase:
 
             mbid_filter2 = self._get_mbid_filter(mbid_only, 's2')
 
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT (artist || ' - ' || track) as track_key, COUNT(*) as plays
                 FROM scrobbles s2
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
-                  AND (artist || ' - ' || track) IN ({','.join(['?'] * len(user_tracks))})
                 {mbid_filter2}
                 GROUP BY track_key
-            ''', [other_user, from_timestamp, to_timestamp] + list(user_tracks.keys()))
+            ''', (other_user, from_timestamp, to_timestamp))
 
             other_user_tracks = {row['track_key']: row['plays'] for row in cursor.fetchall()}
 
@@ -694,17 +698,87 @@ class UserStatsDatabase:
 
         return common_tracks
 
+    def _get_common_items_by_year(self, item_sql: str, extra_filter: str, user: str, other_users: List[str],
+                                  from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, Dict[str, Dict]]:
+        """Coincidencias por año en una sola consulta para todos los usuarios y años"""
+        from_timestamp = int(datetime(from_year, 1, 1).timestamp())
+        to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
+
+        mbid_filter = self._get_mbid_filter(mbid_only, 's')
+        others = [u for u in other_users if u != user]
+        all_users = [user] + others
+
+        # 'localtime' para que el año coincida con los límites de datetime(año, 1, 1)
+        cursor = self._execute_tuples(f'''
+            SELECT user,
+                   CAST(strftime('%Y', datetime(timestamp, 'unixepoch', 'localtime')) AS INTEGER) as year,
+                   {item_sql} as item_key,
+                   COUNT(*) as plays
+            FROM scrobbles s
+            WHERE user IN ({','.join(['?'] * len(all_users))})
+              AND timestamp >= ? AND timestamp <= ?
+            {extra_filter}
+            {mbid_filter}
+            GROUP BY user, year, item_key
+        ''', all_users + [from_timestamp, to_timestamp])
+
+        plays_by_user_year = defaultdict(lambda: defaultdict(dict))
+        for row_user, year, item_key, plays in cursor:
+            plays_by_user_year[row_user][year][item_key] = plays
+
+        user_by_year = plays_by_user_year.get(user, {})
+        common_by_year = {}
+
+        for year, user_items in user_by_year.items():
+            common_items = {}
+            for other_user in others:
+                other_items = plays_by_user_year.get(other_user, {}).get(year, {})
+
+                # Calcular coincidencias
+                common = {}
+                for item in user_items:
+                    if item in other_items:
+                        common[item] = {
+                            'user_plays': user_items[item],
+                            'other_plays': other_items[item],
+                            'total_plays': user_items[item] + other_items[item]
+                        }
+
+                if common:
+                    common_items[other_user] = common
+
+            common_by_year[year] = common_items
+
+        return common_by_year
+
+    def get_common_artists_with_users_by_year(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, Dict[str, Dict]]:
+        """Artistas comunes por año: {año: {otro_usuario: {artista: {...}}}} en una sola consulta"""
+        return self._get_common_items_by_year(
+            'artist', '', user, other_users, from_year, to_year, mbid_only
+        )
+
+    def get_common_albums_with_users_by_year(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, Dict[str, Dict]]:
+        """Álbumes comunes por año: {año: {otro_usuario: {álbum: {...}}}} en una sola consulta"""
+        return self._get_common_items_by_year(
+            "(artist || ' - ' || album)", "AND album IS NOT NULL AND album != ''",
+            user, other_users, from_year, to_year, mbid_only
+        )
+
+    def get_common_tracks_with_users_by_year(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[int, Dict[str, Dict]]:
+        """Canciones comunes por año: {año: {otro_usuario: {canción: {...}}}} en una sola consulta"""
+        return self._get_common_items_by_year(
+            "(artist || ' - ' || track)", '', user, other_users, from_year, to_year, mbid_only
+        )
+
     def get_common_genres_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene géneros comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         # Obtener géneros del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT ag.genres, COUNT(*) as plays
             FROM scrobbles s
             JOIN artist_genres ag ON s.artist = ag.artist
@@ -732,7 +806,7 @@ class UserStatsDatabase:
             if other_user == user:
                 continue
 
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT ag.genres, COUNT(*) as plays
                 FROM scrobbles s
                 JOIN artist_genres ag ON s.artist = ag.artist
@@ -768,15 +842,13 @@ class UserStatsDatabase:
 
     def get_common_labels_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene sellos comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         # Obtener sellos del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT al.label, COUNT(*) as plays
             FROM scrobbles s
             LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -797,16 +869,15 @@ class UserStatsDatabase:
             if other_user == user:
                 continue
 
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT al.label, COUNT(*) as plays
                 FROM scrobbles s
                 LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
                 WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
                   AND al.label IS NOT NULL AND al.label != ''
-                  AND al.label IN ({','.join(['?'] * len(user_labels))})
                 {mbid_filter}
                 GROUP BY al.label
-            ''', [other_user, from_timestamp, to_timestamp] + list(user_labels.keys()))
+            ''', (other_user, from_timestamp, to_timestamp))
 
             other_user_labels = {row['label']: row['plays'] for row in cursor.fetchall()}
 
@@ -827,28 +898,26 @@ class UserStatsDatabase:
 
     def get_common_release_years_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene décadas de lanzamiento comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
-        # Obtener décadas del usuario principal
-        cursor.execute(f'''
-            SELECT ard.release_year, COUNT(*) as plays
+        # Agrupar directamente por década en SQL (mismo orden que por año de lanzamiento)
+        decades_sql = f'''
+            SELECT {self._get_decade_sql('ard.release_year')} as decade, COUNT(*) as plays
             FROM scrobbles s
             LEFT JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album
             WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
               AND ard.release_year IS NOT NULL
             {mbid_filter}
-            GROUP BY ard.release_year
-        ''', (user, from_timestamp, to_timestamp))
+            GROUP BY decade
+            ORDER BY MIN(ard.release_year)
+        '''
 
-        user_decades = defaultdict(int)
-        for row in cursor.fetchall():
-            decade = self._get_decade(row['release_year'])
-            user_decades[decade] += row['plays']
+        # Obtener décadas del usuario principal
+        cursor = self.conn.execute(decades_sql, (user, from_timestamp, to_timestamp))
+        user_decades = {row['decade']: row['plays'] for row in cursor.fetchall()}
 
         if not user_decades:
             return {}
@@ -859,20 +928,8 @@ class UserStatsDatabase:
             if other_user == user:
                 continue
 
-            cursor.execute(f'''
-                SELECT ard.release_year, COUNT(*) as plays
-                FROM scrobbles s
-                LEFT JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album
-                WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
-                  AND ard.release_year IS NOT NULL
-                {mbid_filter}
-                GROUP BY ard.release_year
-            ''', (other_user, from_timestamp, to_timestamp))
-
-            other_user_decades = defaultdict(int)
-            for row in cursor.fetchall():
-                decade = self._get_decade(row['release_year'])
-                other_user_decades[decade] += row['plays']
+            cursor = self.conn.execute(decades_sql, (other_user, from_timestamp, to_timestamp))
+            other_user_decades = {row['decade']: row['plays'] for row in cursor.fetchall()}
 
             # Calcular coincidencias
             common = {}
@@ -900,12 +957,13 @@ class UserStatsDatabase:
                 total_genres[genre] += plays
 
         # Ordenar y limitar
-        sorted_genres = sorted(total_genres.items(), key=lambda x: x[1], reverse=True)
-        return sorted_genres[:limit]
+        return heapq.nlargest(limit, total_genres.items(), key=itemgetter(1))
 
     def get_user_genres_by_year(self, user: str, from_year: int, to_year: int, limit: int = 10, mbid_only: bool = False) -> Dict[int, Dict[str, int]]:
-        """Obtiene géneros del usuario por año - con filtro MBID"""
-        cursor = self.conn.cursor()
+        """Obtiene géneros del usuario por año - con filtro MBID (cacheado por usuario y período)"""
+        cache_key = (user, from_year, to_year, limit, mbid_only)
+        if cache_key in self._genres_by_year_cache:
+            return self._genres_by_year_cache[cache_key]
 
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
@@ -913,7 +971,7 @@ class UserStatsDatabase:
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         # Solo obtener los top artistas para reducir carga
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT DISTINCT s.artist
             FROM scrobbles s
             WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
@@ -926,10 +984,11 @@ class UserStatsDatabase:
         top_artists = [row['artist'] for row in cursor.fetchall()]
 
         if not top_artists:
+            self._genres_by_year_cache[cache_key] = {}
             return {}
 
         # Obtener géneros solo para estos artistas
-        cursor.execute(f'''
+        cursor = self._execute_tuples(f'''
             SELECT ag.genres,
                    strftime('%Y', datetime(s.timestamp, 'unixepoch')) as year,
                    COUNT(*) as plays
@@ -942,32 +1001,34 @@ class UserStatsDatabase:
             ORDER BY year, plays DESC
         ''', [user, from_timestamp, to_timestamp] + top_artists)
 
-        genres_by_year = defaultdict(lambda: defaultdict(int))
+        # Contador plano por (año, género): una sola búsqueda por incremento
+        flat_genres = Counter()
 
-        for row in cursor.fetchall():
-            year = int(row['year'])
-            genres_json = row['genres']
-            plays = row['plays']
+        for genres_json, year, plays in cursor:
+            year = int(year)
 
             try:
                 genres_list = json.loads(genres_json) if genres_json else []
                 for genre in genres_list[:3]:  # Solo primeros 3 géneros por artista
-                    genres_by_year[year][genre] += plays
+                    flat_genres[(year, genre)] += plays
             except json.JSONDecodeError:
                 continue
 
-        # Limitar géneros por año
+        # Pivotar a {año: {género: plays}}
+        genres_by_year = {}
+        for (year, genre), plays in flat_genres.items():
+            genres_by_year.setdefault(year, {})[genre] = plays
+
+        # Limitar géneros por año (top-K sin ordenar la lista completa)
         limited_genres_by_year = {}
         for year, genres in genres_by_year.items():
-            sorted_genres = sorted(genres.items(), key=lambda x: x[1], reverse=True)
-            limited_genres_by_year[year] = dict(sorted_genres[:limit])
+            limited_genres_by_year[year] = dict(heapq.nlargest(limit, genres.items(), key=itemgetter(1)))
 
+        self._genres_by_year_cache[cache_key] = limited_genres_by_year
         return limited_genres_by_year
 
     def get_top_artists_by_scrobbles(self, users: List[str], from_year: int, to_year: int, limit: int = 10, mbid_only: bool = False) -> Dict[str, List]:
         """Obtiene top artistas por scrobbles para cada usuario - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -976,7 +1037,7 @@ class UserStatsDatabase:
         users_top_artists = {}
 
         for user in users:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT artist, COUNT(*) as plays
                 FROM scrobbles s
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -992,8 +1053,6 @@ class UserStatsDatabase:
 
     def get_top_artists_by_days(self, users: List[str], from_year: int, to_year: int, limit: int = 10, mbid_only: bool = False) -> Dict[str, List]:
         """Obtiene top artistas por número de días diferentes en que fueron escuchados - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -1002,7 +1061,7 @@ class UserStatsDatabase:
         users_top_artists = {}
 
         for user in users:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT artist, COUNT(DISTINCT date(datetime(timestamp, 'unixepoch'))) as days_count
                 FROM scrobbles s
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1018,8 +1077,6 @@ class UserStatsDatabase:
 
     def get_top_artists_by_track_count(self, users: List[str], from_year: int, to_year: int, limit: int = 10, mbid_only: bool = False) -> Dict[str, List]:
         """Obtiene top artistas por número de canciones diferentes escuchadas - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -1028,7 +1085,7 @@ class UserStatsDatabase:
         users_top_artists = {}
 
         for user in users:
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT artist, COUNT(DISTINCT track) as track_count, COUNT(*) as total_plays
                 FROM scrobbles s
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1047,8 +1104,6 @@ class UserStatsDatabase:
 
     def get_top_artists_by_streaks(self, users: List[str], from_year: int, to_year: int, limit: int = 5, mbid_only: bool = False) -> Dict[str, List]:
         """Obtiene top artistas por streaks (días consecutivos) - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -1058,7 +1113,7 @@ class UserStatsDatabase:
 
         for user in users:
             # Obtener todas las fechas por artista
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT artist, date(datetime(timestamp, 'unixepoch')) as play_date, COUNT(*) as daily_plays
                 FROM scrobbles s
                 WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1121,14 +1176,12 @@ class UserStatsDatabase:
 
     def get_top_artists_for_genre(self, user: str, genre: str, from_year: int, to_year: int, limit: int = 5, mbid_only: bool = False) -> List[Dict]:
         """Obtiene top artistas para un género específico - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT s.artist, COUNT(*) as plays
             FROM scrobbles s
             JOIN artist_genres ag ON s.artist = ag.artist
@@ -1142,16 +1195,51 @@ class UserStatsDatabase:
 
         return [{'name': row['artist'], 'plays': row['plays']} for row in cursor.fetchall()]
 
+    def get_top_artists_for_genres(self, user: str, genres: List[str], from_year: int, to_year: int, limit: int = 5, mbid_only: bool = False) -> Dict[str, List[Dict]]:
+        """Obtiene top artistas de varios géneros en una sola consulta - con filtro MBID"""
+        if not genres:
+            return {}
+
+        from_timestamp = int(datetime(from_year, 1, 1).timestamp())
+        to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
+
+        mbid_filter = self._get_mbid_filter(mbid_only, 's')
+        genre_values = ','.join(['(?)'] * len(genres))
+
+        cursor = self._execute_tuples(f'''
+            WITH g(genre) AS (VALUES {genre_values}),
+            genre_artists AS (
+                SELECT g.genre, s.artist, COUNT(*) as plays
+                FROM scrobbles s
+                JOIN artist_genres ag ON s.artist = ag.artist
+                JOIN g ON ag.genres LIKE '%"' || g.genre || '"%'
+                WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
+                {mbid_filter}
+                GROUP BY g.genre, s.artist
+            )
+            SELECT genre, artist, plays FROM (
+                SELECT genre, artist, plays,
+                       ROW_NUMBER() OVER (PARTITION BY genre ORDER BY plays DESC) as rn
+                FROM genre_artists
+            )
+            WHERE rn <= ?
+            ORDER BY genre, rn
+        ''', (*genres, user, from_timestamp, to_timestamp, limit))
+
+        artists_by_genre = {genre: [] for genre in genres}
+        for genre, artist, plays in cursor:
+            artists_by_genre[genre].append({'name': artist, 'plays': plays})
+
+        return artists_by_genre
+
     def get_one_hit_wonders_for_user(self, user: str, from_year: int, to_year: int, min_scrobbles: int = 25, limit: int = 10, mbid_only: bool = False) -> List[Dict]:
         """Obtiene artistas con una sola canción y más de min_scrobbles reproducciones - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, track, COUNT(*) as total_plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1166,15 +1254,13 @@ class UserStatsDatabase:
 
     def get_new_artists_for_user(self, user: str, from_year: int, to_year: int, limit: int = 10, mbid_only: bool = False) -> List[Dict]:
         """Obtiene artistas nuevos (sin scrobbles antes del período) - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         # Obtener artistas del período actual
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, COUNT(*) as plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1185,7 +1271,7 @@ class UserStatsDatabase:
         current_artists = {row['artist']: row['plays'] for row in cursor.fetchall()}
 
         # Obtener artistas de períodos anteriores
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT DISTINCT artist
             FROM scrobbles s
             WHERE user = ? AND timestamp < ?
@@ -1206,14 +1292,12 @@ class UserStatsDatabase:
 
     def get_artist_monthly_ranks(self, user: str, from_year: int, to_year: int, min_monthly_scrobbles: int = 50, mbid_only: bool = False) -> Dict[str, Dict]:
         """Obtiene rankings mensuales de artistas para calcular cambios de ranking - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist,
                    strftime('%Y-%m', datetime(timestamp, 'unixepoch')) as month,
                    COUNT(*) as plays
@@ -1327,8 +1411,6 @@ class UserStatsDatabase:
 
     def get_user_individual_evolution_data(self, user: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict:
         """Obtiene todos los datos de evolución individual del usuario con detalles mejorados - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         evolution_data = {}
         years = list(range(from_year, to_year + 1))
 
@@ -1344,7 +1426,7 @@ class UserStatsDatabase:
             genres_evolution[genre] = {}
             genres_details[genre] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -1356,7 +1438,7 @@ class UserStatsDatabase:
                 genres_evolution[genre][year] = result['plays'] if result else 0
 
                 # Obtener top 5 artistas para este género en este año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, COUNT(*) as plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -1377,7 +1459,7 @@ class UserStatsDatabase:
         }
 
         # 2. Top 10 sellos por año - CON ARTISTAS QUE CONTRIBUYEN
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT al.label, COUNT(*) as total_plays
             FROM scrobbles s
             LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1397,7 +1479,7 @@ class UserStatsDatabase:
             labels_evolution[label] = {}
             labels_details[label] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1409,7 +1491,7 @@ class UserStatsDatabase:
                 labels_evolution[label][year] = result['plays'] if result else 0
 
                 # Obtener top 5 artistas para este sello en este año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, COUNT(*) as plays
                     FROM scrobbles s
                     LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1430,7 +1512,7 @@ class UserStatsDatabase:
         }
 
         # 3. Top 10 artistas por año
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, COUNT(*) as total_plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1446,7 +1528,7 @@ class UserStatsDatabase:
         for artist in top_artists:
             artists_evolution[artist] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1470,7 +1552,7 @@ class UserStatsDatabase:
             one_hit_evolution[artist] = {}
             one_hit_details[artist] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1480,7 +1562,7 @@ class UserStatsDatabase:
                 one_hit_evolution[artist][year] = result['plays'] if result else 0
 
                 # Obtener la canción única
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT track, COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1520,7 +1602,7 @@ class UserStatsDatabase:
             streak_details[artist] = {}
             for year in years:
                 # Calcular días únicos por año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(DISTINCT date(datetime(timestamp, 'unixepoch'))) as days_count
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1551,7 +1633,7 @@ class UserStatsDatabase:
             track_count_evolution[artist] = {}
             track_count_details[artist] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(DISTINCT track) as track_count
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1562,7 +1644,7 @@ class UserStatsDatabase:
                 track_count_evolution[artist][year] = track_count
 
                 # Obtener top 10 álbumes para este año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT album, COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1589,7 +1671,7 @@ class UserStatsDatabase:
             artist = artist_data['name']
             new_artists_evolution[artist] = {}
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1619,7 +1701,7 @@ class UserStatsDatabase:
                 category_evolution[artist] = {}
                 category_details[artist] = {}
                 for year in years:
-                    cursor.execute(f'''
+                    cursor = self.conn.execute(f'''
                         SELECT COUNT(*) as plays
                         FROM scrobbles s
                         WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1629,7 +1711,7 @@ class UserStatsDatabase:
                     category_evolution[artist][year] = result['plays'] if result else 0
 
                     # Obtener top 10 canciones para este año
-                    cursor.execute(f'''
+                    cursor = self.conn.execute(f'''
                         SELECT track, COUNT(*) as plays
                         FROM scrobbles s
                         WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1652,8 +1734,6 @@ class UserStatsDatabase:
 
     def get_user_individual_evolution_data_cumulative(self, user: str, from_year: int, to_year: int, mbid_only: bool = False) -> Dict:
         """Obtiene todos los datos de evolución individual del usuario de forma ACUMULATIVA - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         evolution_data = {}
         years = list(range(from_year, to_year + 1))
 
@@ -1671,7 +1751,7 @@ class UserStatsDatabase:
             cumulative_count = 0
             for year in years:
                 # Obtener datos del año actual
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -1687,7 +1767,7 @@ class UserStatsDatabase:
                 genres_evolution[genre][year] = cumulative_count
 
                 # Obtener top 5 artistas para este género en este año (no acumulativo)
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, COUNT(*) as plays
                     FROM scrobbles s
                     JOIN artist_genres ag ON s.artist = ag.artist
@@ -1708,7 +1788,7 @@ class UserStatsDatabase:
         }
 
         # 2. Top 10 sellos por año - ACUMULATIVO
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT al.label, COUNT(*) as total_plays
             FROM scrobbles s
             LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1729,7 +1809,7 @@ class UserStatsDatabase:
             labels_details[label] = {}
             cumulative_count = 0
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1745,7 +1825,7 @@ class UserStatsDatabase:
                 labels_evolution[label][year] = cumulative_count
 
                 # Obtener top 5 artistas para este sello en este año (no acumulativo)
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT s.artist, COUNT(*) as plays
                     FROM scrobbles s
                     LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -1766,7 +1846,7 @@ class UserStatsDatabase:
         }
 
         # 3. Top 10 artistas por año - ACUMULATIVO
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, COUNT(*) as total_plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -1783,7 +1863,7 @@ class UserStatsDatabase:
             artists_evolution[artist] = {}
             cumulative_count = 0
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1812,7 +1892,7 @@ class UserStatsDatabase:
             one_hit_details[artist] = {}
             cumulative_count = 0
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1826,7 +1906,7 @@ class UserStatsDatabase:
                 one_hit_evolution[artist][year] = cumulative_count
 
                 # Obtener la canción única
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT track, COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1867,7 +1947,7 @@ class UserStatsDatabase:
             cumulative_days = 0
             for year in years:
                 # Calcular días únicos por año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(DISTINCT date(datetime(timestamp, 'unixepoch'))) as days_count
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1905,7 +1985,7 @@ class UserStatsDatabase:
             all_tracks_so_far = set()
             for year in years:
                 # Obtener canciones de este año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT DISTINCT track
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1918,7 +1998,7 @@ class UserStatsDatabase:
                 track_count_evolution[artist][year] = len(all_tracks_so_far)
 
                 # Obtener top 10 álbumes para este año
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT album, COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1946,7 +2026,7 @@ class UserStatsDatabase:
             new_artists_evolution[artist] = {}
             cumulative_count = 0
             for year in years:
-                cursor.execute(f'''
+                cursor = self.conn.execute(f'''
                     SELECT COUNT(*) as plays
                     FROM scrobbles s
                     WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1981,7 +2061,7 @@ class UserStatsDatabase:
                 category_details[artist] = {}
                 cumulative_count = 0
                 for year in years:
-                    cursor.execute(f'''
+                    cursor = self.conn.execute(f'''
                         SELECT COUNT(*) as plays
                         FROM scrobbles s
                         WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -1995,7 +2075,7 @@ class UserStatsDatabase:
                     category_evolution[artist][year] = cumulative_count
 
                     # Obtener top 10 canciones para este año
-                    cursor.execute(f'''
+                    cursor = self.conn.execute(f'''
                         SELECT track, COUNT(*) as plays
                         FROM scrobbles s
                         WHERE user = ? AND artist = ? AND strftime('%Y', datetime(timestamp, 'unixepoch')) = ?
@@ -2018,14 +2098,12 @@ class UserStatsDatabase:
 
     def get_top_albums_for_artists(self, user: str, artists: List[str], from_year: int, to_year: int, limit: int = 5) -> Dict[str, List]:
         """Obtiene top álbumes para artistas específicos"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         albums_data = {}
         for artist in artists[:10]:  # Limitar artistas
-            cursor.execute('''
+            cursor = self.conn.execute('''
                 SELECT album, COUNT(*) as plays
                 FROM scrobbles
                 WHERE user = ? AND artist = ? AND timestamp >= ? AND timestamp <= ?
@@ -2041,8 +2119,6 @@ class UserStatsDatabase:
 
     def get_top_tracks_for_albums(self, user: str, albums: List[str], from_year: int, to_year: int, limit: int = 5) -> Dict[str, List]:
         """Obtiene top canciones para álbumes específicos"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -2051,7 +2127,7 @@ class UserStatsDatabase:
             # Separar artista y álbum
             if ' - ' in album:
                 artist, album_name = album.split(' - ', 1)
-                cursor.execute('''
+                cursor = self.conn.execute('''
                     SELECT track, COUNT(*) as plays
                     FROM scrobbles
                     WHERE user = ? AND artist = ? AND album = ? AND timestamp >= ? AND timestamp <= ?
@@ -2076,15 +2152,13 @@ class UserStatsDatabase:
 
     def get_common_album_release_years_with_users(self, user: str, other_users: List[str], from_year: int, to_year: int, mbid_only: bool = False) -> Dict[str, Dict[str, int]]:
         """Obtiene años de lanzamiento de álbumes comunes entre el usuario y otros usuarios - con filtro MBID"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only, 's')
 
         # Obtener años de lanzamiento del usuario principal
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT ard.release_year, COUNT(*) as plays
             FROM scrobbles s
             LEFT JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album
@@ -2106,17 +2180,16 @@ class UserStatsDatabase:
             if other_user == user:
                 continue
 
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT ard.release_year, COUNT(*) as plays
                 FROM scrobbles s
                 LEFT JOIN album_release_dates ard ON s.artist = ard.artist AND s.album = ard.album
                 WHERE s.user = ? AND s.timestamp >= ? AND s.timestamp <= ?
                   AND ard.release_year IS NOT NULL
                   AND s.album IS NOT NULL AND s.album != ''
-                  AND ard.release_year IN ({','.join(['?'] * len(user_years))})
                 {mbid_filter}
                 GROUP BY ard.release_year
-            ''', [other_user, from_timestamp, to_timestamp] + list(user_years.keys()))
+            ''', (other_user, from_timestamp, to_timestamp))
 
             other_user_years = {row['release_year']: row['plays'] for row in cursor.fetchall()}
 
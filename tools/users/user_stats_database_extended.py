@@ -21,8 +21,6 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_top_artists(self, user: str, from_year: int, to_year: int,
                            limit: Optional[int] = 15, mbid_only: bool = False) -> List[Tuple[str, int]]:
         """Obtiene top artistas del usuario con conteo de reproducciones"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -30,7 +28,7 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
 
         limit_clause = f"LIMIT {limit}" if limit else ""
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist, COUNT(*) as plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -45,8 +43,6 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_top_albums(self, user: str, from_year: int, to_year: int,
                           limit: Optional[int] = 15, mbid_only: bool = False) -> List[Tuple[str, int]]:
         """Obtiene top álbumes del usuario con conteo de reproducciones"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -54,7 +50,7 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
 
         limit_clause = f"LIMIT {limit}" if limit else ""
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT CASE
                 WHEN album IS NULL OR album = '' THEN artist || ' - [Unknown Album]'
                 ELSE artist || ' - ' || album
@@ -73,8 +69,6 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_top_tracks(self, user: str, from_year: int, to_year: int,
                           limit: Optional[int] = 15, mbid_only: bool = False) -> List[Tuple[str, int]]:
         """Obtiene top canciones del usuario con conteo de reproducciones"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
@@ -82,7 +76,7 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
 
         limit_clause = f"LIMIT {limit}" if limit else ""
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT artist || ' - ' || track as track_display, COUNT(*) as plays
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -98,14 +92,12 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_unique_count_artists(self, user: str, from_year: int, to_year: int,
                                     mbid_only: bool = False) -> int:
         """Obtiene el número total de artistas únicos del usuario"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT COUNT(DISTINCT artist) as unique_artists
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -118,14 +110,12 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_unique_count_albums(self, user: str, from_year: int, to_year: int,
                                    mbid_only: bool = False) -> int:
         """Obtiene el número total de álbumes únicos del usuario"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT COUNT(DISTINCT artist || '|' || COALESCE(album, '[Unknown Album]')) as unique_albums
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -138,14 +128,12 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_unique_count_tracks(self, user: str, from_year: int, to_year: int,
                                    mbid_only: bool = False) -> int:
         """Obtiene el número total de canciones únicas del usuario"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT COUNT(DISTINCT artist || '|' || track) as unique_tracks
             FROM scrobbles s
             WHERE user = ? AND timestamp >= ? AND timestamp <= ?
@@ -159,15 +147,13 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_unique_count_genres_by_provider(self, user: str, from_year: int, to_year: int,
                                                provider: str = 'lastfm', mbid_only: bool = False) -> int:
         """Obtiene el número total de géneros únicos del usuario por proveedor"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
         # Primero intentar con la tabla de géneros detallados
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT COUNT(DISTINCT agd.genre) as unique_genres
             FROM scrobbles s
             JOIN artist_genres_detailed agd ON s.artist = agd.artist
@@ -181,7 +167,7 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
 
         # Si no hay datos, intentar con tabla antigua (fallback para Last.fm)
         if count == 0 and provider == 'lastfm':
-            cursor.execute(f'''
+            cursor = self.conn.execute(f'''
                 SELECT COUNT(DISTINCT genre_extracted.value) as unique_genres
                 FROM scrobbles s
                 JOIN artist_genres ag ON s.artist = ag.artist,
@@ -199,14 +185,12 @@ class UserStatsDatabaseExtended(UserStatsDatabase):
     def get_user_unique_count_labels(self, user: str, from_year: int, to_year: int,
                                    mbid_only: bool = False) -> int:
         """Obtiene el número total de sellos únicos del usuario"""
-        cursor = self.conn.cursor()
-
         from_timestamp = int(datetime(from_year, 1, 1).timestamp())
         to_timestamp = int(datetime(to_year + 1, 1, 1).timestamp()) - 1
 
         mbid_filter = self._get_mbid_filter(mbid_only)
 
-        cursor.execute(f'''
+        cursor = self.conn.execute(f'''
             SELECT COUNT(DISTINCT al.label) as unique_labels
             FROM scrobbles s
             LEFT JOIN album_labels al ON s.artist = al.artist AND s.album = al.album
@@ -7,9 +7,16 @@ FIXES:
 - Restaura funciones completas para scatter charts y gráficos de evolución
 """
 
+import io
 import json
 import os
-from typing import Dict, List
+from string import Template
+from typing import Dict, List, Optional, TextIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class UserStatsHTMLGeneratorFixed:
@@ -21,12 +28,28 @@ class UserStatsHTMLGeneratorFixed:
             '#94e2d5', '#89dceb', '#74c7ec', '#89b4fa', '#b4befe',
             '#f5c2e7', '#f2cdcd', '#ddb6f2', '#ffc6ff', '#caffbf'
         ]
+        # Rellenos translúcidos, calculados una vez por color de la paleta
+        self.fill_colors = [color + '20' for color in self.colors]
+
+    def generate_html(self, all_user_stats: Dict, users: List[str], years_back: int,
+                      out: Optional[TextIO] = None, details_dir: Optional[str] = None) -> Optional[str]:
+        """Genera el HTML completo para estadísticas de usuarios.
+
+        Si se pasa out, el HTML se escribe por secciones en ese stream y se devuelve None;
+        si no, se devuelve como string.
+        Si se pasa details_dir (carpeta junto al HTML), los detalles de los popups de evolución
+        se escriben ahí como JSON y el navegador los pide al abrir un popup; si no, van incrustados.
+        """
+        if out is None:
+            buffer = io.StringIO()
+            self.generate_html(all_user_stats, users, years_back, out=buffer, details_dir=details_dir)
+            return buffer.getvalue()
 
-    def generate_html(self, all_user_stats: Dict, users: List[str], years_back: int) -> str:
-        """Genera el HTML completo para estadísticas de usuarios"""
-        users_json = json.dumps(users, ensure_ascii=False)
-        stats_json = json.dumps(all_user_stats, indent=2, ensure_ascii=False)
-        colors_json = json.dumps(self.colors, ensure_ascii=False)
+        all_user_stats = self._prepare_chart_payload(all_user_stats, details_dir)
+        details_url = os.path.basename(os.path.normpath(details_dir)) if details_dir else None
+
+        users_json = self._to_json(users)
+        colors_json = self._to_json(self.colors)
 
         # ✅ FIX: Añadir soporte para iconos de usuario
         icons_env = os.getenv('LASTFM_USERS_ICONS', '')
@@ -36,41 +59,156 @@ class UserStatsHTMLGeneratorFixed:
                 if ':' in pair:
                     user, icon = pair.split(':', 1)
                     user_icons[user.strip()] = icon.strip()
-        user_icons_json = json.dumps(user_icons, ensure_ascii=False)
+        user_icons_json = self._to_json(user_icons)
+
+        placeholders = {
+            'users_json': users_json,
+            'colors_json': colors_json,
+            'user_icons_json': user_icons_json,
+            'details_url_json': self._to_json(details_url)
+        }
+
+        # El JSON de estadísticas (la parte grande) se escribe aparte, sin concatenarlo a la plantilla;
+        # va dentro de un <script type="application/json">, así que se escapa "</" para no cerrarlo
+        out.write(_HTML_HEAD.substitute(placeholders))
+        out.write(self._to_json(all_user_stats).replace('</', '<\\/'))
+        out.write(_HTML_TAIL.substitute(placeholders))
+        return None
+
+    def _prepare_chart_payload(self, all_user_stats: Dict, details_dir: Optional[str] = None) -> Dict:
+        """Devuelve una copia de las estadísticas lista para el navegador (no modifica all_user_stats):
+        las series de evolución pasan a ser datasets de Chart.js con sus colores y los detalles de evolución
+        se aplanan por "usuario|año"; si hay details_dir, se escriben en details_dir/<usuario>/<tipo>.json
+        en lugar de incrustarse"""
+        payload = {}
+
+        for user, user_stats in all_user_stats.items():
+            user_dir = None
+            if details_dir:
+                user_dir = os.path.join(details_dir, user)
+                os.makedirs(user_dir, exist_ok=True)
+
+            evolution = {}
+            for evolution_type, evolution_data in user_stats.get('evolution', {}).items():
+                if not isinstance(evolution_data, dict):
+                    evolution[evolution_type] = evolution_data
+                    continue
+
+                evolution_data = dict(evolution_data)
+
+                # Las coincidencias agrupan artistas, álbumes y canciones
+                series = evolution_data.pop('series', None)
+                if series is not None:
+                    if evolution_type == 'coincidences':
+                        evolution_data['datasets'] = {
+                            entity: self._to_datasets(entity_series) for entity, entity_series in series.items()
+                        }
+                    else:
+                        evolution_data['datasets'] = self._to_datasets(series)
+
+                if 'details' in evolution_data:
+                    details = evolution_data.pop('details')
+                    files = details if evolution_type == 'coincidences' else {evolution_type: details}
+                    files = {name: self._flatten_details(data) for name, data in files.items()}
+
+                    if user_dir:
+                        for name, data in files.items():
+                            with open(os.path.join(user_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+                                f.write(self._to_json(data))
+                    else:
+                        evolution_data['details'] = files if evolution_type == 'coincidences' else files[evolution_type]
+
+                evolution[evolution_type] = evolution_data
+
+            payload[user] = {**user_stats, 'evolution': evolution}
+
+        return payload
+
+    def _to_datasets(self, series: List[Dict]) -> List[Dict]:
+        """Convierte series {label, data} en datasets de línea de Chart.js con colores ya resueltos"""
+        colors_count = len(self.colors)
+        return [
+            {
+                'label': item['label'],
+                'data': item['data'],
+                'borderColor': self.colors[i % colors_count],
+                'backgroundColor': self.fill_colors[i % colors_count],
+                'tension': 0.4,
+                'fill': False
+            }
+            for i, item in enumerate(series)
+        ]
+
+    def _flatten_details(self, details: Dict) -> Dict[str, List]:
+        """Aplana {usuario: {año: top}} en {"usuario|año": top} (sin los vacíos) para buscar con una sola clave"""
+        return {
+            f'{label}|{year}': top
+            for label, by_year in details.items()
+            for year, top in by_year.items()
+            if top
+        }
+
+    def _to_json(self, data) -> str:
+        """Serializa a JSON compacto con orjson si está disponible (claves no-str incluidas), si no con json"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+    def _format_number(self, number: int) -> str:
+        """Formatea números con separadores de miles"""
+        return f"{number:,}".replace(",", ".")
 
-        return f"""<!DOCTYPE html>
+
+# Plantilla del HTML completo: se compila una vez al importar el módulo
+# (marcadores $users_json, $stats_json, $colors_json y $user_icons_json; "$$" es un "$" literal)
+_HTML_TEMPLATE = Template("""<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Last.fm Usuarios - Estadísticas Individuales</title>
     <link rel="icon" type="image/png" href="images/music.png">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <!-- Chart.js en ESM registrando solo lo que usa la página (línea, tarta y dispersión);
+         los módulos se ejecutan antes de DOMContentLoaded, así que Chart ya existe al inicializar -->
+    <script type="module">
+        import {
+            Chart, LineController, PieController, ScatterController,
+            LineElement, PointElement, ArcElement,
+            CategoryScale, LinearScale, Tooltip, Legend
+        } from 'https://cdn.jsdelivr.net/npm/chart.js@4/+esm';
+
+        Chart.register(
+            LineController, PieController, ScatterController,
+            LineElement, PointElement, ArcElement,
+            CategoryScale, LinearScale, Tooltip, Legend
+        );
+        window.Chart = Chart;
+    </script>
     <style>
-        * {{
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
 
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             background: #1e1e2e;
             color: #cdd6f4;
             padding: 20px;
             line-height: 1.6;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 1600px;
             margin: 0 auto;
             background: #181825;
             border-radius: 16px;
             box-shadow: 0 8px 32px rgba(0,0,0,0.3);
             overflow: hidden;
-        }}
+        }
 
-        header {{
+        header {
             background: #1e1e2e;
             padding: 20px 30px;
             border-bottom: 2px solid #cba6f7;
@@ -78,28 +216,28 @@ class UserStatsHTMLGeneratorFixed:
             justify-content: space-between;
             align-items: center;
             min-height: 80px;
-        }}
+        }
 
-        .header-content {{
+        .header-content {
             display: flex;
             flex-direction: column;
             align-items: center;
             flex-grow: 1;
-        }}
+        }
 
-        h1 {{
+        h1 {
             font-size: 2em;
             color: #cba6f7;
             margin-bottom: 10px;
-        }}
+        }
 
-        .nav-buttons {{
+        .nav-buttons {
             display: flex;
             gap: 15px;
             margin-top: 10px;
-        }}
+        }
 
-        .nav-button {{
+        .nav-button {
             padding: 8px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -111,21 +249,21 @@ class UserStatsHTMLGeneratorFixed:
             font-weight: 600;
             text-decoration: none;
             display: inline-block;
-        }}
+        }
 
-        .nav-button:hover {{
+        .nav-button:hover {
             border-color: #cba6f7;
             background: #45475a;
             color: #cdd6f4;
-        }}
+        }
 
-        .nav-button.current {{
+        .nav-button.current {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .user-button {{
+        .user-button {
             width: 50px;
             height: 50px;
             border-radius: 50%;
@@ -140,14 +278,14 @@ class UserStatsHTMLGeneratorFixed:
             justify-content: center;
             transition: all 0.3s;
             flex-shrink: 0;
-        }}
+        }
 
-        .user-button:hover {{
+        .user-button:hover {
             background: #b4a3e8;
             transform: scale(1.1);
-        }}
+        }
 
-        .user-modal {{
+        .user-modal {
             display: none;
             position: fixed;
             top: 0;
@@ -157,9 +295,9 @@ class UserStatsHTMLGeneratorFixed:
             background: rgba(0,0,0,0.8);
             z-index: 1000;
             backdrop-filter: blur(5px);
-        }}
+        }
 
-        .user-modal-content {{
+        .user-modal-content {
             position: absolute;
             top: 50%;
             left: 50%;
@@ -170,17 +308,17 @@ class UserStatsHTMLGeneratorFixed:
             width: 90%;
             max-width: 400px;
             border: 2px solid #cba6f7;
-        }}
+        }
 
-        .user-modal-header {{
+        .user-modal-header {
             color: #cba6f7;
             font-size: 1.3em;
             font-weight: 600;
             margin-bottom: 20px;
             text-align: center;
-        }}
+        }
 
-        .user-modal-close {{
+        .user-modal-close {
             position: absolute;
             top: 15px;
             right: 20px;
@@ -190,19 +328,19 @@ class UserStatsHTMLGeneratorFixed:
             font-size: 1.5em;
             cursor: pointer;
             padding: 0;
-        }}
+        }
 
-        .user-modal-close:hover {{
+        .user-modal-close:hover {
             color: #cba6f7;
-        }}
+        }
 
-        .user-options {{
+        .user-options {
             display: flex;
             flex-direction: column;
             gap: 10px;
-        }}
+        }
 
-        .user-option {{
+        .user-option {
             padding: 12px 20px;
             background: #313244;
             border: 2px solid #45475a;
@@ -211,33 +349,33 @@ class UserStatsHTMLGeneratorFixed:
             cursor: pointer;
             transition: all 0.3s;
             text-align: center;
-        }}
+        }
 
-        .user-option:hover {{
+        .user-option:hover {
             background: #45475a;
             border-color: #cba6f7;
-        }}
+        }
 
-        .user-option.selected {{
+        .user-option.selected {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .content {{
+        .content {
             padding: 30px;
-        }}
+        }
 
-        .nav-tabs {{
+        .nav-tabs {
             display: flex;
             gap: 15px;
             margin-bottom: 30px;
             border-bottom: 2px solid #313244;
             padding-bottom: 15px;
             flex-wrap: wrap;
-        }}
+        }
 
-        .nav-tab {{
+        .nav-tab {
             padding: 12px 20px;
             background: #313244;
             color: #cdd6f4;
@@ -247,21 +385,21 @@ class UserStatsHTMLGeneratorFixed:
             transition: all 0.3s;
             font-weight: 600;
             position: relative;
-        }}
+        }
 
-        .nav-tab:hover {{
+        .nav-tab:hover {
             background: #45475a;
             border-color: #cba6f7;
-        }}
+        }
 
-        .nav-tab.active {{
+        .nav-tab.active {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
             border-bottom-color: #181825;
-        }}
+        }
 
-        .nav-tab.active::after {{
+        .nav-tab.active::after {
             content: '';
             position: absolute;
             bottom: -2px;
@@ -269,111 +407,111 @@ class UserStatsHTMLGeneratorFixed:
             right: 0;
             height: 2px;
             background: #181825;
-        }}
+        }
 
-        .user-header {{
+        .user-header {
             background: linear-gradient(135deg, #1e1e2e, #181825);
             padding: 25px;
             border-radius: 12px;
             margin-bottom: 30px;
             text-align: center;
-        }}
+        }
 
-        .user-name {{
+        .user-name {
             font-size: 1.4em;
             color: #cba6f7;
             font-weight: regular;
             margin-bottom: 15px;
-        }}
+        }
 
-        .summary-stats {{
+        .summary-stats {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(100px, 1fr));
             gap: 10px;
             max-width: 700px;
             margin: 0 auto;
-        }}
+        }
 
-        .summary-card {{
+        .summary-card {
             background: rgba(203, 166, 247, 0.1);
             padding: 10px;
             border-radius: 8px;
             text-align: center;
             border: 1px solid rgba(203, 166, 247, 0.3);
-        }}
+        }
 
-        .summary-card .number {{
+        .summary-card .number {
             font-size: 1.2em;
             font-weight: bold;
             color: #cba6f7;
             margin-bottom: 2px;
-        }}
+        }
 
-        .summary-card .label {{
+        .summary-card .label {
             font-size: 0.8em;
             color: #a6adc8;
             text-transform: uppercase;
-        }}
+        }
 
-        .tab-content {{
+        .tab-content {
             display: none;
-        }}
+        }
 
-        .tab-content.active {{
+        .tab-content.active {
             display: block;
-        }}
+        }
 
-        .charts-grid {{
+        .charts-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(400px, 1fr));
             gap: 25px;
-        }}
+        }
 
-        .chart-card {{
+        .chart-card {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 20px;
             border: 2px solid #313244;
             transition: border-color 0.3s;
-        }}
+        }
 
-        .chart-card:hover {{
+        .chart-card:hover {
             border-color: #cba6f7;
-        }}
+        }
 
-        .chart-header {{
+        .chart-header {
             margin-bottom: 15px;
-        }}
+        }
 
-        .chart-title {{
+        .chart-title {
             font-size: 1.2em;
             color: #cba6f7;
             margin-bottom: 8px;
             font-weight: 600;
-        }}
+        }
 
-        .chart-info {{
+        .chart-info {
             font-size: 0.9em;
             color: #a6adc8;
             padding: 8px 12px;
             background: #313244;
             border-radius: 6px;
             margin-top: 10px;
-        }}
+        }
 
-        .chart-wrapper {{
+        .chart-wrapper {
             width: 100%;
             height: 300px;
             position: relative;
-        }}
+        }
 
-        .scatter-chart-wrapper {{
+        .scatter-chart-wrapper {
             width: 100%;
             height: 250px;
             position: relative;
-        }}
+        }
 
-        .no-data {{
+        .no-data {
             display: flex;
             align-items: center;
             justify-content: center;
@@ -382,17 +520,17 @@ class UserStatsHTMLGeneratorFixed:
             border-radius: 8px;
             color: #a6adc8;
             font-style: italic;
-        }}
+        }
 
-        .provider-buttons {{
+        .provider-buttons {
             display: flex;
             gap: 10px;
             margin-bottom: 20px;
             justify-content: center;
             flex-wrap: wrap;
-        }}
+        }
 
-        .provider-btn {{
+        .provider-btn {
             padding: 8px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -402,81 +540,81 @@ class UserStatsHTMLGeneratorFixed:
             transition: all 0.3s;
             font-size: 0.9em;
             font-weight: 500;
-        }}
+        }
 
-        .provider-btn:hover {{
+        .provider-btn:hover {
             background: #45475a;
             border-color: #cba6f7;
-        }}
+        }
 
-        .provider-btn.active {{
+        .provider-btn.active {
             background: #cba6f7;
             color: #1e1e2e;
             border-color: #cba6f7;
-        }}
+        }
 
-        .genres-section {{
+        .genres-section {
             margin-bottom: 40px;
-        }}
+        }
 
-        .genres-section h3 {{
+        .genres-section h3 {
             color: #cba6f7;
             margin-bottom: 20px;
             font-size: 1.3em;
             text-align: center;
-        }}
+        }
 
-        .genres-pie-container {{
+        .genres-pie-container {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 25px;
             border: 2px solid #313244;
-        }}
+        }
 
-        .genres-pie-container h4 {{
+        .genres-pie-container h4 {
             color: #fab387;
             margin-bottom: 15px;
             text-align: center;
             font-size: 1.1em;
-        }}
+        }
 
-        .scatter-charts-grid {{
+        .scatter-charts-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(450px, 1fr));
             gap: 20px;
             margin-top: 20px;
-        }}
+        }
 
-        .scatter-chart-card {{
+        .scatter-chart-card {
             background: #1e1e2e;
             border-radius: 8px;
             padding: 15px;
             border: 1px solid #313244;
-        }}
+        }
 
-        .scatter-chart-card h5 {{
+        .scatter-chart-card h5 {
             color: #cba6f7;
             font-size: 1em;
             margin-bottom: 10px;
             text-align: center;
             font-weight: 600;
-        }}
+        }
 
-        .evolution-charts {{
+        .evolution-charts {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(600px, 1fr));
             gap: 25px;
-        }}
+        }
 
-        .data-type-buttons {{
+        .data-type-buttons {
             display: flex;
             gap: 10px;
             margin-bottom: 20px;
             justify-content: center;
             flex-wrap: wrap;
-        }}
+        }
 
-        .data-type-btn {{
+        .data-type-btn {
             padding: 8px 16px;
             background: #313244;
             color: #cdd6f4;
@@ -486,51 +624,51 @@ class UserStatsHTMLGeneratorFixed:
             transition: all 0.3s;
             font-size: 0.9em;
             font-weight: 600;
-        }}
+        }
 
-        .data-type-btn:hover {{
+        .data-type-btn:hover {
             border-color: #f38ba8;
             background: #45475a;
-        }}
+        }
 
-        .data-type-btn.active {{
+        .data-type-btn.active {
             background: #f38ba8;
             color: #1e1e2e;
             border-color: #f38ba8;
-        }}
+        }
 
-        .evolution-section {{
+        .evolution-section {
             margin-bottom: 40px;
-        }}
+        }
 
-        .evolution-section h3 {{
+        .evolution-section h3 {
             color: #cba6f7;
             font-size: 1.3em;
             margin-bottom: 20px;
             border-bottom: 2px solid #cba6f7;
             padding-bottom: 10px;
-        }}
+        }
 
-        .evolution-chart {{
+        .evolution-chart {
             background: #1e1e2e;
             border-radius: 12px;
             padding: 20px;
             border: 1px solid #313244;
-        }}
+        }
 
-        .evolution-chart h4 {{
+        .evolution-chart h4 {
             color: #cba6f7;
             font-size: 1.1em;
             margin-bottom: 15px;
             text-align: center;
-        }}
+        }
 
-        .line-chart-wrapper {{
+        .line-chart-wrapper {
             position: relative;
             height: 400px;
-        }}
+        }
 
-        .popup-overlay {{
+        .popup-overlay {
             position: fixed;
             top: 0;
             left: 0;
@@ -539,9 +677,9 @@ class UserStatsHTMLGeneratorFixed:
             background: rgba(0,0,0,0.8);
             z-index: 999;
             backdrop-filter: blur(5px);
-        }}
+        }
 
-        .popup {{
+        .popup {
             position: fixed;
             top: 50%;
             left: 50%;
@@ -555,9 +693,9 @@ class UserStatsHTMLGeneratorFixed:
             overflow-y: auto;
             z-index: 1000;
             box-shadow: 0 8px 32px rgba(0,0,0,0.5);
-        }}
+        }
 
-        .popup-header {{
+        .popup-header {
             color: #cba6f7;
             font-size: 1.1em;
             font-weight: 600;
@@ -567,27 +705,27 @@ class UserStatsHTMLGeneratorFixed:
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
+        }
 
-        .popup-close {{
+        .popup-close {
             background: none;
             border: none;
             color: #cdd6f4;
             font-size: 1.2em;
             cursor: pointer;
             padding: 0;
-        }}
+        }
 
-        .popup-close:hover {{
+        .popup-close:hover {
             color: #cba6f7;
-        }}
+        }
 
-        .popup-content {{
+        .popup-content {
             max-height: 300px;
             overflow-y: auto;
-        }}
+        }
 
-        .popup-item {{
+        .popup-item {
             padding: 8px 12px;
             background: #181825;
             margin-bottom: 5px;
@@ -596,57 +734,57 @@ class UserStatsHTMLGeneratorFixed:
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
+        }
 
-        .popup-item .name {{
+        .popup-item .name {
             color: #cdd6f4;
             font-weight: 600;
-        }}
+        }
 
-        .popup-item .count {{
+        .popup-item .count {
             color: #a6adc8;
             font-size: 0.9em;
-        }}
+        }
 
-        @media (max-width: 768px) {{
-            .charts-grid {{
+        @media (max-width: 768px) {
+            .charts-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
 
-            .scatter-charts-grid {{
+            .scatter-charts-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
 
-            .evolution-charts {{
+            .evolution-charts {
                 grid-template-columns: 1fr;
-            }}
+            }
 
-            .summary-stats {{
+            .summary-stats {
                 grid-template-columns: repeat(2, 1fr);
-            }}
+            }
 
-            .nav-tabs {{
+            .nav-tabs {
                 justify-content: center;
-            }}
+            }
 
-            .provider-buttons {{
+            .provider-buttons {
                 flex-direction: column;
                 align-items: center;
-            }}
+            }
 
-            h1 {{
+            h1 {
                 font-size: 1.5em;
-            }}
+            }
 
-            .user-name {{
+            .user-name {
                 font-size: 1.5em;
-            }}
+            }
 
-            .popup {{
+            .popup {
                 width: 90%;
                 max-width: none;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
@@ -1052,27 +1190,112 @@ class UserStatsHTMLGeneratorFixed:
         </div>
     </div>
 
+    <!-- Estadísticas como JSON de datos: JSON.parse es más rápido que compilar un literal JS enorme -->
+    <script type="application/json" id="userStatsData">$stats_json</script>
+
     <script>
         // Datos globales
-        const allUsers = {users_json};
-        const allStats = {stats_json};
-        const colors = {colors_json};
-        const userIcons = {user_icons_json}; // ✅ FIX: Añadir iconos de usuario
+        const allUsers = $users_json;
+        const allStats = JSON.parse(document.getElementById('userStatsData').textContent);
+        const colors = $colors_json;
+        const FILL_COLORS = colors.map(color => color + '20'); // Rellenos translúcidos, calculados una vez
+        const pieColorsCache = new Map(); // n -> colors.slice(0, n)
+        const userIcons = $user_icons_json; // ✅ FIX: Añadir iconos de usuario
+        const detailsUrl = $details_url_json; // Carpeta de detalles de evolución (null = incrustados)
+        const evolutionDetailsCache = new Map();
 
         // Variables globales
         let currentUser = null;
         let currentView = 'individual';
         let currentProvider = 'lastfm';
         let currentDataType = 'annual';
-        let charts = {{}};
+        const charts = new Map(); // canvasId -> Chart, reutilizados entre renders
+        const chartViews = new Map(); // canvasId -> vista que lo dibujó
+        let chartPass = null;
+
+        // Sin animaciones: cada chart se dibuja en un solo frame ({} = animaciones por defecto de Chart.js)
+        const CHART_ANIMATION = false;
+
+        // Opciones comunes de Chart.js, definidas una sola vez. Cada config las copia con
+        // spread porque Chart.js añade propiedades (p. ej. scales) al objeto options que recibe.
+        const TOOLTIP_OPTS = {
+            backgroundColor: '#1e1e2e',
+            titleColor: '#cba6f7',
+            bodyColor: '#cdd6f4',
+            borderColor: '#cba6f7',
+            borderWidth: 1
+        };
+
+        const PIE_OPTS = {
+            responsive: true,
+            animation: CHART_ANIMATION,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        color: '#cdd6f4',
+                        padding: 15,
+                        usePointStyle: true
+                    }
+                },
+                tooltip: TOOLTIP_OPTS
+            }
+        };
+
+        const LINE_OPTS = {
+            responsive: true,
+            animation: CHART_ANIMATION,
+            // Series densas ya ordenadas por año: Chart.js puede saltarse comprobaciones de orden y huecos
+            normalized: true,
+            spanGaps: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        color: '#cdd6f4',
+                        padding: 10,
+                        usePointStyle: true
+                    }
+                },
+                tooltip: TOOLTIP_OPTS
+            },
+            scales: {
+                x: {
+                    ticks: {
+                        color: '#a6adc8'
+                    },
+                    grid: {
+                        color: '#313244'
+                    }
+                },
+                y: {
+                    ticks: {
+                        color: '#a6adc8'
+                    },
+                    grid: {
+                        color: '#313244'
+                    }
+                }
+            }
+        };
         let genresData = null; // ✅ FIX: Inicializar variable global genresData
 
+        // Elementos del popup (el script va después de su HTML, ya existen)
+        const POPUP = {
+            title: document.getElementById('popupTitle'),
+            content: document.getElementById('popupContent'),
+            overlay: document.getElementById('popupOverlay'),
+            box: document.getElementById('popup')
+        };
+
         // Inicialización
-        document.addEventListener('DOMContentLoaded', function() {{
+        document.addEventListener('DOMContentLoaded', function() {
             initializeApp();
-        }});
+        });
 
-        function initializeApp() {{
+        function initializeApp() {
             setupUserModal();
             setupNavigation();
             setupProviderButtons();
@@ -1082,76 +1305,90 @@ class UserStatsHTMLGeneratorFixed:
             const savedUser = loadSavedUser();
             const userToSelect = savedUser || (allUsers.length > 0 ? allUsers[0] : null);
 
-            if (userToSelect) {{
+            if (userToSelect) {
                 selectUser(userToSelect);
                 updateUserButtonIcon(userToSelect);
                 updateSelectedUserOption(userToSelect);
-            }}
-        }}
-
-        function setupUserModal() {{
+            }
+        }
+
+        // Agrupa llamadas seguidas (clics rápidos en usuarios, pestañas o botones) en un solo render
+        function debounce(fn, ms) {
+            let timer = null;
+            return (...args) => {
+                clearTimeout(timer);
+                timer = setTimeout(() => fn(...args), ms);
+            };
+        }
+
+        const RENDER_DEBOUNCE_MS = 150;
+        const selectUserDebounced = debounce(username => selectUser(username), RENDER_DEBOUNCE_MS);
+        const renderGenresChartsDebounced = debounce(userStats => renderGenresCharts(userStats), RENDER_DEBOUNCE_MS);
+        const renderIndividualChartsDebounced = debounce(userStats => renderIndividualCharts(userStats), RENDER_DEBOUNCE_MS);
+
+        function setupUserModal() {
             const userButton = document.getElementById('userButton');
             const userModal = document.getElementById('userModal');
             const closeModal = document.getElementById('closeModal');
             const userOptions = document.getElementById('userOptions');
 
             // Llenar opciones de usuarios con iconos
-            userOptions.innerHTML = allUsers.map(user => {{
+            userOptions.innerHTML = allUsers.map(user => {
                 const icon = userIcons[user];
-                let optionHTML = `<div class="user-option" data-user="${{user}}">`;
-
-                if (icon) {{
-                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {{
-                        optionHTML += `<img src="${{icon}}" alt="${{user}}" style="width:24px;height:24px;border-radius:50%;vertical-align:middle;margin-right:8px;"> ${{user}}`;
-                    }} else {{
-                        optionHTML += `<span style="font-size:1.2em;margin-right:8px;">${{icon}}</span> ${{user}}`;
-                    }}
-                }} else {{
+                let optionHTML = `<div class="user-option" data-user="$${user}">`;
+
+                if (icon) {
+                    if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {
+                        optionHTML += `<img src="$${icon}" alt="$${user}" style="width:24px;height:24px;border-radius:50%;vertical-align:middle;margin-right:8px;"> $${user}`;
+                    } else {
+                        optionHTML += `<span style="font-size:1.2em;margin-right:8px;">$${icon}</span> $${user}`;
+                    }
+                } else {
                     optionHTML += user;
-                }}
+                }
 
                 optionHTML += '</div>';
                 return optionHTML;
-            }}).join('');
+            }).join('');
 
             // Event listeners
-            userButton.addEventListener('click', () => {{
+            userButton.addEventListener('click', () => {
                 userModal.style.display = 'block';
-            }});
+            });
 
-            closeModal.addEventListener('click', () => {{
+            closeModal.addEventListener('click', () => {
                 userModal.style.display = 'none';
-            }});
+            });
 
-            userModal.addEventListener('click', (e) => {{
-                if (e.target === userModal) {{
+            userModal.addEventListener('click', (e) => {
+                if (e.target === userModal) {
                     userModal.style.display = 'none';
-                }}
-            }});
+                }
+            });
 
-            userOptions.addEventListener('click', (e) => {{
-                if (e.target.classList.contains('user-option')) {{
+            userOptions.addEventListener('click', (e) => {
+                if (e.target.classList.contains('user-option')) {
                     const username = e.target.dataset.user;
-                    selectUser(username);
+                    selectUserDebounced(username);
                     userModal.style.display = 'none';
 
                     // Guardar usuario seleccionado en localStorage
-                    if (username) {{
+                    if (username) {
                         localStorage.setItem('lastfm_selected_user', username);
-                    }}
+                    }
 
                     updateUserButtonIcon(username);
                     updateSelectedUserOption(username);
-                }}
-            }});
-        }}
+                }
+            });
+        }
 
-        function setupNavigation() {{
+        function setupNavigation() {
             const navTabs = document.querySelectorAll('.nav-tab');
             const tabContents = document.querySelectorAll('.tab-content');
 
-            navTabs.forEach(tab => {{
-                tab.addEventListener('click', () => {{
+            navTabs.forEach(tab => {
+                tab.addEventListener('click', () => {
                     const view = tab.dataset.view;
 
                     // Actualizar pestañas activas
@@ -1159,27 +1396,27 @@ class UserStatsHTMLGeneratorFixed:
                     tab.classList.add('active');
 
                     // Mostrar contenido correspondiente
-                    tabContents.forEach(content => {{
+                    tabContents.forEach(content => {
                         content.classList.remove('active');
-                    }});
+                    });
 
                     document.getElementById(view + 'Tab').classList.add('active');
 
                     currentView = view;
 
                     // Re-render para la nueva vista
-                    if (currentUser) {{
-                        selectUser(currentUser);
-                    }}
-                }});
-            }});
-        }}
-
-        function setupProviderButtons() {{
+                    if (currentUser) {
+                        selectUserDebounced(currentUser);
+                    }
+                });
+            });
+        }
+
+        function setupProviderButtons() {
             const providerBtns = document.querySelectorAll('.provider-btn');
 
-            providerBtns.forEach(btn => {{
-                btn.addEventListener('click', () => {{
+            providerBtns.forEach(btn => {
+                btn.addEventListener('click', () => {
                     const provider = btn.dataset.provider;
 
                     // Actualizar botones activos
@@ -1189,22 +1426,22 @@ class UserStatsHTMLGeneratorFixed:
                     currentProvider = provider;
 
                     // ✅ FIX: Recalcular estadísticas principales al cambiar proveedor
-                    if (currentUser) {{
+                    if (currentUser) {
                         updateSummaryStats(allStats[currentUser]);
-                    }}
+                    }
 
                     // Re-render gráficos de géneros
-                    if (currentUser && currentView === 'genres') {{
-                        renderGenresCharts(allStats[currentUser]);
-                    }}
-                }});
-            }});
+                    if (currentUser && currentView === 'genres') {
+                        renderGenresChartsDebounced(allStats[currentUser]);
+                    }
+                });
+            });
 
             // ✅ FIX: Configurar botones de tipo de datos
             const dataTypeBtns = document.querySelectorAll('.data-type-btn');
 
-            dataTypeBtns.forEach(btn => {{
-                btn.addEventListener('click', () => {{
+            dataTypeBtns.forEach(btn => {
+                btn.addEventListener('click', () => {
                     const dataType = btn.dataset.type;
 
                     // Actualizar botones activos
@@ -1214,67 +1451,86 @@ class UserStatsHTMLGeneratorFixed:
                     currentDataType = dataType;
 
                     // Re-render gráficos individuales
-                    if (currentUser && currentView === 'individual') {{
-                        renderIndividualCharts(allStats[currentUser]);
-                    }}
-                }});
-            }});
-        }}
-
-        function setupPopup() {{
-            // Configurar cierre de popup
-            document.getElementById('popupClose').addEventListener('click', function() {{
-                document.getElementById('popupOverlay').style.display = 'none';
-                document.getElementById('popup').style.display = 'none';
-            }});
-
-            document.getElementById('popupOverlay').addEventListener('click', function() {{
-                document.getElementById('popupOverlay').style.display = 'none';
-                document.getElementById('popup').style.display = 'none';
-            }});
-        }}
+                    if (currentUser && currentView === 'individual') {
+                        renderIndividualChartsDebounced(allStats[currentUser]);
+                    }
+                });
+            });
+        }
+
+        function setupPopup() {
+            // Configurar cierre de popup: un único listener delegado para botón y overlay, más Esc
+            document.addEventListener('click', e => {
+                if (e.target.closest('#popupClose, #popupOverlay')) {
+                    closePopup();
+                }
+            });
+            document.addEventListener('keydown', e => {
+                if (e.key === 'Escape' && POPUP.box.style.display !== 'none') {
+                    closePopup();
+                }
+            });
+        }
+
+        // Abre/cierra el popup escribiendo el DOM de una vez en el siguiente frame
+        function openPopup(title, content) {
+            requestAnimationFrame(() => {
+                POPUP.title.textContent = title;
+                POPUP.content.innerHTML = content;
+                POPUP.overlay.style.display = 'block';
+                POPUP.box.style.display = 'block';
+            });
+        }
+
+        function closePopup() {
+            requestAnimationFrame(() => {
+                POPUP.overlay.style.display = 'none';
+                POPUP.box.style.display = 'none';
+            });
+        }
 
         // ✅ FIX: Funciones para manejar iconos de usuario
-        function updateUserButtonIcon(user) {{
+        function updateUserButtonIcon(user) {
             const userButton = document.getElementById('userButton');
             const icon = userIcons[user];
-            if (icon) {{
-                if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {{
-                    userButton.innerHTML = `<img src="${{icon}}" alt="${{user}}" style="width:100%;height:100%;border-radius:50%;">`;
-                }} else {{
+            if (icon) {
+                if (icon.startsWith('http') || icon.startsWith('/') || icon.endsWith('.png') || icon.endsWith('.jpg')) {
+                    userButton.innerHTML = `<img src="$${icon}" alt="$${user}" style="width:100%;height:100%;border-radius:50%;">`;
+                } else {
                     userButton.textContent = icon;
-                }}
-            }} else {{
+                }
+            } else {
                 userButton.textContent = '👤';
-            }}
-        }}
+            }
+        }
 
-        function updateSelectedUserOption(selectedUser) {{
+        function updateSelectedUserOption(selectedUser) {
             const userOptions = document.getElementById('userOptions');
-            userOptions.querySelectorAll('.user-option').forEach(option => {{
+            userOptions.querySelectorAll('.user-option').forEach(option => {
                 option.classList.remove('selected');
-                if (option.dataset.user === selectedUser) {{
+                if (option.dataset.user === selectedUser) {
                     option.classList.add('selected');
-                }}
-            }});
-        }}
+                }
+            });
+        }
 
-        function loadSavedUser() {{
+        function loadSavedUser() {
             const savedUser = localStorage.getItem('lastfm_selected_user');
-            if (savedUser && allUsers.includes(savedUser)) {{
+            if (savedUser && allUsers.includes(savedUser)) {
                 return savedUser;
-            }}
+            }
             return null;
-        }}
+        }
 
-        function selectUser(username) {{
+        function selectUser(username) {
             currentUser = username;
+            pendingCharts.clear(); // Renders diferidos del usuario anterior
             const userStats = allStats[username];
 
-            if (!userStats) {{
+            if (!userStats) {
                 console.error('No stats found for user:', username);
                 return;
-            }}
+            }
 
             // ✅ FIX: Inicializar genresData cuando se selecciona un usuario
             genresData = userStats.genres || null;
@@ -1283,82 +1539,150 @@ class UserStatsHTMLGeneratorFixed:
 
             updateSummaryStats(userStats);
 
-            if (currentView === 'individual') {{
+            if (currentView === 'individual') {
                 renderIndividualCharts(userStats);
-            }} else if (currentView === 'genres') {{
+            } else if (currentView === 'genres') {
                 renderGenresCharts(userStats);
-            }} else if (currentView === 'labels') {{
+            } else if (currentView === 'labels') {
                 renderLabelsCharts(userStats);
-            }} else if (currentView === 'coincidences') {{
+            } else if (currentView === 'coincidences') {
                 renderCoincidenceCharts(userStats);
-            }} else if (currentView === 'evolution') {{
+            } else if (currentView === 'evolution') {
                 renderEvolutionCharts(userStats);
-            }}
-        }}
-
-        function updateSummaryStats(userStats) {{
-            const totalScrobbles = Object.values(userStats.yearly_scrobbles).reduce((a, b) => a + b, 0);
-
-            // ✅ FIX: Usar conteos únicos reales del analizador
-            const totalArtists = userStats.unique_counts ? userStats.unique_counts.total_artists : 0;
-            const totalAlbums = userStats.unique_counts ? userStats.unique_counts.total_albums : 0;
-            const totalTracks = userStats.unique_counts ? userStats.unique_counts.total_tracks : 0;
-
-            // ✅ NUEVO: Usar conteos únicos de géneros del proveedor seleccionado
-            let totalGenres = 0;
-            if (userStats.unique_counts && userStats.unique_counts.total_genres && userStats.unique_counts.total_genres[currentProvider]) {{
-                totalGenres = userStats.unique_counts.total_genres[currentProvider];
-            }}
-
-            // ✅ NUEVO: Usar conteos únicos de sellos del usuario
-            const totalLabels = userStats.unique_counts ? userStats.unique_counts.total_labels : 0;
-
-            // Años únicos con scrobbles
-            const totalYears = Object.keys(userStats.yearly_scrobbles || {{}}).length;
-
-            console.log('📊 Stats calculados:', {{
-                totalScrobbles, totalArtists, totalAlbums, totalTracks,
-                totalGenres, totalLabels, totalYears, currentProvider
-            }});
+            }
+        }
+
+        function updateSummaryStats(userStats) {
+            // Totales precalculados por el analizador (userStats.summary)
+            const summary = userStats.summary || {};
+            const totalScrobbles = summary.total_scrobbles || 0;
+            const totalArtists = summary.total_artists || 0;
+            const totalAlbums = summary.total_albums || 0;
+            const totalTracks = summary.total_tracks || 0;
+            const totalGenres = (summary.total_genres || {})[currentProvider] || 0;
+            const totalLabels = summary.total_labels || 0;
 
             const summaryHTML = `
                 <div class="summary-card">
-                    <div class="number">${{totalScrobbles.toLocaleString()}}</div>
+                    <div class="number">$${totalScrobbles.toLocaleString()}</div>
                     <div class="label">Scrobbles</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalArtists}}</div>
+                    <div class="number">$${totalArtists}</div>
                     <div class="label">Artistas</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalAlbums}}</div>
+                    <div class="number">$${totalAlbums}</div>
                     <div class="label">Álbumes</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalTracks}}</div>
+                    <div class="number">$${totalTracks}</div>
                     <div class="label">Canciones</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalGenres}}</div>
+                    <div class="number">$${totalGenres}</div>
                     <div class="label">Géneros</div>
                 </div>
                 <div class="summary-card">
-                    <div class="number">${{totalLabels}}</div>
+                    <div class="number">$${totalLabels}</div>
                     <div class="label">Sellos</div>
                 </div>
             `;
 
             document.getElementById('summaryStats').innerHTML = summaryHTML;
-        }}
-
-        function renderGenresCharts(userStats) {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
+        }
+
+        // Ciclo de vida de los charts: en cada render de una vista se actualizan en sitio los que
+        // ya existen (mismo canvas y tipo) y al terminar se destruyen solo los de esa vista que no
+        // se han vuelto a dibujar. Los de otras vistas se conservan para reutilizarlos al volver.
+        function beginChartPass(view) {
+            chartPass = {view: view, touched: new Set()};
+            queueMicrotask(endChartPass); // Tras el render síncrono, también si sale antes con return
+        }
+
+        function endChartPass() {
+            if (!chartPass) return;
+            charts.forEach((chart, canvasId) => {
+                const stale = chartViews.get(canvasId) === chartPass.view && !chartPass.touched.has(canvasId);
+                // Canvas eliminados del DOM (p. ej. rejillas de scatter regeneradas), de cualquier vista
+                if (stale || !chart.canvas.isConnected) {
+                    destroyChart(canvasId);
+                }
+            });
+            chartPass = null;
+        }
+
+        function pieColors(count) {
+            if (!pieColorsCache.has(count)) {
+                pieColorsCache.set(count, colors.slice(0, count));
+            }
+            return pieColorsCache.get(count);
+        }
+
+        function renderChart(canvasId, canvas, config) {
+            let chart = charts.get(canvasId);
+
+            if (chart && chart.canvas === canvas && chart.config.type === config.type) {
+                chart.data = config.data;
+                chart.options = config.options;
+                chart.update('none');
+            } else {
                 if (chart) chart.destroy();
-            }});
-            charts = {{}};
+                chart = new Chart(canvas, config);
+                charts.set(canvasId, chart);
+            }
+
+            if (chartPass) {
+                chartPass.touched.add(canvasId);
+                chartViews.set(canvasId, chartPass.view);
+            }
+            return chart;
+        }
+
+        function destroyChart(canvasId) {
+            const chart = charts.get(canvasId);
+            if (chart) chart.destroy();
+            charts.delete(canvasId);
+            chartViews.delete(canvasId);
+        }
+
+        // Render diferido: el chart se dibuja cuando su canvas se acerca a la zona visible.
+        // La función de render devuelve el chart, o nada si no hay datos (entonces se borra el anterior).
+        const pendingCharts = new Map(); // canvasId -> función de render pendiente
+        const chartObserver = 'IntersectionObserver' in window ? new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (!entry.isIntersecting) return;
+
+                const canvasId = entry.target.id;
+                const render = pendingCharts.get(canvasId);
+                chartObserver.unobserve(entry.target);
+                if (!render) return;
+
+                pendingCharts.delete(canvasId);
+                if (!render()) destroyChart(canvasId);
+            });
+        }, {rootMargin: '200px'}) : null;
+
+        function queueChart(canvasId, render) {
+            const canvas = document.getElementById(canvasId);
+            if (!chartObserver || !canvas) {
+                if (!render()) destroyChart(canvasId);
+                return;
+            }
+
+            // Se conserva el chart actual (si lo hay) hasta que se dibuje el nuevo
+            if (chartPass) {
+                chartPass.touched.add(canvasId);
+                chartViews.set(canvasId, chartPass.view);
+            }
+            pendingCharts.set(canvasId, render);
+            chartObserver.observe(canvas);
+        }
 
-            if (!genresData || !genresData[currentProvider]) {{
+        function renderGenresCharts(userStats) {
+            beginChartPass('genres');
+
+            if (!genresData || !genresData[currentProvider]) {
                 // Mostrar mensaje de no datos
                 document.getElementById('genresPieChart').style.display = 'none';
                 document.getElementById('genresPieInfo').innerHTML = '<div class="no-data">No hay datos disponibles para ' + currentProvider + '</div>';
@@ -1367,7 +1691,7 @@ class UserStatsHTMLGeneratorFixed:
                 document.getElementById('genresScatterGrid').innerHTML = '<div class="no-data">No hay datos de scatter disponibles</div>';
                 document.getElementById('albumGenresScatterGrid').innerHTML = '<div class="no-data">No hay datos de scatter disponibles</div>';
                 return;
-            }}
+            }
 
             const providerData = genresData[currentProvider];
 
@@ -1378,117 +1702,93 @@ class UserStatsHTMLGeneratorFixed:
             renderGenresScatterCharts(providerData.scatter_charts, providerData.years, 'genresScatterGrid', false);
 
             // 3. Gráfico circular con top 15 géneros de álbumes
-            if (providerData.album_pie_chart) {{
+            if (providerData.album_pie_chart) {
                 renderGenresPieChart(providerData.album_pie_chart, 'albumGenresPieChart', 'albumGenresPieInfo', 'Álbumes');
-            }} else {{
+            } else {
                 document.getElementById('albumGenresPieChart').style.display = 'none';
                 document.getElementById('albumGenresPieInfo').innerHTML = '<div class="no-data">No hay datos de géneros de álbumes para ' + currentProvider + '</div>';
-            }}
+            }
 
             // 4. 6 gráficos de scatter para top 6 géneros de álbumes
-            if (providerData.album_scatter_charts) {{
+            if (providerData.album_scatter_charts) {
                 renderGenresScatterCharts(providerData.album_scatter_charts, providerData.years, 'albumGenresScatterGrid', true);
-            }} else {{
+            } else {
                 document.getElementById('albumGenresScatterGrid').innerHTML = '<div class="no-data">No hay datos de scatter de álbumes disponibles</div>';
-            }}
-        }}
+            }
+        }
 
-        function renderLabelsCharts(userStats) {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
+        function renderLabelsCharts(userStats) {
+            beginChartPass('labels');
 
             const labelsData = userStats.labels;
-            if (!labelsData) {{
+            if (!labelsData) {
                 console.log('No hay datos de sellos disponibles');
                 return;
-            }}
+            }
 
             // 1. Gráfico circular con top 15 sellos
             renderGenresPieChart(labelsData.pie_chart, 'labelsPieChart', 'labelsPieInfo', 'Sellos');
 
             // 2. 6 gráficos de scatter para top 6 sellos
             renderLabelsScatterCharts(labelsData.scatter_charts, labelsData.years, 'labelsScatterGrid');
-        }}
+        }
 
-        function renderGenresPieChart(pieData, canvasId, infoId, type) {{
+        function renderGenresPieChart(pieData, canvasId, infoId, type) {
             const canvas = document.getElementById(canvasId);
             const info = document.getElementById(infoId);
 
-            if (!canvas || !info) {{
-                console.error(`No se encontró el canvas o info para ${{canvasId}}`);
+            if (!canvas || !info) {
+                console.error(`No se encontró el canvas o info para $${canvasId}`);
                 return;
-            }}
+            }
 
-            if (!pieData || !pieData.data || Object.keys(pieData.data).length === 0) {{
+            // Una sola pasada por los datos del pie (etiquetas, valores y nº de colores)
+            const pieEntries = pieData && pieData.data ? Object.entries(pieData.data) : [];
+            if (pieEntries.length === 0) {
                 canvas.style.display = 'none';
                 info.innerHTML = '<div class="no-data">No hay datos disponibles</div>';
                 return;
-            }}
+            }
 
             canvas.style.display = 'block';
-            const provider = type === 'Sellos' ? 'Sellos Discográficos' : `${{currentProvider}} (${{type}})`;
-            info.innerHTML = `Total: ${{pieData.total.toLocaleString()}} scrobbles | Tipo: ${{provider}}`;
-
-            const data = {{
-                labels: Object.keys(pieData.data),
-                datasets: [{{
-                    data: Object.values(pieData.data),
-                    backgroundColor: colors.slice(0, Object.keys(pieData.data).length),
+            const provider = type === 'Sellos' ? 'Sellos Discográficos' : `$${currentProvider} ($${type})`;
+            info.innerHTML = `Total: $${pieData.total.toLocaleString()} scrobbles | Tipo: $${provider}`;
+
+            const data = {
+                labels: pieEntries.map(([name]) => name),
+                datasets: [{
+                    data: pieEntries.map(([, plays]) => plays),
+                    backgroundColor: pieColors(pieEntries.length),
                     borderColor: '#181825',
                     borderWidth: 2
-                }}]
-            }};
+                }]
+            };
 
-            const config = {{
+            const config = {
                 type: 'pie',
                 data: data,
-                options: {{
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom',
-                            labels: {{
-                                color: '#cdd6f4',
-                                padding: 15,
-                                usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }}
-                }}
-            }};
-
-            charts[canvasId] = new Chart(canvas, config);
-        }}
+                options: {...PIE_OPTS}
+            };
+
+            renderChart(canvasId, canvas, config);
+        }
 
         // ✅ FIX: Función corregida para scatter charts de géneros
-        function renderGenresScatterCharts(scatterData, years, containerId, isAlbums = false) {{
+        function renderGenresScatterCharts(scatterData, years, containerId, isAlbums = false) {
             const container = document.getElementById(containerId);
-            if (!container) {{
-                console.error(`No se encontró el contenedor ${{containerId}}`);
+            if (!container) {
+                console.error(`No se encontró el contenedor $${containerId}`);
                 return;
-            }}
+            }
 
             container.innerHTML = '';
 
-            if (!scatterData || Object.keys(scatterData).length === 0) {{
+            if (!scatterData || Object.keys(scatterData).length === 0) {
                 container.innerHTML = '<div class="no-data">No hay datos de scatter disponibles</div>';
                 return;
-            }}
-
-            Object.keys(scatterData).forEach((genre, index) => {{
-                const items = scatterData[genre];
+            }
 
+            Object.entries(scatterData).forEach(([genre, items], index) => {
                 if (!items || items.length === 0) return;
 
                 // Crear contenedor para este género
@@ -1497,7 +1797,7 @@ class UserStatsHTMLGeneratorFixed:
 
                 const title = document.createElement('h4');
                 const itemType = isAlbums ? 'Álbumes' : 'Artistas';
-                title.textContent = `${{genre}} - Top ${{items.length}} ${{itemType}}`;
+                title.textContent = `$${genre} - Top $${items.length} $${itemType}`;
                 title.style.color = '#cba6f7';
                 title.style.textAlign = 'center';
                 title.style.marginBottom = '15px';
@@ -1508,7 +1808,7 @@ class UserStatsHTMLGeneratorFixed:
                 canvasWrapper.style.height = '300px';
 
                 const canvas = document.createElement('canvas');
-                const canvasId = `scatterChart_${{genre.replace(/[^a-zA-Z0-9]/g, '_')}}_${{index}}_${{containerId}}`;
+                const canvasId = `scatterChart_$${genre.replace(/[^a-zA-Z0-9]/g, '_')}_$${index}_$${containerId}`;
                 canvas.id = canvasId;
                 canvasWrapper.appendChild(canvas);
 
@@ -1518,22 +1818,22 @@ class UserStatsHTMLGeneratorFixed:
                 // Crear dataset para scatter plot
                 const datasets = [];
 
-                items.forEach((itemData, itemIndex) => {{
+                items.forEach((itemData, itemIndex) => {
                     const points = [];
 
-                    years.forEach(year => {{
+                    years.forEach(year => {
                         const plays = itemData.yearly_data[year] || 0;
-                        if (plays > 0) {{
-                            points.push({{
+                        if (plays > 0) {
+                            points.push({
                                 x: year,
                                 y: plays,
                                 itemName: isAlbums ? itemData.album : itemData.artist
-                            }});
-                        }}
-                    }});
+                            });
+                        }
+                    });
 
-                    if (points.length > 0) {{
-                        datasets.push({{
+                    if (points.length > 0) {
+                        datasets.push({
                             label: isAlbums ? itemData.album : itemData.artist,
                             data: points,
                             backgroundColor: colors[itemIndex % colors.length],
@@ -1541,126 +1841,121 @@ class UserStatsHTMLGeneratorFixed:
                             pointRadius: 6,
                             pointHoverRadius: 10,
                             showLine: false
-                        }});
-                    }}
-                }});
+                        });
+                    }
+                });
 
-                if (datasets.length === 0) {{
+                if (datasets.length === 0) {
                     canvas.parentElement.innerHTML = '<div class="no-data">No hay datos temporales para este género</div>';
                     return;
-                }}
+                }
 
-                const config = {{
+                const config = {
                     type: 'scatter',
-                    data: {{ datasets }},
-                    options: {{
+                    data: { datasets },
+                    options: {
                         responsive: true,
+                        animation: CHART_ANIMATION,
                         maintainAspectRatio: false,
-                        scales: {{
-                            x: {{
+                        scales: {
+                            x: {
                                 type: 'linear',
                                 position: 'bottom',
-                                title: {{
+                                title: {
                                     display: true,
                                     text: 'Año',
                                     color: '#a6adc8'
-                                }},
-                                ticks: {{
+                                },
+                                ticks: {
                                     color: '#a6adc8',
                                     stepSize: 1
-                                }},
-                                grid: {{
+                                },
+                                grid: {
                                     color: '#313244'
-                                }},
+                                },
                                 min: Math.min(...years) - 0.8,
                                 max: Math.max(...years) + 0.8
-                            }},
-                            y: {{
-                                title: {{
+                            },
+                            y: {
+                                title: {
                                     display: true,
                                     text: 'Scrobbles',
                                     color: '#a6adc8'
-                                }},
-                                ticks: {{
+                                },
+                                ticks: {
                                     color: '#a6adc8'
-                                }},
-                                grid: {{
+                                },
+                                grid: {
                                     color: '#313244'
-                                }}
-                            }}
-                        }},
-                        plugins: {{
-                            legend: {{
+                                }
+                            }
+                        },
+                        plugins: {
+                            legend: {
                                 display: true,
                                 position: 'bottom',
-                                labels: {{
+                                labels: {
                                     color: '#cdd6f4',
                                     padding: 12,
                                     usePointStyle: true,
                                     pointStyle: 'circle',
-                                    font: {{
+                                    font: {
                                         size: 11
-                                    }},
+                                    },
                                     boxHeight: 10,
                                     boxWidth: 10,
                                     maxWidth: 100,
                                     textAlign: 'left'
-                                }}
-                            }},
-                            tooltip: {{
-                                backgroundColor: '#1e1e2e',
-                                titleColor: '#cba6f7',
-                                bodyColor: '#cdd6f4',
-                                borderColor: '#cba6f7',
-                                borderWidth: 1,
-                                callbacks: {{
-                                    title: function(context) {{
+                                }
+                            },
+                            tooltip: {
+                                ...TOOLTIP_OPTS,
+                                callbacks: {
+                                    title: function(context) {
                                         const point = context[0].raw;
                                         return point.itemName;
-                                    }},
-                                    label: function(context) {{
+                                    },
+                                    label: function(context) {
                                         const point = context.raw;
-                                        return `${{point.x}}: ${{point.y}} scrobbles`;
-                                    }}
-                                }}
-                            }}
-                        }},
-                        interaction: {{
+                                        return `$${point.x}: $${point.y} scrobbles`;
+                                    }
+                                }
+                            }
+                        },
+                        interaction: {
                             mode: 'point'
-                        }},
-                        onClick: function(event, elements) {{
-                            if (elements.length > 0) {{
+                        },
+                        onClick: function(event, elements) {
+                            if (elements.length > 0) {
                                 const element = elements[0];
                                 const point = this.data.datasets[element.datasetIndex].data[element.index];
                                 const itemType = isAlbums ? 'Álbum' : 'Artista';
                                 showArtistPopup(point.itemName, genre, currentProvider, point.x, point.y, itemType);
-                            }}
-                        }}
-                    }}
-                }};
+                            }
+                        }
+                    }
+                };
 
-                charts[canvasId] = new Chart(canvas, config);
-            }});
-        }}
+                renderChart(canvasId, canvas, config);
+            });
+        }
 
         // ✅ FIX: Función corregida para scatter charts de sellos
-        function renderLabelsScatterCharts(scatterData, years, containerId) {{
+        function renderLabelsScatterCharts(scatterData, years, containerId) {
             const container = document.getElementById(containerId);
-            if (!container) {{
-                console.error(`No se encontró el contenedor ${{containerId}}`);
+            if (!container) {
+                console.error(`No se encontró el contenedor $${containerId}`);
                 return;
-            }}
+            }
 
             container.innerHTML = '';
 
-            if (!scatterData || Object.keys(scatterData).length === 0) {{
+            if (!scatterData || Object.keys(scatterData).length === 0) {
                 container.innerHTML = '<div class="no-data">No hay datos de sellos disponibles</div>';
                 return;
-            }}
-
-            Object.keys(scatterData).forEach((label, index) => {{
-                const artists = scatterData[label];
+            }
 
+            Object.entries(scatterData).forEach(([label, artists], index) => {
                 if (!artists || artists.length === 0) return;
 
                 // Crear contenedor para este sello
@@ -1668,7 +1963,7 @@ class UserStatsHTMLGeneratorFixed:
                 labelContainer.className = 'genres-pie-container';
 
                 const title = document.createElement('h4');
-                title.textContent = `${{label}} - Top ${{artists.length}} Artistas`;
+                title.textContent = `$${label} - Top $${artists.length} Artistas`;
                 title.style.color = '#cba6f7';
                 title.style.textAlign = 'center';
                 title.style.marginBottom = '15px';
@@ -1679,7 +1974,7 @@ class UserStatsHTMLGeneratorFixed:
                 canvasWrapper.style.height = '300px';
 
                 const canvas = document.createElement('canvas');
-                const canvasId = `labelScatterChart_${{label.replace(/[^a-zA-Z0-9]/g, '_')}}_${{index}}`;
+                const canvasId = `labelScatterChart_$${label.replace(/[^a-zA-Z0-9]/g, '_')}_$${index}`;
                 canvas.id = canvasId;
                 canvasWrapper.appendChild(canvas);
 
@@ -1689,22 +1984,22 @@ class UserStatsHTMLGeneratorFixed:
                 // Crear dataset para scatter plot
                 const datasets = [];
 
-                artists.forEach((artistData, artistIndex) => {{
+                artists.forEach((artistData, artistIndex) => {
                     const points = [];
 
-                    years.forEach(year => {{
+                    years.forEach(year => {
                         const plays = artistData.yearly_data[year] || 0;
-                        if (plays > 0) {{
-                            points.push({{
+                        if (plays > 0) {
+                            points.push({
                                 x: year,
                                 y: plays,
                                 artistName: artistData.artist
-                            }});
-                        }}
-                    }});
+                            });
+                        }
+                    });
 
-                    if (points.length > 0) {{
-                        datasets.push({{
+                    if (points.length > 0) {
+                        datasets.push({
                             label: artistData.artist,
                             data: points,
                             backgroundColor: colors[artistIndex % colors.length],
@@ -1712,119 +2007,112 @@ class UserStatsHTMLGeneratorFixed:
                             pointRadius: 6,
                             pointHoverRadius: 10,
                             showLine: false
-                        }});
-                    }}
-                }});
+                        });
+                    }
+                });
 
-                if (datasets.length === 0) {{
+                if (datasets.length === 0) {
                     canvas.parentElement.innerHTML = '<div class="no-data">No hay datos temporales para este sello</div>';
                     return;
-                }}
+                }
 
-                const config = {{
+                const config = {
                     type: 'scatter',
-                    data: {{ datasets }},
-                    options: {{
+                    data: { datasets },
+                    options: {
                         responsive: true,
+                        animation: CHART_ANIMATION,
                         maintainAspectRatio: false,
-                        scales: {{
-                            x: {{
+                        scales: {
+                            x: {
                                 type: 'linear',
                                 position: 'bottom',
-                                title: {{
+                                title: {
                                     display: true,
                                     text: 'Año',
                                     color: '#a6adc8'
-                                }},
-                                ticks: {{
+                                },
+                                ticks: {
                                     color: '#a6adc8',
                                     stepSize: 1
-                                }},
-                                grid: {{
+                                },
+                                grid: {
                                     color: '#313244'
-                                }},
+                                },
                                 min: Math.min(...years) - 0.8,
                                 max: Math.max(...years) + 0.8
-                            }},
-                            y: {{
-                                title: {{
+                            },
+                            y: {
+                                title: {
                                     display: true,
                                     text: 'Scrobbles',
                                     color: '#a6adc8'
-                                }},
-                                ticks: {{
+                                },
+                                ticks: {
                                     color: '#a6adc8'
-                                }},
-                                grid: {{
+                                },
+                                grid: {
                                     color: '#313244'
-                                }}
-                            }}
-                        }},
-                        plugins: {{
-                            legend: {{
+                                }
+                            }
+                        },
+                        plugins: {
+                            legend: {
                                 display: true,
                                 position: 'bottom',
-                                labels: {{
+                                labels: {
                                     color: '#cdd6f4',
                                     padding: 12,
                                     usePointStyle: true,
                                     pointStyle: 'circle',
-                                    font: {{
+                                    font: {
                                         size: 11
-                                    }},
+                                    },
                                     boxHeight: 10,
                                     boxWidth: 10,
                                     maxWidth: 100,
                                     textAlign: 'left'
-                                }}
-                            }},
-                            tooltip: {{
-                                backgroundColor: '#1e1e2e',
-                                titleColor: '#cba6f7',
-                                bodyColor: '#cdd6f4',
-                                borderColor: '#cba6f7',
-                                borderWidth: 1,
-                                callbacks: {{
-                                    title: function(context) {{
+                                }
+                            },
+                            tooltip: {
+                                ...TOOLTIP_OPTS,
+                                callbacks: {
+                                    title: function(context) {
                                         const point = context[0].raw;
                                         return point.artistName;
-                                    }},
-                                    label: function(context) {{
+                                    },
+                                    label: function(context) {
                                         const point = context.raw;
-                                        return `${{point.x}}: ${{point.y}} scrobbles`;
-                                    }}
-                                }}
-                            }}
-                        }},
-                        interaction: {{
+                                        return `$${point.x}: $${point.y} scrobbles`;
+                                    }
+                                }
+                            }
+                        },
+                        interaction: {
                             mode: 'point'
-                        }},
-                        onClick: function(event, elements) {{
-                            if (elements.length > 0) {{
+                        },
+                        onClick: function(event, elements) {
+                            if (elements.length > 0) {
                                 const element = elements[0];
                                 const point = this.data.datasets[element.datasetIndex].data[element.index];
                                 showArtistPopup(point.artistName, label, 'Sello', point.x, point.y, 'Artista');
-                            }}
-                        }}
-                    }}
-                }};
-
-                charts[canvasId] = new Chart(canvas, config);
-            }});
-        }}
-
-        function renderIndividualCharts(userStats) {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
+                            }
+                        }
+                    }
+                };
 
-            try {{
+                renderChart(canvasId, canvas, config);
+            });
+        }
+
+        function renderIndividualCharts(userStats) {
+            beginChartPass('individual');
+
+            try {
                 // Gráfico de scrobbles por año
-                // if (userStats.yearly_scrobbles) {{
+                // if (userStats.yearly_scrobbles) {
                 //     renderYearlyChart(userStats.yearly_scrobbles);
-                // }}
+                // }
 
                 // Top artistas, álbumes y canciones (pie charts)
                 renderTopChart(userStats.top_artists, 'topArtistsChart', 'topArtistsInfo', '👥 Top Artistas');
@@ -1832,10 +2120,10 @@ class UserStatsHTMLGeneratorFixed:
                 renderTopChart(userStats.top_tracks, 'topTracksChart', 'topTracksInfo', '🎶 Top Canciones');
 
                 // ✅ FIX: Gráficos de evolución individual
-                if (userStats.individual) {{
+                if (userStats.individual) {
                     const individualData = currentDataType === 'annual' ? userStats.individual.annual : userStats.individual.cumulative;
 
-                    if (individualData) {{
+                    if (individualData) {
                         console.log('Renderizando gráficos individuales con datos:', Object.keys(individualData));
 
                         // Solo renderizar si existen los datos
@@ -1848,175 +2136,147 @@ class UserStatsHTMLGeneratorFixed:
                         if (individualData.new_artists) renderIndividualLineChart('individualNewArtistsChart', individualData.new_artists, 'Artistas Nuevos');
                         if (individualData.rising_artists) renderIndividualLineChart('individualRisingChart', individualData.rising_artists, 'Artistas en Ascenso');
                         if (individualData.falling_artists) renderIndividualLineChart('individualFallingChart', individualData.falling_artists, 'Artistas en Declive');
-                    }} else {{
+                    } else {
                         console.warn('No hay datos individuales para el tipo:', currentDataType);
-                    }}
-                }} else {{
+                    }
+                } else {
                     console.warn('No hay datos individuales en userStats');
-                }}
-            }} catch (error) {{
+                }
+            } catch (error) {
                 console.error('Error renderizando gráficos individuales:', error);
-            }}
-        }}
+            }
+        }
 
-        function renderYearlyChart(yearlyData) {{
+        function renderYearlyChart(yearlyData) {
             const canvas = document.getElementById('yearlyChart');
             const info = document.getElementById('yearlyInfo');
 
-            if (!canvas) {{
+            if (!canvas) {
                 console.error('Canvas yearlyChart no encontrado');
                 return;
-            }}
-            if (!info) {{
+            }
+            if (!info) {
                 console.error('Info yearlyInfo no encontrado');
                 return;
-            }}
+            }
 
             const years = Object.keys(yearlyData).sort();
             const scrobbles = years.map(year => yearlyData[year]);
             const totalScrobbles = scrobbles.reduce((a, b) => a + b, 0);
 
-            info.innerHTML = `Total: ${{totalScrobbles.toLocaleString()}} scrobbles | Años: ${{years.length}}`;
+            info.innerHTML = `Total: $${totalScrobbles.toLocaleString()} scrobbles | Años: $${years.length}`;
 
-            const data = {{
+            const data = {
                 labels: years,
-                datasets: [{{
+                datasets: [{
                     label: 'Scrobbles',
                     data: scrobbles,
                     backgroundColor: colors[0],
                     borderColor: colors[0],
                     borderWidth: 2,
                     fill: false
-                }}]
-            }};
+                }]
+            };
 
-            const config = {{
+            const config = {
                 type: 'line',
                 data: data,
-                options: {{
+                options: {
                     responsive: true,
+                    animation: CHART_ANIMATION,
                     maintainAspectRatio: false,
-                    scales: {{
-                        x: {{
-                            title: {{
+                    scales: {
+                        x: {
+                            title: {
                                 display: true,
                                 text: 'Año',
                                 color: '#cdd6f4'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }},
-                            ticks: {{
+                            },
+                            ticks: {
                                 color: '#cdd6f4'
-                            }}
-                        }},
-                        y: {{
-                            title: {{
+                            }
+                        },
+                        y: {
+                            title: {
                                 display: true,
                                 text: 'Scrobbles',
                                 color: '#cdd6f4'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }},
-                            ticks: {{
+                            },
+                            ticks: {
                                 color: '#cdd6f4'
-                            }}
-                        }}
-                    }},
-                    plugins: {{
-                        legend: {{
-                            labels: {{
+                            }
+                        }
+                    },
+                    plugins: {
+                        legend: {
+                            labels: {
                                 color: '#cdd6f4'
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }}
-                }}
-            }};
-
-            charts['yearlyChart'] = new Chart(canvas, config);
-        }}
-
-        function renderTopChart(topData, canvasId, infoId, title) {{
+                            }
+                        },
+                        tooltip: TOOLTIP_OPTS
+                    }
+                }
+            };
+
+            renderChart('yearlyChart', canvas, config);
+        }
+
+        function renderTopChart(topData, canvasId, infoId, title) {
             const canvas = document.getElementById(canvasId);
             const info = document.getElementById(infoId);
 
-            if (!canvas) {{
-                console.error(`Canvas ${{canvasId}} no encontrado`);
+            if (!canvas) {
+                console.error(`Canvas $${canvasId} no encontrado`);
                 return;
-            }}
-            if (!info) {{
-                console.error(`Info ${{infoId}} no encontrado`);
+            }
+            if (!info) {
+                console.error(`Info $${infoId} no encontrado`);
                 return;
-            }}
+            }
 
-            if (!topData || Object.keys(topData).length === 0) {{
+            const topEntries = topData ? Object.entries(topData) : [];
+            if (topEntries.length === 0) {
                 canvas.style.display = 'none';
                 info.innerHTML = '<div class="no-data">No hay datos disponibles</div>';
                 return;
-            }}
+            }
 
             canvas.style.display = 'block';
 
-            const entries = Object.entries(topData)
+            const totalPlays = topEntries.reduce((total, [, plays]) => total + plays, 0);
+            info.innerHTML = `Total: $${totalPlays.toLocaleString()} reproducciones | Elementos: $${topEntries.length}`;
+
+            const entries = topEntries
                 .sort((a, b) => b[1] - a[1])
                 .slice(0, 15);
 
-            const totalPlays = Object.values(topData).reduce((a, b) => a + b, 0);
-            info.innerHTML = `Total: ${{totalPlays.toLocaleString()}} reproducciones | Elementos: ${{Object.keys(topData).length}}`;
-
-            const data = {{
+            const data = {
                 labels: entries.map(([name, _]) => name),
-                datasets: [{{
+                datasets: [{
                     data: entries.map(([_, count]) => count),
-                    backgroundColor: colors.slice(0, entries.length),
+                    backgroundColor: pieColors(entries.length),
                     borderColor: '#181825',
                     borderWidth: 2
-                }}]
-            }};
+                }]
+            };
 
-            const config = {{
+            const config = {
                 type: 'pie',
                 data: data,
-                options: {{
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom',
-                            labels: {{
-                                color: '#cdd6f4',
-                                padding: 15,
-                                usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }}
-                }}
-            }};
-
-            charts[canvasId] = new Chart(canvas, config);
-        }}
-
-        function renderCoincidenceCharts(userStats) {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
+                options: {...PIE_OPTS}
+            };
+
+            renderChart(canvasId, canvas, config);
+        }
+
+        function renderCoincidenceCharts(userStats) {
+            beginChartPass('coincidences');
 
             // Gráficos básicos
             renderPieChart('artistsChart', userStats.coincidences.charts.artists, 'artistsInfo');
@@ -2028,392 +2288,309 @@ class UserStatsHTMLGeneratorFixed:
             renderPieChart('genreCoincidencesChart', userStats.coincidences.charts.genre_coincidences, 'genreCoincidencesInfo');
             renderPieChart('labelsChart', userStats.coincidences.charts.labels, 'labelsInfo');
             renderPieChart('releaseYearsChart', userStats.coincidences.charts.release_years, 'releaseYearsInfo');
-        }}
+        }
 
-        function renderPieChart(canvasId, chartData, infoId) {{
+        function renderPieChart(canvasId, chartData, infoId) {
             const canvas = document.getElementById(canvasId);
             const info = document.getElementById(infoId);
 
-            if (!canvas || !info) {{
-                console.error(`No se encontró canvas o info para ${{canvasId}}`);
+            if (!canvas || !info) {
+                console.error(`No se encontró canvas o info para $${canvasId}`);
                 return;
-            }}
+            }
 
-            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {{
+            const dataEntries = chartData && chartData.data ? Object.entries(chartData.data) : [];
+            if (dataEntries.length === 0) {
                 canvas.style.display = 'none';
                 info.innerHTML = '<div class="no-data">No hay datos disponibles</div>';
                 return;
-            }}
+            }
 
             canvas.style.display = 'block';
 
-            const entries = Object.entries(chartData.data)
+            info.innerHTML = `Total: $${chartData.total.toLocaleString()} elementos compartidos | Usuarios: $${dataEntries.length}`;
+
+            const entries = dataEntries
                 .sort((a, b) => b[1] - a[1])
                 .slice(0, 15);
 
-            info.innerHTML = `Total: ${{chartData.total.toLocaleString()}} elementos compartidos | Usuarios: ${{Object.keys(chartData.data).length}}`;
-
-            const data = {{
+            const data = {
                 labels: entries.map(([user, _]) => user),
-                datasets: [{{
+                datasets: [{
                     data: entries.map(([_, count]) => count),
-                    backgroundColor: colors.slice(0, entries.length),
+                    backgroundColor: pieColors(entries.length),
                     borderColor: '#181825',
                     borderWidth: 2
-                }}]
-            }};
+                }]
+            };
 
-            const config = {{
+            const config = {
                 type: 'pie',
                 data: data,
-                options: {{
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom',
-                            labels: {{
-                                color: '#cdd6f4',
-                                padding: 15,
-                                usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }}
-                }}
-            }};
-
-            charts[canvasId] = new Chart(canvas, config);
-        }}
+                options: {...PIE_OPTS}
+            };
+
+            renderChart(canvasId, canvas, config);
+        }
+
+        // Gráficos de evolución: canvas, clave en userStats.evolution, entidad (solo coincidencias),
+        // etiqueta del popup y nº de elementos que muestra (el analizador ya envía solo el top 5)
+        const EVOLUTION_CHARTS = [
+            {canvasId: 'genresEvolutionChart', key: 'genres', entity: null, label: 'Géneros', limit: 5},
+            {canvasId: 'labelsEvolutionChart', key: 'labels', entity: null, label: 'Sellos', limit: 5},
+            {canvasId: 'releaseYearsEvolutionChart', key: 'release_years', entity: null, label: 'Décadas', limit: 5},
+            {canvasId: 'artistsEvolutionChart', key: 'coincidences', entity: 'artists', label: 'Artistas', limit: 5},
+            {canvasId: 'albumsEvolutionChart', key: 'coincidences', entity: 'albums', label: 'Álbumes', limit: 5},
+            {canvasId: 'tracksEvolutionChart', key: 'coincidences', entity: 'tracks', label: 'Canciones', limit: 5}
+        ];
 
         // ✅ FIX: Función corregida para gráficos de evolución
-        function renderEvolutionCharts(userStats) {{
-            // Destruir charts existentes
-            Object.values(charts).forEach(chart => {{
-                if (chart) chart.destroy();
-            }});
-            charts = {{}};
+        function renderEvolutionCharts(userStats) {
+            beginChartPass('evolution');
 
             // Ahora todos son de coincidencias
-            renderCoincidencesEvolution('genres', userStats.evolution.genres);
-            renderCoincidencesEvolution('labels', userStats.evolution.labels);
-            renderCoincidencesEvolution('release_years', userStats.evolution.release_years);
-            renderCoincidencesEvolution('artists', userStats.evolution.coincidences);
-            renderCoincidencesEvolution('albums', userStats.evolution.coincidences);
-            renderCoincidencesEvolution('tracks', userStats.evolution.coincidences);
-        }}
-
-        // ✅ FIX: Función corregida para evolución de coincidencias
-        function renderCoincidencesEvolution(type, evolutionData) {{
-            let canvas, chartId;
-
-            if (type === 'genres') {{
-                canvas = document.getElementById('genresEvolutionChart');
-                chartId = 'genresEvolutionChart';
-            }} else if (type === 'labels') {{
-                canvas = document.getElementById('labelsEvolutionChart');
-                chartId = 'labelsEvolutionChart';
-            }} else if (type === 'release_years') {{
-                canvas = document.getElementById('releaseYearsEvolutionChart');
-                chartId = 'releaseYearsEvolutionChart';
-            }} else {{
-                canvas = document.getElementById(type + 'EvolutionChart');
-                chartId = type + 'EvolutionChart';
-            }}
-
-            if (!canvas) {{
-                console.error(`Canvas no encontrado para ${{chartId}}`);
-                return;
-            }}
-
-            if (!evolutionData || !evolutionData.data) {{
-                console.log(`No hay datos de evolución para ${{type}}`);
-                return;
-            }}
-
-            let typeData, detailsData;
-            if (['artists', 'albums', 'tracks'].includes(type)) {{
-                typeData = evolutionData.data[type];
-                detailsData = evolutionData.details[type];
-            }} else {{
-                typeData = evolutionData.data;
-                detailsData = evolutionData.details;
-            }}
-
-            if (!typeData) {{
-                console.log(`No hay datos de tipo para ${{type}}`);
-                return;
-            }}
+            EVOLUTION_CHARTS.forEach(chart => {
+                const evolutionData = userStats.evolution[chart.key];
+                const datasets = evolutionData && evolutionData.datasets &&
+                    (chart.entity ? evolutionData.datasets[chart.entity] : evolutionData.datasets);
+
+                queueChart(chart.canvasId, () => renderEvolution(
+                    chart.canvasId, evolutionData, datasets, chart.entity || chart.key,
+                    (user, year) => `Top $${chart.limit} $${chart.label} - $${user} ($${year})`,
+                    chart.limit
+                ));
+            });
+        }
+
+        // Gráfico de líneas genérico de evolución de coincidencias (datasets ya preparados desde Python)
+        function renderEvolution(canvasId, evolutionData, datasets, detailsType, titleFn, limit) {
+            const canvas = document.getElementById(canvasId);
+            if (!canvas) {
+                console.error(`Canvas no encontrado para $${canvasId}`);
+                return null;
+            }
 
-            const datasets = [];
-            let colorIndex = 0;
+            if (!datasets) {
+                console.log(`No hay datos de evolución para $${detailsType}`);
+                return null;
+            }
 
-            Object.keys(typeData).forEach(user => {{
-                datasets.push({{
-                    label: user,
-                    data: evolutionData.years.map(year => typeData[user][year] || 0),
-                    borderColor: colors[colorIndex % colors.length],
-                    backgroundColor: colors[colorIndex % colors.length] + '20',
-                    tension: 0.4,
-                    fill: false
-                }});
-                colorIndex++;
-            }});
+            const detailsUser = currentUser;
 
-            const config = {{
+            const config = {
                 type: 'line',
-                data: {{
+                data: {
                     labels: evolutionData.years,
                     datasets: datasets
-                }},
-                options: {{
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom',
-                            labels: {{
-                                color: '#cdd6f4',
-                                padding: 10,
-                                usePointStyle: true
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }},
-                    scales: {{
-                        x: {{
-                            ticks: {{
-                                color: '#a6adc8'
-                            }},
-                            grid: {{
-                                color: '#313244'
-                            }}
-                        }},
-                        y: {{
-                            ticks: {{
-                                color: '#a6adc8'
-                            }},
-                            grid: {{
-                                color: '#313244'
-                            }}
-                        }}
-                    }},
-                    onClick: function(event, elements) {{
-                        if (elements.length > 0) {{
+                },
+                options: {
+                    ...LINE_OPTS,
+                    onClick: function(event, elements) {
+                        if (elements.length > 0) {
                             const datasetIndex = elements[0].datasetIndex;
                             const pointIndex = elements[0].index;
                             const user = this.data.datasets[datasetIndex].label;
                             const year = this.data.labels[pointIndex];
                             const coincidences = this.data.datasets[datasetIndex].data[pointIndex];
 
-                            if (coincidences > 0 && detailsData && detailsData[user] && detailsData[user][year]) {{
-                                const typeLabel = type === 'artists' ? 'Artistas' :
-                                               type === 'albums' ? 'Álbumes' :
-                                               type === 'tracks' ? 'Canciones' :
-                                               type === 'genres' ? 'Géneros' :
-                                               type === 'labels' ? 'Sellos' :
-                                               type === 'release_years' ? 'Décadas' : type;
-
-                                const limit = ['artists', 'albums', 'tracks'].includes(type) ? 10 : 5;
-                                const limitedDetails = detailsData[user][year].slice(0, limit);
-                                showLinearPopup(`Top ${{limit}} ${{typeLabel}} - ${{user}} (${{year}})`, limitedDetails);
-                            }}
-                        }}
-                    }}
-                }}
-            }};
-
-            charts[chartId] = new Chart(canvas, config);
-        }}
+                            if (coincidences > 0) {
+                                loadEvolutionDetails(detailsUser, detailsType, evolutionData).then(detailsData => {
+                                    // Detalles aplanados desde Python: una sola clave "usuario|año"
+                                    const top = detailsData?.[`$${user}|$${year}`];
+                                    if (top) showLinearPopup(titleFn(user, year), top.slice(0, limit));
+                                });
+                            }
+                        }
+                    }
+                }
+            };
+
+            return renderChart(canvasId, canvas, config);
+        }
+
+        // Detalles de evolución: incrustados o pedidos bajo demanda (una vez por usuario y tipo)
+        function loadEvolutionDetails(user, type, evolutionData) {
+            if (!detailsUrl) {
+                const details = evolutionData.details || {};
+                return Promise.resolve(['artists', 'albums', 'tracks'].includes(type) ? details[type] : details);
+            }
+
+            const url = `$${detailsUrl}/$${encodeURIComponent(user)}/$${type}.json`;
+            if (!evolutionDetailsCache.has(url)) {
+                evolutionDetailsCache.set(url, fetch(url)
+                    .then(response => response.ok ? response.json() : null)
+                    .catch(error => {
+                        console.error(`Error cargando $${url}:`, error);
+                        return null;
+                    }));
+            }
+            return evolutionDetailsCache.get(url);
+        }
 
         // ✅ FIX: Función para popup de artistas
-        function showArtistPopup(itemName, category, provider, year, scrobbles, itemType = 'Artista') {{
-            const title = `${{itemName}} - ${{category}} (${{year}})`;
+        function showArtistPopup(itemName, category, provider, year, scrobbles, itemType = 'Artista') {
+            const title = `$${itemName} - $${category} ($${year})`;
             const content = `
                 <div class="popup-item">
-                    <span class="name">${{itemType}}: ${{itemName}}</span>
+                    <span class="name">$${itemType}: $${itemName}</span>
                 </div>
                 <div class="popup-item">
-                    <span class="name">${{provider === 'Sello' ? 'Sello' : 'Género'}}: ${{category}}</span>
+                    <span class="name">$${provider === 'Sello' ? 'Sello' : 'Género'}: $${category}</span>
                 </div>
                 <div class="popup-item">
-                    <span class="name">Año: ${{year}}</span>
-                    <span class="count">${{scrobbles}} scrobbles</span>
+                    <span class="name">Año: $${year}</span>
+                    <span class="count">$${scrobbles} scrobbles</span>
                 </div>
                 <div class="popup-item">
-                    <span class="name">Proveedor: ${{provider}}</span>
+                    <span class="name">Proveedor: $${provider}</span>
                 </div>
             `;
 
-            document.getElementById('popupTitle').textContent = title;
-            document.getElementById('popupContent').innerHTML = content;
-            document.getElementById('popupOverlay').style.display = 'block';
-            document.getElementById('popup').style.display = 'block';
-        }}
+            openPopup(title, content);
+        }
 
         // ✅ FIX: Función para popup lineal
-        function showLinearPopup(title, details) {{
+        function showLinearPopup(title, details) {
             if (!details || details.length === 0) return;
 
-            let content = '';
-            details.slice(0, 10).forEach(item => {{
-                if (item.artist) {{
-                    content += `<div class="popup-item">
+            const parts = [];
+            details.slice(0, 10).forEach(item => {
+                if (item.artist) {
+                    parts.push(`<div class="popup-item">
                         <div style="margin-bottom: 5px;">
-                            <span class="name" style="font-weight: bold;">${{item.artist}}</span>
-                        </div>`;
-
-                    if (item.track) {{
-                        content += `<div style="margin-left: 10px; color: #a6adc8;">
-                            🎵 ${{item.track}}
-                        </div>`;
-                    }}
-
-                    if (item.album) {{
-                        content += `<div style="margin-left: 10px; color: #a6adc8;">
-                            💿 ${{item.album}}
-                        </div>`;
-                    }}
-
-                    if (item.user1_plays && item.user2_plays) {{
-                        content += `<div style="margin-left: 10px; font-size: 0.9em; color: #6c7086;">
-                            Usuario 1: ${{item.user1_plays}} plays | Usuario 2: ${{item.user2_plays}} plays
-                        </div>`;
-                    }}
-
-                    content += `</div>`;
-                }} else {{
-                    content += `<div class="popup-item">
-                        <span class="name">${{item.name}}</span>
-                        <span class="count">${{item.plays}} plays</span>
-                    </div>`;
-                }}
-            }});
-
-            document.getElementById('popupTitle').textContent = title;
-            document.getElementById('popupContent').innerHTML = content;
-            document.getElementById('popupOverlay').style.display = 'block';
-            document.getElementById('popup').style.display = 'block';
-        }}
+                            <span class="name" style="font-weight: bold;">$${item.artist}</span>
+                        </div>`);
+
+                    if (item.track) {
+                        parts.push(`<div style="margin-left: 10px; color: #a6adc8;">
+                            🎵 $${item.track}
+                        </div>`);
+                    }
+
+                    if (item.album) {
+                        parts.push(`<div style="margin-left: 10px; color: #a6adc8;">
+                            💿 $${item.album}
+                        </div>`);
+                    }
+
+                    if (item.user1_plays && item.user2_plays) {
+                        parts.push(`<div style="margin-left: 10px; font-size: 0.9em; color: #6c7086;">
+                            Usuario 1: $${item.user1_plays} plays | Usuario 2: $${item.user2_plays} plays
+                        </div>`);
+                    }
+
+                    parts.push(`</div>`);
+                } else {
+                    parts.push(`<div class="popup-item">
+                        <span class="name">$${item.name}</span>
+                        <span class="count">$${item.plays} plays</span>
+                    </div>`);
+                }
+            });
+
+            openPopup(title, parts.join(''));
+        }
 
         // ✅ FIX: Función para gráficos de líneas individuales
-        function renderIndividualLineChart(canvasId, chartData, title) {{
+        function renderIndividualLineChart(canvasId, chartData, title) {
             const canvas = document.getElementById(canvasId);
 
-            if (!canvas) {{
-                console.warn(`Canvas ${{canvasId}} no encontrado para ${{title}}`);
+            if (!canvas) {
+                console.warn(`Canvas $${canvasId} no encontrado para $${title}`);
                 return;
-            }}
+            }
 
-            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {{
-                console.log(`No hay datos para ${{title}} en ${{canvasId}}`);
+            if (!chartData || !chartData.data || Object.keys(chartData.data).length === 0) {
+                console.log(`No hay datos para $${title} en $${canvasId}`);
                 return;
-            }}
+            }
 
             const datasets = [];
             let colorIndex = 0;
 
             // Obtener top 15 elementos con más datos
             const sortedItems = Object.entries(chartData.data)
-                .sort((a, b) => {{
+                .sort((a, b) => {
                     const aTotal = Object.values(a[1]).reduce((sum, val) => sum + val, 0);
                     const bTotal = Object.values(b[1]).reduce((sum, val) => sum + val, 0);
                     return bTotal - aTotal;
-                }})
+                })
                 .slice(0, 15);
 
-            sortedItems.forEach(([item, yearlyData]) => {{
-                datasets.push({{
+            sortedItems.forEach(([item, yearlyData]) => {
+                datasets.push({
                     label: item,
                     data: chartData.years.map(year => yearlyData[year] || 0),
                     borderColor: colors[colorIndex % colors.length],
-                    backgroundColor: colors[colorIndex % colors.length] + '20',
+                    backgroundColor: FILL_COLORS[colorIndex % FILL_COLORS.length],
                     tension: 0.4,
                     fill: false,
                     pointRadius: 3,
                     pointHoverRadius: 6
-                }});
+                });
                 colorIndex++;
-            }});
+            });
 
-            const config = {{
+            const config = {
                 type: 'line',
-                data: {{
+                data: {
                     labels: chartData.years,
                     datasets: datasets
-                }},
-                options: {{
+                },
+                options: {
                     responsive: true,
+                    animation: CHART_ANIMATION,
                     maintainAspectRatio: false,
-                    plugins: {{
-                        legend: {{
+                    plugins: {
+                        legend: {
                             position: 'bottom',
-                            labels: {{
+                            labels: {
                                 color: '#cdd6f4',
                                 padding: 10,
                                 usePointStyle: true,
-                                font: {{
+                                font: {
                                     size: 10
-                                }}
-                            }}
-                        }},
-                        tooltip: {{
-                            backgroundColor: '#1e1e2e',
-                            titleColor: '#cba6f7',
-                            bodyColor: '#cdd6f4',
-                            borderColor: '#cba6f7',
-                            borderWidth: 1
-                        }}
-                    }},
-                    scales: {{
-                        x: {{
-                            title: {{
+                                }
+                            }
+                        },
+                        tooltip: TOOLTIP_OPTS
+                    },
+                    scales: {
+                        x: {
+                            title: {
                                 display: true,
                                 text: 'Año',
                                 color: '#cdd6f4'
-                            }},
-                            ticks: {{
+                            },
+                            ticks: {
                                 color: '#a6adc8'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }}
-                        }},
-                        y: {{
-                            title: {{
+                            }
+                        },
+                        y: {
+                            title: {
                                 display: true,
                                 text: currentDataType === 'annual' ? 'Scrobbles/Año' : 'Scrobbles Acumulados',
                                 color: '#cdd6f4'
-                            }},
-                            ticks: {{
+                            },
+                            ticks: {
                                 color: '#a6adc8'
-                            }},
-                            grid: {{
+                            },
+                            grid: {
                                 color: '#313244'
-                            }}
-                        }}
-                    }}
-                }}
-            }};
-
-            charts[canvasId] = new Chart(canvas, config);
-        }}
+                            }
+                        }
+                    }
+                }
+            };
+
+            renderChart(canvasId, canvas, config);
+        }
     </script>
 </body>
-</html>"""
+</html>""")
 
-    def _format_number(self, number: int) -> str:
-        """Formatea números con separadores de miles"""
-        return f"{number:,}".replace(",", ".")
+# Partes antes y después del JSON de estadísticas, para poder escribirlo por separado
+_HTML_HEAD, _HTML_TAIL = (Template(part) for part in _HTML_TEMPLATE.template.split('$stats_json', 1))